@@ -5,9 +5,19 @@ ProofLink 総合テスト(IT2)試験書 生成スクリプト
 """
 
 import openpyxl
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.packaging.custom import StringProperty
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.merge import MergedCellRange
+from copy import copy
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+from io import BytesIO
+import bisect
+import heapq
+import json
 import os
 
 # === 共通スタイル定義 ===
@@ -119,6 +129,36 @@ COL_HEADER_MERGES = [
 ]
 
 
+# 試験項目行のセル結合列範囲（項目名 → (開始列, 終了列)）
+MERGE_COL_RANGES = {
+    "ID": ("A", "D"),
+    "テスト大項目": ("E", "N"),
+    "テスト中項目": ("O", "X"),
+    "テスト小項目": ("Y", "AH"),
+    "正常系/異常系": ("AI", "AR"),
+    "設計仕様": ("AS", "BD"),
+    "テスト観点": ("BE", "BP"),
+    "前提条件": ("BQ", "CC"),
+    "テスト手順": ("CD", "CL"),
+    "期待結果": ("CM", "CY"),
+    "実行結果": ("CZ", "DB"),
+    "実施日": ("DC", "DE"),
+    "実施者": ("DF", "DH"),
+    "確認日": ("DI", "DK"),
+    "確認者": ("DL", "DN"),
+    "備考": ("DO", "DW"),
+}
+
+# 複数行の項目でも1行ずつ結合する列
+PER_ROW_MERGE_FIELDS = ("テスト手順", "期待結果")
+
+# 同じ値が連続する項目をまとめて1つに結合する列
+GROUP_MERGE_FIELDS = ("テスト大項目",)
+
+# 試験項目行の最終列
+LAST_ITEM_COL = "DW"
+
+
 def col_to_num(col_str):
     """列文字を数値に変換 (A=1, B=2, ..., Z=26, AA=27, ...)"""
     result = 0
@@ -348,178 +388,630 @@ def merge_cells_for_row(ws, row, start_row, col_start, col_end):
         ws.merge_cells(f"{start_col_letter}{start_row}:{end_col_letter}{row - 1}")
 
 
-def write_test_items(ws, items, screen_id, test_type="IT2"):
-    """テスト項目をシートに書き込む（セル結合対応）"""
-    # 各セル結合用の列範囲定義
-    merge_col_ranges = {
-        "ID": ("A", "D"),
-        "テスト大項目": ("E", "N"),
-        "テスト中項目": ("O", "X"),
-        "テスト小項目": ("Y", "AH"),
-        "正常系/異常系": ("AI", "AR"),
-        "設計仕様": ("AS", "BD"),
-        "テスト観点": ("BE", "BP"),
-        "前提条件": ("BQ", "CC"),
-        "テスト手順": ("CD", "CL"),
-        "期待結果": ("CM", "CY"),
-        "実行結果": ("CZ", "DB"),
-        "実施日": ("DC", "DE"),
-        "実施者": ("DF", "DH"),
-        "確認日": ("DI", "DK"),
-        "確認者": ("DL", "DN"),
-        "備考": ("DO", "DW"),
-    }
+class _StampedMergedCellRange(MergedCellRange):
+    """整数座標から直接生成する結合範囲（座標文字列の生成・解析を行わない）"""
+
+    def __init__(self, worksheet, min_row, min_col, max_row, max_col):
+        self.ws = worksheet
+        self.min_row = min_row
+        self.min_col = min_col
+        self.max_row = max_row
+        self.max_col = max_col
+        self.title = None
+        self.start_cell = worksheet._cells[(min_row, min_col)]
+
+
+# 結合セルの外周（openpyxl の MergedCellRange.format() が罫線を付ける順）
+EDGE_NAMES = ("top", "left", "right", "bottom")
 
-    row = 5  # データ開始行
-    test_num = 1
-    prev_major = None
-    prev_medium = None
-    major_start_row = row
-    medium_start_row = row
-
-    for item in items:
-        test_id = f"{screen_id}-{test_type}-{test_num}"
-        major = item.get("major", "")
-        medium = item.get("medium", "")
-        minor = item.get("minor", "")
-        normal_abnormal = item.get("type", "正常系")
-        spec = item.get("spec", "")
-        viewpoint = item.get("viewpoint", "")
-        precondition = item.get("precondition", "")
-        steps = item.get("steps", [])
-        expected_results = item.get("expected", [])
-        note = item.get("note", "")
 
+def item_row_merges(num_rows):
+    """num_rows 行の項目の結合範囲 [(相対開始行, 開始列, 相対終了行, 終了列)]
+
+    GROUP_MERGE_FIELDS の列は含まない（グループ確定時に group_merges で結合する）。
+    """
+    merges = []
+    for field, (col_s, col_e) in MERGE_COL_RANGES.items():
+        if field in GROUP_MERGE_FIELDS:
+            continue
+        col_s, col_e = col_to_num(col_s), col_to_num(col_e)
+        if num_rows > 1 and field in PER_ROW_MERGE_FIELDS:
+            for r in range(num_rows):
+                merges.append((r, col_s, r, col_e))
+        else:
+            merges.append((0, col_s, num_rows - 1, col_e))
+    return merges
+
+
+def group_merges(field, num_rows):
+    """グループ単位で結合する列の num_rows 行分の結合範囲"""
+    col_s, col_e = MERGE_COL_RANGES[field]
+    return [(0, col_to_num(col_s), num_rows - 1, col_to_num(col_e))]
+
+
+def merge_layout_cells(merges):
+    """結合範囲を埋めるセル [(相対行, 列, 外周)]（先頭セルの外周は None）"""
+    cells = []
+    for r_s, c_s, r_e, c_e in merges:
+        for r in range(r_s, r_e + 1):
+            for c in range(c_s, c_e + 1):
+                if r == r_s and c == c_s:
+                    cells.append((r, c, None))
+                    continue
+                edges = []
+                if r == r_s:
+                    edges.append("top")
+                if c == c_s:
+                    edges.append("left")
+                if c == c_e:
+                    edges.append("right")
+                if r == r_e:
+                    edges.append("bottom")
+                cells.append((r, c, tuple(edges)))
+    return cells
+
+
+class RowLayoutTemplate:
+    """試験項目行のレイアウトを事前計算したテンプレート
+
+    COL_MAP と MERGE_COL_RANGES から列番号・スタイルID・結合範囲を一度だけ求め、
+    各項目は整数座標でテンプレートを押印して書き込む。
+    スタイルIDはブックごとに採番されるため、テンプレートはブック単位で生成する。
+    """
+
+    def __init__(self, wb):
+        self.wb = wb
+        self.value_cols = {field: col_to_num(col) for field, col in COL_MAP.items()}
+        self.border_style = self._style_array(border=THIN_BORDER)
+        self.content_style = self._style_array(
+            font=NORMAL_FONT, border=THIN_BORDER, alignment=WRAP_ALIGNMENT
+        )
+        self._edge_styles = {}
+        self._layouts = {}
+
+    def _style_array(self, font=None, border=None, alignment=None):
+        """スタイルをブックに登録し、セルに直接設定できるスタイル配列を返す"""
+        style = StyleArray()
+        if font is not None:
+            style.fontId = self.wb._fonts.add(font)
+        if border is not None:
+            style.borderId = self.wb._borders.add(border)
+        if alignment is not None:
+            style.alignmentId = self.wb._alignments.add(alignment)
+        return style
+
+    def _edge_style(self, edges):
+        """結合セル内の非先頭セル用スタイル（結合範囲の外周にのみ罫線）"""
+        style = self._edge_styles.get(edges)
+        if style is None:
+            # openpyxl の MergedCellRange.format() と同じ順序で罫線を合成する
+            border = Border()
+            for name in EDGE_NAMES:
+                if name in edges:
+                    border += Border(**{name: getattr(THIN_BORDER, name)})
+            style = self._style_array(border=border)
+            self._edge_styles[edges] = style
+        return style
+
+    def _compile(self, merges):
+        """結合範囲の一覧から、押印するセル（相対行, 列, 結合セルか, スタイル）を求める"""
+        cells = [
+            (r, c, edges is not None, self.border_style if edges is None else self._edge_style(edges))
+            for r, c, edges in merge_layout_cells(merges)
+        ]
+        return cells, merges
+
+    def layout(self, num_rows):
+        """num_rows 行の項目のセル配置と結合範囲（先頭行からの相対行）を返す"""
+        compiled = self._layouts.get(num_rows)
+        if compiled is None:
+            compiled = self._compile(item_row_merges(num_rows))
+            self._layouts[num_rows] = compiled
+        return compiled
+
+    def group_layout(self, field, num_rows):
+        """グループ単位で結合する列の、num_rows 行分のセル配置と結合範囲を返す"""
+        compiled = self._layouts.get((field, num_rows))
+        if compiled is None:
+            compiled = self._compile(group_merges(field, num_rows))
+            self._layouts[(field, num_rows)] = compiled
+        return compiled
+
+    def _stamp(self, ws, start_row, compiled):
+        cells, merges = compiled
+        ws_cells = ws._cells
+        for r, c, merged, style in cells:
+            row = start_row + r
+            if merged:
+                cell = MergedCell(ws, row=row, column=c)
+                cell._style = StyleArray(style)
+            else:
+                cell = Cell(ws, row=row, column=c, style_array=style)
+            ws_cells[(row, c)] = cell
+
+        # テンプレートの結合範囲は互いに重ならないため、重複検査を省いて登録する
+        ranges = ws.merged_cells.ranges
+        for r_s, c_s, r_e, c_e in merges:
+            ranges.add(_StampedMergedCellRange(ws, start_row + r_s, c_s, start_row + r_e, c_e))
+
+    def stamp(self, ws, start_row, num_rows):
+        """罫線付きのセルと結合範囲を start_row から押印する"""
+        self._stamp(ws, start_row, self.layout(num_rows))
+
+    def stamp_group(self, ws, field, start_row, num_rows):
+        """グループ単位で結合する列を start_row から num_rows 行分押印する"""
+        self._stamp(ws, start_row, self.group_layout(field, num_rows))
+
+    def put(self, ws, row, field, value):
+        """押印済みの行に値を書き込む"""
+        cell = ws._cells[(row, self.value_cols[field])]
+        cell._style = StyleArray(self.content_style)
+        cell.value = value
+
+
+# 正常系/異常系の区分
+ITEM_TYPES = ("正常系", "異常系")
+
+# 前提条件のデータ規模（dataset）に指定できるキー（件数はすべて0以上の整数）
+#   users: ユーザ数, groups: テストグループ数, test_cases: グループあたりのテストケース数,
+#   contents: テストケースあたりのテスト内容数, files: テストケースあたりの添付ファイル数,
+#   results: テスト結果を入力済みにするか（0/1）, history: テスト内容あたりの結果履歴数,
+#   evidences: テスト結果あたりのエビデンス数, tags: グループあたりのタグ数
+# インポートバッチの入力ファイル
+#   csv_cases: テストケースCSVのテストケース数, attachments: ZIP内の添付ファイル数,
+#   invalid_row: 重複TID（直前のレコードと同じ TID/No）にするレコード番号,
+#   missing_row: 必須項目を欠落させるレコード番号, csv_users: ユーザCSVのユーザ数,
+#   csv_tags: ユーザあたりのタグ数（上限。ユーザごとに上限と上限-1を交互に設定する）
+DATASET_KEYS = (
+    "users", "groups", "test_cases", "contents", "files", "results", "history", "evidences", "tags",
+    "csv_cases", "attachments", "invalid_row", "missing_row", "csv_users", "csv_tags",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TestItem:
+    """試験項目（dict 形式の項目を検証済みの軽量な形で保持する）"""
+
+    major: str = ""
+    medium: str = ""
+    minor: str = ""
+    type: str = "正常系"
+    spec: str = ""
+    viewpoint: str = ""
+    precondition: str = ""
+    steps: tuple = ()
+    expected: tuple = ()
+    note: str = ""
+    dataset: tuple = ()
+    threshold_ms: int = 0
+    num_rows: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for f in fields(self):
+            if f.type is str and not isinstance(getattr(self, f.name), str):
+                raise ValueError(f"{f.name} must be a string: {getattr(self, f.name)!r}")
+        if self.type not in ITEM_TYPES:
+            raise ValueError(f"type must be one of {', '.join(ITEM_TYPES)}: {self.type!r}")
+        for name in ("steps", "expected"):
+            lines = tuple(getattr(self, name))
+            if not all(isinstance(line, str) for line in lines):
+                raise ValueError(f"{name} must be a list of strings")
+            object.__setattr__(self, name, lines)
+        # データ規模は (キー, 件数) の組を DATASET_KEYS の順で保持する（ハッシュ可能にするため）
+        sizes = dict(self.dataset)
+        unknown = set(sizes) - set(DATASET_KEYS)
+        if unknown:
+            raise ValueError(f"unknown dataset keys: {', '.join(sorted(unknown))}")
+        for key, count in sizes.items():
+            if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+                raise ValueError(f"dataset.{key} must be a non-negative integer: {count!r}")
+        object.__setattr__(self, "dataset", tuple((key, sizes[key]) for key in DATASET_KEYS if key in sizes))
+        # 合否判定のレスポンスタイム上限（ms、0 は指定なし）
+        if not isinstance(self.threshold_ms, int) or isinstance(self.threshold_ms, bool) or self.threshold_ms < 0:
+            raise ValueError(f"threshold_ms must be a non-negative integer: {self.threshold_ms!r}")
         # 複数ステップがある場合、複数行にまたがる
-        num_rows = max(len(steps), len(expected_results), 1)
-        start_row = row
+        object.__setattr__(self, "num_rows", max(len(self.steps), len(self.expected), 1))
+
+    @classmethod
+    def from_dict(cls, item):
+        """dict 形式の試験項目から生成する（未知のキーはエラー）"""
+        unknown = set(item) - _TEST_ITEM_KEYS
+        if unknown:
+            raise ValueError(f"unknown item keys: {', '.join(sorted(unknown))}")
+        return cls(**item)
+
+    def to_dict(self):
+        """dict 形式の試験項目に戻す"""
+        item = {name: getattr(self, name) for name in _TEST_ITEM_KEYS_ORDERED}
+        item.update(steps=list(self.steps), expected=list(self.expected), dataset=dict(self.dataset))
+        return item
+
+
+_TEST_ITEM_KEYS_ORDERED = tuple(f.name for f in fields(TestItem) if f.init)
+_TEST_ITEM_KEYS = frozenset(_TEST_ITEM_KEYS_ORDERED)
+
+
+def to_test_item(item):
+    """dict または TestItem を TestItem にそろえる"""
+    if isinstance(item, TestItem):
+        return item
+    return TestItem.from_dict(item)
+
+
+def format_test_id(screen_id, test_type, test_num):
+    """試験項目IDを生成する（{screen_id}-{test_type}-{連番}）"""
+    return f"{screen_id}-{test_type}-{test_num}"
+
+
+def number_items(items):
+    """試験項目に元の項目リストでの1からの連番を振り、(連番, item) を順に返す
+
+    apply_item_filter で絞り込んだ項目は (連番, item) の組で渡され、その連番をそのまま使う。
+    """
+    for test_num, entry in enumerate(items, start=1):
+        yield entry if isinstance(entry, tuple) else (test_num, entry)
+
+
+def iter_test_items(items, screen_id, test_type="IT2"):
+    """試験項目に連番（number_items）でIDを振り、(test_id, item) を順に返す"""
+    for test_num, item in number_items(items):
+        yield format_test_id(screen_id, test_type, test_num), item
+
+
+def select_items(items, major=None, medium=None, type=None):
+    """条件に合う試験項目だけを (連番, TestItem) で順に返す（条件は文字列または文字列の集合、None は条件なし）"""
+
+    def as_set(value):
+        if value is None or isinstance(value, (set, frozenset)):
+            return value
+        if isinstance(value, str):
+            return {value}
+        return set(value)
+
+    major, medium, type = as_set(major), as_set(medium), as_set(type)
+    for test_num, item in number_items(items):
+        item = to_test_item(item)
+        if major is not None and item.major not in major:
+            continue
+        if medium is not None and item.medium not in medium:
+            continue
+        if type is not None and item.type not in type:
+            continue
+        yield test_num, item
+
+
+def select_id_range(items, first=1, last=None):
+    """元の項目リストでの連番（IDの末尾の番号）が first〜last の項目だけを (連番, item) で返す"""
+    for test_num, item in number_items(items):
+        if last is not None and test_num > last:
+            break
+        if test_num >= first:
+            yield test_num, item
+
+
+def apply_item_filter(items, item_filter=None):
+    """マニフェストの filter 指定（major / medium / type / id_range）を順に適用する
+
+    絞り込んだ項目は (元の項目リストでの連番, TestItem) の組で返すため、書き込むIDは
+    絞り込まない文書と同じになる（write_test_items 等は number_items で連番を取り出す）。
+    """
+    if not item_filter:
+        return iter(items)
+    if "id_range" in item_filter:
+        first, last = item_filter["id_range"]
+        items = select_id_range(items, first, last)
+    return select_items(
+        items,
+        major=item_filter.get("major"),
+        medium=item_filter.get("medium"),
+        type=item_filter.get("type"),
+    )
+
+
+class ItemSummary:
+    """試験項目の集計（テスト大項目・中項目別、正常系/異常系別の件数と書き込み行範囲）
+
+    write_test_items が行を書き込みながら add() で加算するため、シートの再走査は不要。
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_type = {item_type: 0 for item_type in ITEM_TYPES}
+        self.groups = {}
+        self.first_row = None
+        self.last_row = None
+        # シートに書き出さない実行パラメータ {連番: (データ規模, レスポンスタイム上限)}
+        self.parameters = {}
+
+    def add(self, item, start_row, test_num=None):
+        """start_row から書き込んだ試験項目（連番 test_num、省略時は書き込み順）を加算する"""
+        self.total += 1
+        self.by_type[item.type] += 1
+        counts = self.groups.get((item.major, item.medium))
+        if counts is None:
+            counts = self.groups[(item.major, item.medium)] = {item_type: 0 for item_type in ITEM_TYPES}
+        counts[item.type] += 1
+        if item.dataset or item.threshold_ms:
+            self.parameters[test_num or self.total] = (item.dataset, item.threshold_ms)
+        if self.first_row is None:
+            self.first_row = start_row
+        self.last_row = start_row + item.num_rows - 1
+
+
+# 試験項目の実行パラメータを保存するユーザー設定プロパティの名前（接頭辞 + 試験項目ID）
+ITEM_PROPERTY_PREFIX = "IT2_ITEM:"
+
+
+def write_item_properties(wb, summary, screen_id, test_type="IT2"):
+    """データ規模（dataset）とレスポンスタイム上限（threshold_ms）を試験項目IDごとの
+    ユーザー設定プロパティ（JSON）としてブックに保存する
+
+    どちらもシートのセルには書き出さないため、it2_reader で試験書から項目を読み戻すときに使う。
+    """
+    for test_num, (dataset, threshold_ms) in summary.parameters.items():
+        value = {}
+        if dataset:
+            value["dataset"] = dict(dataset)
+        if threshold_ms:
+            value["threshold_ms"] = threshold_ms
+        wb.custom_doc_props.append(StringProperty(
+            name=ITEM_PROPERTY_PREFIX + format_test_id(screen_id, test_type, test_num),
+            value=json.dumps(value, ensure_ascii=False, separators=(",", ":")),
+        ))
+
+
+def read_item_properties(wb):
+    """write_item_properties で保存した {試験項目ID: {"dataset": ..., "threshold_ms": ...}} を返す"""
+    parameters = {}
+    for prop in wb.custom_doc_props:
+        if prop.name.startswith(ITEM_PROPERTY_PREFIX):
+            parameters[prop.name[len(ITEM_PROPERTY_PREFIX):]] = json.loads(prop.value)
+    return parameters
+
+
+def write_test_items(ws, items, screen_id, test_type="IT2", summary=None):
+    """テスト項目をシートに書き込む（セル結合対応）
+
+    items は任意の反復可能オブジェクトでよく、1回の走査で書き込む。
+    IDの連番は number_items で振る（apply_item_filter で絞り込んだ項目は元の連番を使う）。
+    テスト大項目は値が変わった時点で直前のグループをまとめて結合する。
+    summary（ItemSummary）を渡すと、書き込んだ項目を集計する。
+    """
+    template = RowLayoutTemplate(ws.parent)
 
-        for i in range(num_rows):
-            # ボーダーを全セルに適用
-            last_col = col_to_num("DW")
-            for c in range(1, last_col + 1):
-                ws.cell(row=row, column=c).border = THIN_BORDER
+    row = 5  # データ開始行
+    prev_major = None
+    major_start = row
 
-            # ステップ
-            if i < len(steps):
-                ws[f"CD{row}"].value = steps[i]
-                ws[f"CD{row}"].font = NORMAL_FONT
-                ws[f"CD{row}"].alignment = WRAP_ALIGNMENT
+    def close_major_group():
+        template.stamp_group(ws, "テスト大項目", major_start, row - major_start)
+        template.put(ws, major_start, "テスト大項目", prev_major)
 
-            # 期待結果
-            if i < len(expected_results):
-                ws[f"CM{row}"].value = expected_results[i]
-                ws[f"CM{row}"].font = NORMAL_FONT
-                ws[f"CM{row}"].alignment = WRAP_ALIGNMENT
+    for test_num, item in number_items(items):
+        item = to_test_item(item)
+        if prev_major is not None and item.major != prev_major:
+            close_major_group()
+            major_start = row
 
-            row += 1
+        num_rows = item.num_rows
+        start_row = row
+        template.stamp(ws, start_row, num_rows)
 
-        # 最初の行にデータを書き込み
-        ws[f"A{start_row}"].value = test_id
-        ws[f"A{start_row}"].font = NORMAL_FONT
-        ws[f"A{start_row}"].alignment = WRAP_ALIGNMENT
-
-        if major != prev_major:
-            ws[f"E{start_row}"].value = major
-            ws[f"E{start_row}"].font = NORMAL_FONT
-            ws[f"E{start_row}"].alignment = WRAP_ALIGNMENT
-
-        ws[f"O{start_row}"].value = medium
-        ws[f"O{start_row}"].font = NORMAL_FONT
-        ws[f"O{start_row}"].alignment = WRAP_ALIGNMENT
-
-        if minor:
-            ws[f"Y{start_row}"].value = minor
-            ws[f"Y{start_row}"].font = NORMAL_FONT
-            ws[f"Y{start_row}"].alignment = WRAP_ALIGNMENT
-
-        ws[f"AI{start_row}"].value = normal_abnormal
-        ws[f"AI{start_row}"].font = NORMAL_FONT
-        ws[f"AI{start_row}"].alignment = WRAP_ALIGNMENT
-
-        if spec:
-            ws[f"AS{start_row}"].value = spec
-            ws[f"AS{start_row}"].font = NORMAL_FONT
-            ws[f"AS{start_row}"].alignment = WRAP_ALIGNMENT
-
-        ws[f"BE{start_row}"].value = viewpoint
-        ws[f"BE{start_row}"].font = NORMAL_FONT
-        ws[f"BE{start_row}"].alignment = WRAP_ALIGNMENT
-
-        if precondition:
-            ws[f"BQ{start_row}"].value = precondition
-            ws[f"BQ{start_row}"].font = NORMAL_FONT
-            ws[f"BQ{start_row}"].alignment = WRAP_ALIGNMENT
-
-        if note:
-            ws[f"DO{start_row}"].value = note
-            ws[f"DO{start_row}"].font = NORMAL_FONT
-            ws[f"DO{start_row}"].alignment = WRAP_ALIGNMENT
-
-        # 複数行のセル結合
-        if num_rows > 1:
-            for field, (col_s, col_e) in merge_col_ranges.items():
-                if field not in ("テスト手順", "期待結果"):
-                    ws.merge_cells(f"{col_s}{start_row}:{col_e}{start_row + num_rows - 1}")
-                else:
-                    # テスト手順と期待結果は1行ずつ結合
-                    for r in range(start_row, start_row + num_rows):
-                        ws.merge_cells(f"{col_s}{r}:{col_e}{r}")
-        else:
-            # 単一行でも列内結合は必要
-            for field, (col_s, col_e) in merge_col_ranges.items():
-                ws.merge_cells(f"{col_s}{start_row}:{col_e}{start_row}")
+        # ステップ・期待結果は1行ずつ書き込み
+        for i, step in enumerate(item.steps):
+            template.put(ws, start_row + i, "テスト手順", step)
+        for i, expected in enumerate(item.expected):
+            template.put(ws, start_row + i, "期待結果", expected)
 
-        prev_major = major
-        test_num += 1
+        # 最初の行にデータを書き込み
+        template.put(ws, start_row, "ID", format_test_id(screen_id, test_type, test_num))
+        template.put(ws, start_row, "テスト中項目", item.medium)
+        if item.minor:
+            template.put(ws, start_row, "テスト小項目", item.minor)
+        template.put(ws, start_row, "正常系/異常系", item.type)
+        if item.spec:
+            template.put(ws, start_row, "設計仕様", item.spec)
+        template.put(ws, start_row, "テスト観点", item.viewpoint)
+        if item.precondition:
+            template.put(ws, start_row, "前提条件", item.precondition)
+        if item.note:
+            template.put(ws, start_row, "備考", item.note)
+
+        if summary is not None:
+            summary.add(item, start_row, test_num)
+        row += num_rows
+        prev_major = item.major
 
-    # テスト大項目のセル結合処理
-    _merge_major_items(ws, items, screen_id, test_type)
+    # 最後のテスト大項目グループ
+    if prev_major is not None:
+        close_major_group()
 
     return row
 
 
-def _merge_major_items(ws, items, screen_id, test_type):
-    """テスト大項目が同じ連続行をセル結合する"""
+# 罫線の辺（check_layout で必要な辺をビットで表す）
+BORDER_SIDE_BITS = {"top": 1, "left": 2, "right": 4, "bottom": 8}
+
+
+def check_layout(ws, first_row=5, last_col=None):
+    """シートの結合範囲と罫線の整合性を検査し、問題の一覧 [(種類, セル範囲, 内容)] を返す
+
+    種類:
+        overlap: 結合範囲が重なっている（Excel が「修復」する）
+        gap: 試験項目行（first_row 以降）の 1〜last_col 列にどの結合範囲にも含まれない列がある
+        orphan: 結合範囲外の MergedCell、先頭が MergedCell の結合範囲、結合範囲内の先頭以外のセルの値
+        border: 試験項目行の結合範囲の外周に罫線がない
+
+    結合範囲を開始行順に走査し、その行にかかる結合範囲を開始列順の区間として保持する。
+    各セル・各結合範囲の判定は二分探索で行うため、結合範囲数 M・セル数 C に対して
+    O((M + C) log M) で終わる。
+    """
+    last_col = last_col or col_to_num(LAST_ITEM_COL)
+    issues = []
+    ranges = sorted((r.min_row, r.min_col, r.max_row, r.max_col) for r in ws.merged_cells.ranges)
+    cells_by_row = {}
+    for (row, col), cell in ws._cells.items():
+        cells_by_row.setdefault(row, []).append((col, cell))
+    data_last = max((r[2] for r in ranges if r[0] >= first_row), default=first_row - 1)
+    last_row = max([data_last, *cells_by_row, *(r[2] for r in ranges)], default=0)
+
+    borders = ws.parent._borders
+    border_masks = {}
+
+    def border_mask(cell):
+        # 書式のない MergedCell は _style を持たない
+        border_id = cell._style.borderId if cell._style is not None else 0
+        mask = border_masks.get(border_id)
+        if mask is None:
+            border = borders[border_id]
+            mask = sum(bit for name, bit in BORDER_SIDE_BITS.items()
+                       if getattr(border, name) is not None and getattr(border, name).style)
+            border_masks[border_id] = mask
+        return mask
+
+    def ref(min_row, min_col, max_row, max_col):
+        start = f"{get_column_letter(min_col)}{min_row}"
+        if (min_row, min_col) == (max_row, max_col):
+            return start
+        return f"{start}:{get_column_letter(max_col)}{max_row}"
+
+    starts = []     # その行にかかる結合範囲の開始列（昇順、互いに重ならない）
+    active = []     # starts と同じ順の結合範囲
+    expiry = []     # (終了行, 開始列) のヒープ
+    next_range = 0
+    for row in range(1, last_row + 1):
+        while expiry and expiry[0][0] < row:
+            _, col = heapq.heappop(expiry)
+            k = bisect.bisect_left(starts, col)
+            del starts[k], active[k]
+
+        # この行から始まる結合範囲を登録（重なるものは登録せずに報告する）
+        while next_range < len(ranges) and ranges[next_range][0] == row:
+            merged = ranges[next_range]
+            next_range += 1
+            k = bisect.bisect_right(starts, merged[1])
+            clashes = [active[k - 1]] if k > 0 and active[k - 1][3] >= merged[1] else []
+            while k < len(active) and active[k][1] <= merged[3]:
+                clashes.append(active[k])
+                k += 1
+            if clashes:
+                issues += [("overlap", ref(*merged), f"overlaps {ref(*other)}") for other in clashes]
+                continue
+            k = bisect.bisect_right(starts, merged[1])
+            starts.insert(k, merged[1])
+            active.insert(k, merged)
+            heapq.heappush(expiry, (merged[2], merged[1]))
+
+        for col, cell in cells_by_row.get(row, ()):
+            k = bisect.bisect_right(starts, col) - 1
+            merged = active[k] if k >= 0 and active[k][3] >= col else None
+            anchor = merged is not None and (row, col) == merged[:2]
+            if isinstance(cell, MergedCell):
+                if merged is None:
+                    issues.append(("orphan", ref(row, col, row, col), "MergedCell outside merged ranges"))
+                elif anchor:
+                    issues.append(("orphan", ref(*merged), "merged range starts with a MergedCell"))
+            elif merged is not None and not anchor and cell.value is not None:
+                issues.append(("orphan", ref(row, col, row, col), f"value hidden by merge {ref(*merged)}"))
+
+        if row < first_row or row > data_last:
+            continue
+
+        # 試験項目行は 1〜last_col 列が結合範囲で隙間なく埋まっている
+        col = 1
+        for merged in active:
+            if merged[1] > col:
+                issues.append(("gap", ref(row, col, row, min(merged[1], last_col + 1) - 1), "not merged"))
+            col = max(col, merged[3] + 1)
+            if col > last_col:
+                break
+        if col <= last_col:
+            issues.append(("gap", ref(row, col, row, last_col), "not merged"))
+
+        # 結合範囲の外周の罫線（先頭・末尾の行は全列、途中の行は左右の列のみ）
+        for merged in active:
+            min_row, min_col, max_row, max_col = merged
+            if min_col > last_col:
+                break
+            edge_rows = row in (min_row, max_row)
+            missing = []
+            for c in (range(min_col, max_col + 1) if edge_rows else {min_col, max_col}):
+                required = ((row == min_row and BORDER_SIDE_BITS["top"])
+                            | (row == max_row and BORDER_SIDE_BITS["bottom"])
+                            | (c == min_col and BORDER_SIDE_BITS["left"])
+                            | (c == max_col and BORDER_SIDE_BITS["right"]))
+                cell = ws._cells.get((row, c))
+                if required and (cell is None or border_mask(cell) & required != required):
+                    missing.append(c)
+            if missing:
+                issues.append(("border", ref(row, missing[0], row, missing[-1]), f"missing border in {ref(*merged)}"))
+
+    return issues
+
+
+# 実行結果の判定値（アプリのテスト結果の判定と同じ）
+RESULT_OK_VALUES = ("OK", "参照OK")
+RESULT_NG_VALUES = ("NG",)
+
+
+def create_summary_sheet(wb, summary, test_type):
+    """集計シートを作成（件数は静的な値、実行結果の集計のみ数式）"""
+    ws = wb.create_sheet("集計")
+
+    def header(row, labels):
+        for col, label in enumerate(labels, start=1):
+            cell = ws.cell(row=row, column=col, value=label)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            cell.border = THIN_BORDER
+
+    def values(row, row_values, number_formats=None):
+        for col, value in enumerate(row_values, start=1):
+            cell = ws.cell(row=row, column=col, value=value)
+            cell.font = NORMAL_FONT
+            cell.alignment = WRAP_ALIGNMENT
+            cell.border = THIN_BORDER
+            if number_formats and col in number_formats:
+                cell.number_format = number_formats[col]
+
+    # 試験種別ごとの件数と実行結果
+    header(1, ["試験種別", "項目数", "正常系", "異常系", "OK", "NG", "未実施", "消化率", "合格率"])
+    if summary.first_row is None:
+        results = [0, 0, 0, 0, 0]
+    else:
+        # 実行結果列は項目ごとに結合されており、値は各項目の先頭行にのみ入る
+        result_range = f"'画面試験項目'!$CZ${summary.first_row}:$CZ${summary.last_row}"
+        ok = "+".join(f'COUNTIF({result_range},"{value}")' for value in RESULT_OK_VALUES)
+        ng = "+".join(f'COUNTIF({result_range},"{value}")' for value in RESULT_NG_VALUES)
+        results = [
+            f"={ok}",
+            f"={ng}",
+            f"=B2-COUNTA({result_range})",
+            "=IF(B2=0,0,(E2+F2)/B2)",
+            "=IF(E2+F2=0,0,E2/(E2+F2))",
+        ]
+    values(2, [test_type, summary.total, summary.by_type["正常系"], summary.by_type["異常系"]] + results,
+           {8: "0.0%", 9: "0.0%"})
+
+    # テスト大項目・中項目ごとの件数
+    header(4, ["テスト大項目", "テスト中項目", "項目数", "正常系", "異常系"])
     row = 5
     prev_major = None
-    major_start = 5
-    merge_ranges = []
-
-    for item in items:
-        major = item.get("major", "")
-        steps = item.get("steps", [])
-        expected_results = item.get("expected", [])
-        num_rows = max(len(steps), len(expected_results), 1)
-
-        if major != prev_major and prev_major is not None:
-            if row - major_start > 0:
-                merge_ranges.append((major_start, row - 1))
-            major_start = row
-        elif major == prev_major:
-            pass  # 継続
-
+    for (major, medium), counts in summary.groups.items():
+        values(row, [major if major != prev_major else "", medium,
+                     counts["正常系"] + counts["異常系"], counts["正常系"], counts["異常系"]])
         prev_major = major
-        row += num_rows
+        row += 1
+    values(row, ["合計", "", summary.total, summary.by_type["正常系"], summary.by_type["異常系"]])
+    ws.cell(row=row, column=1).font = BOLD_FONT
 
-    # 最後のグループ
-    if row - major_start > 0:
-        merge_ranges.append((major_start, row - 1))
-
-    # テスト大項目列のセル結合
-    for start, end in merge_ranges:
-        if end > start:
-            # 既に個別行で結合済みなので、テスト大項目列のみ再結合
-            # Note: openpyxlでは既存の結合を解除してから再結合する必要がある
-            try:
-                for r in range(start, end + 1):
-                    try:
-                        ws.unmerge_cells(f"E{r}:N{r}")
-                    except (KeyError, ValueError):
-                        pass
-                ws.merge_cells(f"E{start}:N{end}")
-            except (KeyError, ValueError):
-                pass
+    ws.column_dimensions["A"].width = 30.0
+    ws.column_dimensions["B"].width = 30.0
+    for col_letter in "CDEFGHI":
+        ws.column_dimensions[col_letter].width = 10.0
+
+    return ws
 
 
 # === テスト項目データ定義 ===
@@ -536,6 +1028,8 @@ def get_performance_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "テストケース50件以下のテストグループ複製が3秒以内に完了すること",
             "precondition": "・テストケース50件のテストグループが存在すること\n・テスト内容が各テストケースに3件ずつ存在すること\n・添付ファイルが各テストケースに1件ずつ存在すること",
+            "dataset": {"test_cases": 50, "contents": 3, "files": 1},
+            "threshold_ms": 3000,
             "steps": ["1.テストグループ複製APIを実行する"],
             "expected": ["・レスポンスタイムが3秒以内であること\n・複製後のテストグループが正常に表示されること"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -548,6 +1042,8 @@ def get_performance_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "テストケース200件のテストグループ複製が10秒以内に完了すること",
             "precondition": "・テストケース200件のテストグループが存在すること\n・テスト内容が各テストケースに5件ずつ存在すること\n・添付ファイルが各テストケースに2件ずつ存在すること",
+            "dataset": {"test_cases": 200, "contents": 5, "files": 2},
+            "threshold_ms": 10000,
             "steps": ["1.テストグループ複製APIを実行する"],
             "expected": ["・レスポンスタイムが10秒以内であること\n・複製後のデータ件数が元のグループと一致すること"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -560,6 +1056,8 @@ def get_performance_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "テストケース500件のテストグループ複製が30秒以内に完了すること",
             "precondition": "・テストケース500件のテストグループが存在すること\n・テスト内容が各テストケースに10件ずつ存在すること\n・添付ファイルが各テストケースに3件ずつ存在すること\n・エビデンスファイルが各テスト結果に2件ずつ存在すること",
+            "dataset": {"test_cases": 500, "contents": 10, "files": 3, "results": 1, "evidences": 2},
+            "threshold_ms": 30000,
             "steps": ["1.テストグループ複製APIを実行する"],
             "expected": ["・レスポンスタイムが30秒以内であること\n・複製後のデータ整合性が保たれていること（テストケース、テスト内容、ファイル、エビデンス全て）"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -572,6 +1070,7 @@ def get_performance_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "大規模テストグループ複製後のデータ整合性が保たれていること",
             "precondition": "・テストケース500件のテストグループが存在すること\n・全テーブル（tt_test_cases, tt_test_contents, tt_test_case_files, tt_test_results, tt_test_results_history, tt_test_evidences, tt_test_group_tags）にデータが存在すること",
+            "dataset": {"users": 3, "test_cases": 500, "contents": 10, "files": 3, "results": 1, "history": 2, "evidences": 2, "tags": 3},
             "steps": ["1.テストグループ複製APIを実行する", "2.複製元と複製先のデータ件数を比較する", "3.複製先のS3ファイルパスが正しく設定されていることを確認する"],
             "expected": ["・複製が正常に完了すること", "・全テーブルのレコード数が複製元と一致すること", "・S3上のファイルパスが新グループIDのディレクトリに格納されていること"],
         },
@@ -584,6 +1083,8 @@ def get_performance_test_items():
             "spec": "・テスト集計API\n・GET /api/test-groups/[groupId]/report-data",
             "viewpoint": "テストケース50件以下のテストグループ集計が1秒以内に完了すること",
             "precondition": "・テストケース50件のテストグループが存在すること\n・テスト結果が入力済みであること",
+            "dataset": {"test_cases": 50, "contents": 3, "results": 1},
+            "threshold_ms": 1000,
             "steps": ["1.テスト集計APIを実行する"],
             "expected": ["・レスポンスタイムが1秒以内であること\n・集計結果（total_items, completed_items, ok_items, ng_items等）が正しいこと"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -596,6 +1097,8 @@ def get_performance_test_items():
             "spec": "・テスト集計API\n・GET /api/test-groups/[groupId]/report-data",
             "viewpoint": "テストケース200件のテストグループ集計が3秒以内に完了すること",
             "precondition": "・テストケース200件のテストグループが存在すること\n・テスト内容が各テストケースに5件ずつ存在すること\n・テスト結果が入力済みであること",
+            "dataset": {"test_cases": 200, "contents": 5, "results": 1},
+            "threshold_ms": 3000,
             "steps": ["1.テスト集計APIを実行する"],
             "expected": ["・レスポンスタイムが3秒以内であること\n・first_layer, second_layer別の集計結果が正しいこと"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -608,6 +1111,8 @@ def get_performance_test_items():
             "spec": "・テスト集計API\n・GET /api/test-groups/[groupId]/report-data",
             "viewpoint": "テストケース500件のテストグループ集計が5秒以内に完了すること",
             "precondition": "・テストケース500件のテストグループが存在すること\n・テスト内容が各テストケースに10件ずつ存在すること\n・テスト結果が全件入力済みであること",
+            "dataset": {"test_cases": 500, "contents": 10, "results": 1},
+            "threshold_ms": 5000,
             "steps": ["1.テスト集計APIを実行する"],
             "expected": ["・レスポンスタイムが5秒以内であること\n・ok_rate, progress_rateの計算結果が手動計算値と一致すること"],
             "note": "計測ツール: JMeter\n計測回数: 5回の平均値",
@@ -620,6 +1125,8 @@ def get_performance_test_items():
             "spec": "・日次レポートAPI\n・GET /api/test-groups/[groupId]/daily-report-data",
             "viewpoint": "日次レポートデータの取得が3秒以内に完了すること",
             "precondition": "・テストケース500件のテストグループが存在すること\n・過去30日間のテスト結果履歴が存在すること",
+            "dataset": {"test_cases": 500, "contents": 10, "results": 1, "history": 30},
+            "threshold_ms": 3000,
             "steps": ["1.日次レポートAPIを実行する"],
             "expected": ["・レスポンスタイムが3秒以内であること\n・日付別の集計データが正しいこと"],
             "note": "計測ツール: JMeter",
@@ -633,6 +1140,8 @@ def get_performance_test_items():
             "spec": "・テストケースインポートバッチ\n・batch/src/test-case-import.ts",
             "viewpoint": "テストケース50件のCSVインポートが30秒以内に完了すること",
             "precondition": "・テストケース50件分のCSVファイルを含むZIPファイルが用意されていること\n・添付ファイルが10件含まれていること\n・インポート先のテストグループが存在すること",
+            "dataset": {"groups": 1, "csv_cases": 50, "attachments": 10},
+            "threshold_ms": 30000,
             "steps": ["1.テストケースインポートバッチを実行する"],
             "expected": ["・処理が30秒以内に完了すること\n・全50件のテストケースがDBに正しく登録されていること\n・添付ファイルがS3に正しくアップロードされていること"],
             "note": "AWS Batch環境で実行",
@@ -645,6 +1154,8 @@ def get_performance_test_items():
             "spec": "・テストケースインポートバッチ\n・batch/src/test-case-import.ts",
             "viewpoint": "テストケース200件のCSVインポートが2分以内に完了すること",
             "precondition": "・テストケース200件分のCSVファイルを含むZIPファイルが用意されていること\n・添付ファイルが50件含まれていること\n・インポート先のテストグループが存在すること",
+            "dataset": {"groups": 1, "csv_cases": 200, "attachments": 50},
+            "threshold_ms": 120000,
             "steps": ["1.テストケースインポートバッチを実行する"],
             "expected": ["・処理が2分以内に完了すること\n・全200件のテストケースがDBに正しく登録されていること"],
             "note": "AWS Batch環境で実行",
@@ -657,6 +1168,8 @@ def get_performance_test_items():
             "spec": "・テストケースインポートバッチ\n・batch/src/test-case-import.ts",
             "viewpoint": "テストケース500件のCSVインポートが5分以内に完了すること",
             "precondition": "・テストケース500件分のCSVファイルを含むZIPファイルが用意されていること\n・添付ファイルが100件含まれていること\n・インポート先のテストグループが存在すること",
+            "dataset": {"groups": 1, "csv_cases": 500, "attachments": 100},
+            "threshold_ms": 300000,
             "steps": ["1.テストケースインポートバッチを実行する"],
             "expected": ["・処理が5分以内に完了すること\n・全500件のテストケースがDBに正しく登録されていること\n・結果ファイル（JSON/CSV）がS3に出力されていること"],
             "note": "AWS Batch環境で実行",
@@ -669,6 +1182,7 @@ def get_performance_test_items():
             "spec": "・テストケースインポートバッチ\n・batch/src/test-case-import.ts",
             "viewpoint": "インポート途中でエラーが発生した場合にトランザクションがロールバックされること",
             "precondition": "・テストケース100件分のCSVファイルを含むZIPファイルが用意されていること\n・50件目のレコードに不正データ（重複TID等）が含まれていること",
+            "dataset": {"groups": 1, "csv_cases": 100, "attachments": 10, "invalid_row": 50},
             "steps": ["1.不正データを含むZIPファイルでインポートバッチを実行する"],
             "expected": ["・エラーが検出されインポートが中断すること\n・DBにレコードが1件も追加されていないこと（全件ロールバック）\n・エラー結果ファイルにエラー内容が記録されていること"],
         },
@@ -681,6 +1195,8 @@ def get_performance_test_items():
             "spec": "・ユーザインポートバッチ\n・batch/src/user-import.ts",
             "viewpoint": "ユーザ100件のCSVインポートが1分以内に完了すること",
             "precondition": "・ユーザ100件分のCSVファイルがS3にアップロードされていること\n・各ユーザにタグが2-3件設定されていること",
+            "dataset": {"csv_users": 100, "csv_tags": 3},
+            "threshold_ms": 60000,
             "steps": ["1.ユーザインポートバッチを実行する"],
             "expected": ["・処理が1分以内に完了すること\n・全100件のユーザがDBに正しく登録されていること\n・パスワードがbcryptでハッシュ化されていること\n・タグが正しく紐付けられていること"],
             "note": "AWS Batch環境で実行",
@@ -694,6 +1210,8 @@ def get_performance_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "テストグループ100件の一覧表示が2秒以内に完了すること",
             "precondition": "・テストグループが100件登録されていること\n・各グループにテストケースが存在すること",
+            "dataset": {"groups": 100, "test_cases": 10, "contents": 1},
+            "threshold_ms": 2000,
             "steps": ["1.テストグループ一覧APIを実行する"],
             "expected": ["・レスポンスタイムが2秒以内であること\n・全100件のテストグループが正しく表示されること"],
             "note": "計測ツール: JMeter",
@@ -707,6 +1225,8 @@ def get_performance_test_items():
             "spec": "・テストケース一覧API\n・GET /api/test-groups/[groupId]/cases",
             "viewpoint": "テストケース500件の一覧表示が3秒以内に完了すること",
             "precondition": "・テストケース500件のテストグループが存在すること",
+            "dataset": {"test_cases": 500, "contents": 1},
+            "threshold_ms": 3000,
             "steps": ["1.テストケース一覧APIを実行する"],
             "expected": ["・レスポンスタイムが3秒以内であること\n・全500件のテストケースが正しく表示されること"],
             "note": "計測ツール: JMeter",
@@ -720,6 +1240,8 @@ def get_performance_test_items():
             "spec": "・認証API\n・POST /api/auth/[...nextauth]",
             "viewpoint": "ログイン処理が2秒以内に完了すること",
             "precondition": "・有効なユーザアカウントが存在すること",
+            "dataset": {"users": 1},
+            "threshold_ms": 2000,
             "steps": ["1.ログインAPIを実行する"],
             "expected": ["・レスポンスタイムが2秒以内であること\n・JWTトークンが正しく発行されること"],
             "note": "計測ツール: JMeter",
@@ -733,6 +1255,7 @@ def get_performance_test_items():
             "spec": "・ファイルアップロードAPI\n・POST /api/files/evidences",
             "viewpoint": "10MBのエビデンスファイルアップロードが5秒以内に完了すること",
             "precondition": "・10MBの画像ファイルが用意されていること\n・S3バケットが正しく設定されていること",
+            "threshold_ms": 5000,
             "steps": ["1.エビデンスファイルアップロードAPIを実行する"],
             "expected": ["・レスポンスタイムが5秒以内であること\n・ファイルがS3に正しく保存されること"],
             "note": "計測ツール: JMeter",
@@ -752,6 +1275,7 @@ def get_load_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "10ユーザが同時にテストグループ一覧にアクセスした場合、全リクエストが3秒以内に完了すること",
             "precondition": "・10ユーザ分のアカウントが存在すること\n・テストグループが100件登録されていること\n・JMeterで10スレッドを同時実行する設定であること",
+            "dataset": {"users": 10, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで10スレッドを同時起動してテストグループ一覧APIにアクセスする"],
             "expected": ["・全リクエストの95パーセンタイルレスポンスタイムが3秒以内であること\n・エラーレートが0%であること"],
             "note": "JMeter Thread Group: 10 threads, Ramp-up: 1s",
@@ -764,6 +1288,7 @@ def get_load_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "30ユーザが同時にテストグループ一覧にアクセスした場合、全リクエストが5秒以内に完了すること",
             "precondition": "・30ユーザ分のアカウントが存在すること\n・テストグループが100件登録されていること\n・JMeterで30スレッドを同時実行する設定であること",
+            "dataset": {"users": 30, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで30スレッドを同時起動してテストグループ一覧APIにアクセスする"],
             "expected": ["・全リクエストの95パーセンタイルレスポンスタイムが5秒以内であること\n・エラーレートが1%未満であること"],
             "note": "JMeter Thread Group: 30 threads, Ramp-up: 3s",
@@ -776,6 +1301,7 @@ def get_load_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "50ユーザが同時にテストグループ一覧にアクセスした場合のレスポンスタイムとエラーレートを確認する",
             "precondition": "・50ユーザ分のアカウントが存在すること\n・テストグループが100件登録されていること\n・JMeterで50スレッドを同時実行する設定であること",
+            "dataset": {"users": 50, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで50スレッドを同時起動してテストグループ一覧APIにアクセスする"],
             "expected": ["・全リクエストの95パーセンタイルレスポンスタイムが10秒以内であること\n・エラーレートが5%未満であること"],
             "note": "JMeter Thread Group: 50 threads, Ramp-up: 5s",
@@ -789,6 +1315,7 @@ def get_load_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "3ユーザが同時にテストグループ複製を実行した場合、全処理が正常に完了すること",
             "precondition": "・テストケース100件のテストグループが3つ存在すること\n・3ユーザ分のアカウントが存在すること\n・JMeterで3スレッドを同時実行する設定であること",
+            "dataset": {"users": 3, "groups": 3, "test_cases": 100, "contents": 5, "files": 2},
             "steps": ["1.JMeterで3スレッドを同時起動して異なるテストグループの複製APIを実行する"],
             "expected": ["・全リクエストが正常に完了すること（HTTPステータス200）\n・各複製先のテストグループのデータ整合性が保たれていること\n・デッドロックが発生しないこと"],
             "note": "トランザクション競合に注意",
@@ -801,6 +1328,7 @@ def get_load_test_items():
             "spec": "・テストグループ複製API\n・POST /api/test-groups/[groupId]",
             "viewpoint": "同一テストグループに対して3ユーザが同時に複製を実行した場合の排他制御が正しく動作すること",
             "precondition": "・テストケース100件のテストグループが1つ存在すること\n・3ユーザ分のアカウントが存在すること\n・JMeterで3スレッドが同一グループIDに対して複製を実行する設定であること",
+            "dataset": {"users": 3, "test_cases": 100, "contents": 5, "files": 2},
             "steps": ["1.JMeterで3スレッドを同時起動して同一テストグループの複製APIを実行する"],
             "expected": ["・全リクエストが完了すること（成功またはエラー）\n・データ不整合が発生しないこと\n・複製されたグループのデータが正しいこと"],
             "note": "排他制御・デッドロック確認",
@@ -814,6 +1342,7 @@ def get_load_test_items():
             "spec": "・テスト集計API\n・GET /api/test-groups/[groupId]/report-data",
             "viewpoint": "10ユーザが同時に集計APIにアクセスした場合、全リクエストが5秒以内に完了すること",
             "precondition": "・テストケース500件のテストグループが存在すること\n・10ユーザ分のアカウントが存在すること",
+            "dataset": {"users": 10, "test_cases": 500, "contents": 10, "results": 1},
             "steps": ["1.JMeterで10スレッドを同時起動して集計APIにアクセスする"],
             "expected": ["・全リクエストの95パーセンタイルレスポンスタイムが5秒以内であること\n・全リクエストの集計結果が同一であること"],
             "note": "JMeter Thread Group: 10 threads",
@@ -827,6 +1356,7 @@ def get_load_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "30分間継続して負荷をかけた場合にレスポンスタイムが劣化しないこと",
             "precondition": "・10ユーザ分のアカウントが存在すること\n・テストグループが100件登録されていること\n・JMeterで10スレッド×30分間のループ設定であること",
+            "dataset": {"users": 10, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで10スレッドを30分間継続実行する"],
             "expected": ["・30分間を通じて95パーセンタイルレスポンスタイムが5秒以内を維持すること\n・エラーレートが1%未満であること\n・メモリリークの兆候がないこと（CloudWatchで確認）"],
             "note": "JMeter Duration: 1800s\nCloudWatchでメモリ・CPU使用率を監視",
@@ -839,6 +1369,7 @@ def get_load_test_items():
             "spec": "・複数API混合\n・テストグループ一覧、テストケース一覧、集計、ファイルアップロード",
             "viewpoint": "60分間の混合負荷テストでシステムが安定動作すること",
             "precondition": "・20ユーザ分のアカウントが存在すること\n・十分なテストデータが登録されていること\n・JMeterで混合シナリオ（一覧40%, 詳細30%, 集計20%, ファイル10%）の設定であること",
+            "dataset": {"users": 20, "groups": 100, "test_cases": 50, "contents": 3, "files": 1, "results": 1, "evidences": 1},
             "steps": ["1.JMeterで20スレッドの混合シナリオを60分間継続実行する"],
             "expected": ["・60分間を通じてシステムが安定動作すること\n・95パーセンタイルレスポンスタイムが各API基準値以内であること\n・ECSタスクの再起動が発生しないこと\n・RDSのCPU使用率が80%を超えないこと"],
             "note": "JMeter Duration: 3600s\nCloudWatch, RDS Performance Insightsで監視",
@@ -852,6 +1383,7 @@ def get_load_test_items():
             "spec": "・テストグループ一覧API\n・GET /api/test-groups",
             "viewpoint": "急激な負荷増加時にシステムがダウンせず、負荷軽減後に正常に復帰すること",
             "precondition": "・50ユーザ分のアカウントが存在すること\n・テストグループが100件登録されていること\n・JMeterで段階的負荷（5→50→5ユーザ）の設定であること",
+            "dataset": {"users": 50, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで5スレッドから開始し、1分後に50スレッドに急増させ、さらに1分後に5スレッドに戻す"],
             "expected": ["・急激な負荷増加時にHTTP 5xxエラーが発生しないこと\n・負荷軽減後にレスポンスタイムが通常レベルに復帰すること\n・ALBのヘルスチェックが失敗しないこと"],
             "note": "JMeter Ultimate Thread Group使用",
@@ -865,6 +1397,7 @@ def get_load_test_items():
             "spec": "・テストケースインポートバッチ\n・テストグループ一覧API",
             "viewpoint": "テストインポートバッチ実行中に他ユーザのWeb操作が影響を受けないこと",
             "precondition": "・テストケース500件のインポートバッチが実行中であること\n・10ユーザ分のアカウントが存在すること\n・JMeterで10スレッドの一覧・詳細アクセスシナリオが設定されていること",
+            "dataset": {"users": 10, "groups": 100, "test_cases": 10, "contents": 1, "csv_cases": 500, "attachments": 100},
             "steps": ["1.テストインポートバッチを実行開始する", "2.バッチ実行中にJMeterで10スレッドのWeb操作シナリオを実行する"],
             "expected": ["・バッチ処理が実行中であること", "・Web操作のレスポンスタイムがバッチ非実行時と比較して2倍以内であること\n・Web操作でエラーが発生しないこと"],
             "note": "AWS Batchは別コンテナで実行されるため影響は限定的だが確認が必要",
@@ -878,6 +1411,7 @@ def get_load_test_items():
             "spec": "・PostgreSQL接続プール\n・Prismaクライアント設定",
             "viewpoint": "大量同時リクエスト時にDB接続プールが枯渇しないこと、または適切にエラーハンドリングされること",
             "precondition": "・50ユーザ分のアカウントが存在すること\n・JMeterで50スレッドの高頻度リクエスト設定であること\n・Prismaの接続プール上限を確認済みであること",
+            "dataset": {"users": 50, "groups": 100, "test_cases": 10, "contents": 1},
             "steps": ["1.JMeterで50スレッドを同時起動し、高頻度でDB参照APIにアクセスする"],
             "expected": ["・接続プールが枯渇した場合、適切なエラーメッセージが返されること\n・システム全体がハングアップしないこと\n・負荷軽減後にDB接続が正常に回復すること"],
             "note": "CloudWatch RDS接続数を監視",
@@ -947,6 +1481,7 @@ def get_scenario_test_items():
             "spec": "・テストケースインポートバッチ\n・テストケース編集API\n・テスト結果入力API",
             "viewpoint": "CSVファイルによるテストケース一括インポートからテスト実施・結果入力までの一連のフローが正常に完了すること",
             "precondition": "・テストグループが作成済みであること\n・テストケース20件分のCSVと添付ファイルを含むZIPが準備されていること\n・テスト管理者アカウントでログイン済みであること",
+            "dataset": {"groups": 1, "csv_cases": 20, "attachments": 5},
             "steps": [
                 "1.テストケースインポート画面からZIPファイルをアップロードする",
                 "2.インポート結果一覧画面でインポートの完了を確認する",
@@ -973,6 +1508,7 @@ def get_scenario_test_items():
             "spec": "・テストケースインポートバッチ\n・インポート結果API",
             "viewpoint": "不正なCSVデータを含むZIPファイルをインポートした場合、適切なエラーが表示されること",
             "precondition": "・テストグループが作成済みであること\n・不正データ（重複TID、必須項目欠落等）を含むCSVのZIPが準備されていること\n・テスト管理者アカウントでログイン済みであること",
+            "dataset": {"groups": 1, "csv_cases": 10, "attachments": 2, "invalid_row": 5, "missing_row": 8},
             "steps": [
                 "1.テストケースインポート画面から不正データを含むZIPファイルをアップロードする",
                 "2.インポート結果一覧画面でインポートの完了を確認する",
@@ -995,6 +1531,7 @@ def get_scenario_test_items():
             "spec": "・ユーザインポートバッチ\n・認証API\n・ユーザ管理API",
             "viewpoint": "CSVファイルによるユーザ一括インポート後、インポートされたユーザがログインして操作できること",
             "precondition": "・システム管理者アカウントでログイン済みであること\n・ユーザ5件分のCSVファイルが準備されていること\n・CSVに各ユーザのロール（管理者、テスト管理者、一般）が設定されていること",
+            "dataset": {"csv_users": 5},
             "steps": [
                 "1.ユーザインポート実行画面からCSVファイルをアップロードする",
                 "2.インポート結果一覧画面でインポートの完了を確認する",
@@ -1143,58 +1680,245 @@ def get_scenario_test_items():
     ]
 
 
-def create_test_document(screen_id, doc_name, target_name, items, test_type, filename):
-    """テスト試験書Excelファイルを作成"""
-    wb = openpyxl.Workbook()
+# === 文書テンプレートキャッシュ ===
+# 表紙・改版履歴・試験項目シートのヘッダーは doc_name / screen_id / target_name 以外
+# 文書ごとの差分がないため、プロセス内で一度だけ構築して各文書に複製する
+
+# 文書ごとに差し替えるセル（シート名 → {(行, 列): 引数名}）
+TEMPLATE_PATCH_CELLS = {
+    "表紙": {(16, 7): "doc_name"},
+    "画面試験項目": {(2, 6): "doc_name", (2, 20): "screen_id", (2, 23): "target_name"},
+}
 
-    # 表紙
-    create_cover_sheet(wb, doc_name)
+_document_template = None
 
-    # 改版履歴
+
+def build_document_template():
+    """固定部分を構築し、セル・結合範囲・列幅のスナップショットを返す"""
+    wb = openpyxl.Workbook()
+    create_cover_sheet(wb, "")
     create_revision_sheet(wb)
+    setup_test_sheet(wb.create_sheet("画面試験項目"), "", "", "")
+
+    sheets = []
+    styles = {}
+    for ws in wb.worksheets:
+        cells = []
+        for (row, col), cell in sorted(ws._cells.items()):
+            key = tuple(cell._style)
+            styles.setdefault(key, cell)
+            value = None if isinstance(cell, MergedCell) else cell.value
+            cells.append((row, col, isinstance(cell, MergedCell), value, key))
+        merges = [
+            (cr.min_row, cr.min_col, cr.max_row, cr.max_col)
+            for cr in ws.merged_cells.ranges
+        ]
+        widths = {
+            letter: dim.width
+            for letter, dim in ws.column_dimensions.items()
+            if dim.customWidth
+        }
+        sheets.append((ws.title, cells, merges, widths))
+
+    return {"workbook": wb, "sheets": sheets, "styles": styles}
+
+
+def get_document_template():
+    """プロセス内でキャッシュした文書テンプレートを返す"""
+    global _document_template
+    if _document_template is None:
+        _document_template = build_document_template()
+    return _document_template
+
+
+def new_document_workbook(screen_id, doc_name, target_name):
+    """テンプレートを複製して文書固有の値を差し替えたブックを返す"""
+    template = get_document_template()
+    values = {"screen_id": screen_id, "doc_name": doc_name, "target_name": target_name}
 
-    # 画面試験項目シート
-    ws = wb.create_sheet("画面試験項目")
-    setup_test_sheet(ws, screen_id, doc_name, target_name)
-    write_test_items(ws, items, screen_id, test_type)
+    wb = openpyxl.Workbook()
+    for index, (title, cells, merges, widths) in enumerate(template["sheets"]):
+        if index == 0:
+            ws = wb.active
+            ws.title = title
+        else:
+            ws = wb.create_sheet(title)
+
+        for letter, width in widths.items():
+            ws.column_dimensions[letter].width = width
+
+        # テンプレートのスタイルをこのブックに登録し直す（スタイルIDはブック単位）
+        if index == 0:
+            style_map = {}
+            for key, src in template["styles"].items():
+                probe = Cell(ws)
+                probe.font = copy(src.font)
+                probe.fill = copy(src.fill)
+                probe.border = copy(src.border)
+                probe.alignment = copy(src.alignment)
+                probe.number_format = src.number_format
+                probe.protection = copy(src.protection)
+                style_map[key] = probe._style
+
+        patches = TEMPLATE_PATCH_CELLS.get(title, {})
+        ws_cells = ws._cells
+        for row, col, merged, value, key in cells:
+            if merged:
+                cell = MergedCell(ws, row=row, column=col)
+                cell._style = StyleArray(style_map[key])
+            else:
+                cell = Cell(ws, row=row, column=col, style_array=style_map[key])
+                if (row, col) in patches:
+                    value = values[patches[(row, col)]]
+                if value is not None:
+                    cell.value = value
+            ws_cells[(row, col)] = cell
+
+        ranges = ws.merged_cells.ranges
+        for min_row, min_col, max_row, max_col in merges:
+            ranges.add(_StampedMergedCellRange(ws, min_row, min_col, max_row, max_col))
+
+    return wb
+
+
+def build_test_document(screen_id, doc_name, target_name, items, test_type, filename, validate=False):
+    """テスト試験書のブックを構築する（保存はしない）
+
+    validate を指定すると、画面試験項目シートのレイアウトを check_layout で検査し、
+    問題があれば ValueError を送出する。
+    """
+    # 表紙・改版履歴・画面試験項目シートのヘッダー（テンプレートから複製）
+    wb = new_document_workbook(screen_id, doc_name, target_name)
+
+    # 画面試験項目（書き込みながら集計する）
+    ws = wb["画面試験項目"]
+    summary = ItemSummary()
+    write_test_items(ws, items, screen_id, test_type, summary)
+
+    # 集計
+    create_summary_sheet(wb, summary, test_type)
+    write_item_properties(wb, summary, screen_id, test_type)
+
+    if validate:
+        issues = check_layout(ws)
+        if issues:
+            details = "; ".join(f"{kind} {cells}: {message}" for kind, cells, message in issues[:5])
+            raise ValueError(f"{filename}: {len(issues)} layout issue(s): {details}")
+
+    return wb
+
+
+def create_test_document(screen_id, doc_name, target_name, items, test_type, filename,
+                         output_dir=None, validate=False):
+    """テスト試験書Excelファイルを作成（output_dir 省略時はスクリプトと同じディレクトリ）
+
+    validate を指定すると、保存前に画面試験項目シートのレイアウトを check_layout で検査し、
+    問題があれば ValueError を送出する（ファイルは保存しない）。
+    """
+    wb = build_test_document(screen_id, doc_name, target_name, items, test_type, filename, validate)
 
     # 保存
-    output_path = os.path.join(os.path.dirname(__file__), filename)
+    output_path = os.path.join(output_dir or os.path.dirname(__file__), filename)
     wb.save(output_path)
     print(f"Generated: {output_path}")
     return output_path
 
 
-def main():
-    docs = [
-        {
-            "screen_id": "ST01",
-            "doc_name": "IT2_総合試験項目書_性能テスト",
-            "target_name": "システム全体（性能テスト）",
-            "items": get_performance_test_items(),
-            "test_type": "IT2-PT",
-            "filename": "IT2_総合試験項目書_性能テスト.xlsx",
-        },
-        {
-            "screen_id": "ST02",
-            "doc_name": "IT2_総合試験項目書_負荷テスト",
-            "target_name": "システム全体（負荷テスト）",
-            "items": get_load_test_items(),
-            "test_type": "IT2-LT",
-            "filename": "IT2_総合試験項目書_負荷テスト.xlsx",
-        },
-        {
-            "screen_id": "ST03",
-            "doc_name": "IT2_総合試験項目書_シナリオテスト",
-            "target_name": "システム全体（シナリオテスト）",
-            "items": get_scenario_test_items(),
-            "test_type": "IT2-SC",
-            "filename": "IT2_総合試験項目書_シナリオテスト.xlsx",
-        },
-    ]
+def render_test_document(screen_id, doc_name, target_name, items, test_type, filename, validate=False):
+    """テスト試験書を構築し、ファイルに書き出さずに xlsx のバイト列を返す"""
+    wb = build_test_document(screen_id, doc_name, target_name, items, test_type, filename, validate)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def replace_note_section(note, heading, body):
+    """備考の【heading】セクションを body に置き換える（なければ末尾に追加、body が空なら削除）
+
+    セクションは「【見出し】」の行から、次の「【」で始まる行の直前までとする。
+    """
+    lines = note.split("\n") if note else []
+    marker = f"【{heading}】"
+    if marker in lines:
+        start = lines.index(marker)
+        end = start + 1
+        while end < len(lines) and not lines[end].startswith("【"):
+            end += 1
+        del lines[start:end]
+    while lines and not lines[-1]:
+        lines.pop()
+    if body:
+        lines += [marker] + body.split("\n")
+    return "\n".join(lines)
+
+
+def annotate_item_notes(path, notes, heading, sheet_name="画面試験項目", values=None):
+    """生成済みの試験書の備考セルに、試験項目IDごとの【heading】セクションを書き込む
+
+    notes は {試験項目ID: 本文}。再実行時は同じ見出しのセクションを置き換える。
+    values（{試験項目ID: {列名: 値}}、例: 実行結果・実施日）を渡すと、同じ行のその列にも書き込む。
+    見つからなかった試験項目IDの集合を返す。
+    """
+    wb = openpyxl.load_workbook(path)
+    ws = wb[sheet_name]
+    template = RowLayoutTemplate(wb)
+    id_col = template.value_cols["ID"]
+    note_col = template.value_cols["備考"]
+    values = values or {}
+
+    remaining = set(notes) | set(values)
+    for (cell,) in ws.iter_rows(min_row=5, min_col=id_col, max_col=id_col):
+        if cell.value in remaining:
+            if cell.value in notes:
+                note = ws.cell(cell.row, note_col).value or ""
+                template.put(ws, cell.row, "備考", replace_note_section(note, heading, notes[cell.value]))
+            for field_name, value in values.get(cell.value, {}).items():
+                template.put(ws, cell.row, field_name, value)
+            remaining.discard(cell.value)
+
+    wb.save(path)
+    return remaining
+
+
+# 試験項目の組み込みソース（マニフェストの "items" に名前で指定できる）
+ITEM_SOURCES = {
+    "performance": get_performance_test_items,
+    "load": get_load_test_items,
+    "scenario": get_scenario_test_items,
+}
 
-    for doc in docs:
-        create_test_document(**doc)
+# 既定で生成する文書（マニフェスト形式、items は ITEM_SOURCES の名前）
+DEFAULT_DOCUMENTS = [
+    {
+        "screen_id": "ST01",
+        "doc_name": "IT2_総合試験項目書_性能テスト",
+        "target_name": "システム全体（性能テスト）",
+        "items": "performance",
+        "test_type": "IT2-PT",
+        "filename": "IT2_総合試験項目書_性能テスト.xlsx",
+    },
+    {
+        "screen_id": "ST02",
+        "doc_name": "IT2_総合試験項目書_負荷テスト",
+        "target_name": "システム全体（負荷テスト）",
+        "items": "load",
+        "test_type": "IT2-LT",
+        "filename": "IT2_総合試験項目書_負荷テスト.xlsx",
+    },
+    {
+        "screen_id": "ST03",
+        "doc_name": "IT2_総合試験項目書_シナリオテスト",
+        "target_name": "システム全体（シナリオテスト）",
+        "items": "scenario",
+        "test_type": "IT2-SC",
+        "filename": "IT2_総合試験項目書_シナリオテスト.xlsx",
+    },
+]
+
+
+def main():
+    for doc in DEFAULT_DOCUMENTS:
+        create_test_document(**dict(doc, items=ITEM_SOURCES[doc["items"]]()), validate=True)
 
     print("\nAll documents generated successfully!")
 
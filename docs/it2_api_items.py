@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 API 性能試験項目生成スクリプト
+docs/swagger.yml の全エンドポイントについて、データ規模の段階（小規模・中規模・大規模）ごとの
+性能試験項目（レスポンスタイム）のひな形を生成し、手書きの試験項目で上書きする
+
+ひな形はデータ規模（dataset）と判定のレスポンスタイム上限（threshold_ms）を持ち、
+前提条件・テスト観点・期待結果の文言はそこから組み立てる。
+
+手書きの試験項目（既定: get_performance_test_items）は、設計仕様のエンドポイントと
+段階を表すデータ規模の件数が一致するひな形を置き換える。
+    ・同じひな形に一致した手書きの項目は、その位置に手書きの順で並べる
+    ・どのひな形にも一致しない手書きの項目は末尾に並べる
+    ・手書きの項目があるエンドポイントのひな形は、テスト大項目を手書きの項目にそろえる
+    ・設計仕様にエンドポイントの明示があれば、API 名からの対応付け（SPEC_API_ALIASES）は使わない
+
+生成した試験項目は .json / .jsonl の項目ソースとしてマニフェストから参照できるほか、
+--xlsx で create_test_document により試験書を直接生成できる。
+"""
+
+import argparse
+import json
+import os
+import re
+
+from generate_it2_test_docs import create_test_document, to_test_item
+from it2_batch import iter_items
+from it2_coverage import API_PREFIX, SWAGGER_PATH, endpoint_key, load_openapi_operations, spec_endpoints
+
+# データ規模の段階の名前
+TIER_NAMES = ("小規模", "中規模", "大規模")
+
+# データ規模が段階で変わるエンドポイント（パス正規表現, 段階を表すキー, 段階ごとのデータ規模）
+#   先に一致したものを使う。どれにも一致しないエンドポイントは段階なしの1項目とする
+SCALED_ENDPOINTS = (
+    (r"^/test-groups/\{groupId\}/(report-data|daily-report-data|cases/\{tid\}/results)$", "test_cases", (
+        {"test_cases": 50, "contents": 3, "results": 1},
+        {"test_cases": 200, "contents": 5, "results": 1},
+        {"test_cases": 500, "contents": 10, "results": 1},
+    )),
+    (r"^/test-groups/\{groupId\}", "test_cases", (
+        {"test_cases": 50, "contents": 3, "files": 1},
+        {"test_cases": 200, "contents": 5, "files": 2},
+        {"test_cases": 500, "contents": 10, "files": 3},
+    )),
+    (r"^/test-groups$", "groups", (
+        {"groups": 10, "test_cases": 10, "contents": 1},
+        {"groups": 50, "test_cases": 10, "contents": 1},
+        {"groups": 100, "test_cases": 10, "contents": 1},
+    )),
+    (r"^/users", "users", ({"users": 50}, {"users": 200}, {"users": 500})),
+    (r"^/batch/test-import$", "csv_cases", (
+        {"groups": 1, "csv_cases": 50, "attachments": 10},
+        {"groups": 1, "csv_cases": 200, "attachments": 50},
+        {"groups": 1, "csv_cases": 500, "attachments": 100},
+    )),
+    (r"^/batch/user-import$", "csv_users", ({"csv_users": 10}, {"csv_users": 50}, {"csv_users": 100})),
+)
+
+# 段階ごとのレスポンスタイム上限（ms）。参照系は集計、更新系は複製の手書き項目に合わせる
+TIER_THRESHOLDS_MS = {
+    "GET": (1000, 3000, 5000),
+    "POST": (3000, 10000, 30000),
+    "PUT": (3000, 10000, 30000),
+    "PATCH": (3000, 10000, 30000),
+    "DELETE": (3000, 10000, 30000),
+}
+
+# バッチはインポート完了までの時間を上限とする（段階ごと、ms）
+BATCH_THRESHOLDS_MS = {
+    "/batch/test-import": (30000, 120000, 300000),
+    "/batch/user-import": (10000, 30000, 60000),
+}
+
+# 段階なしの項目のレスポンスタイム上限（ms）
+SINGLE_THRESHOLD_MS = {"GET": 2000}
+SINGLE_THRESHOLD_DEFAULT_MS = 3000
+
+# データ規模のキーごとの前提条件の文言
+DATASET_PRECONDITIONS = {
+    "users": "ユーザが{n}件登録されていること",
+    "groups": "テストグループが{n}件登録されていること",
+    "test_cases": "テストケース{n}件のテストグループが存在すること",
+    "contents": "テスト内容が各テストケースに{n}件ずつ存在すること",
+    "files": "添付ファイルが各テストケースに{n}件ずつ存在すること",
+    "results": "テスト結果が入力済みであること",
+    "csv_cases": "テストケース{n}件のインポートCSVが用意されていること",
+    "attachments": "添付ファイル{n}件を含むインポートZIPが用意されていること",
+    "csv_users": "ユーザ{n}件のインポートCSVが用意されていること",
+}
+
+# 段階を表すキーの件数の言い方（テスト観点・テスト小項目に使う）
+SCALE_LABELS = {
+    "users": "ユーザ{n}件",
+    "groups": "テストグループ{n}件",
+    "test_cases": "テストケース{n}件",
+    "csv_cases": "テストケース{n}件のCSV",
+    "csv_users": "ユーザ{n}件のCSV",
+}
+
+GENERATED_NOTE = "計測ツール: JMeter\n計測回数: 5回の平均値\nswagger.yml から生成"
+
+
+def format_duration(ms):
+    """レスポンスタイム上限を「3秒」「2分」のような文言にする"""
+    if ms % 60000 == 0:
+        return f"{ms // 60000}分"
+    if ms % 1000 == 0:
+        return f"{ms // 1000}秒"
+    return f"{ms}ミリ秒"
+
+
+def spec_path(path):
+    """swagger.yml のパスを設計仕様の記法（/api/test-groups/[groupId]）にする"""
+    return API_PREFIX + re.sub(r"\{([^}]*)\}", r"[\1]", path)
+
+
+def endpoint_tiers(method, path):
+    """エンドポイントの段階 [(段階名, 段階を表すキー, データ規模, レスポンスタイム上限)]"""
+    for pattern, scale_key, datasets in SCALED_ENDPOINTS:
+        if re.search(pattern, path):
+            thresholds = BATCH_THRESHOLDS_MS.get(path, TIER_THRESHOLDS_MS[method])
+            return [(name, scale_key, dataset, threshold)
+                    for name, dataset, threshold in zip(TIER_NAMES, datasets, thresholds)]
+    return [("", None, {}, SINGLE_THRESHOLD_MS.get(method, SINGLE_THRESHOLD_DEFAULT_MS))]
+
+
+def skeleton_item(operation, tier_name, scale_key, dataset, threshold_ms):
+    """エンドポイントと段階から性能試験項目のひな形を作る"""
+    summary = operation["summary"] or f"{operation['method']} {operation['path']}"
+    limit = format_duration(threshold_ms)
+    scale = SCALE_LABELS[scale_key].format(n=dataset[scale_key]) if scale_key else ""
+    preconditions = [DATASET_PRECONDITIONS[key].format(n=n) for key, n in dataset.items()]
+    return {
+        "major": summary,
+        "medium": "レスポンスタイム",
+        "minor": f"{tier_name}（{scale}）" if tier_name else "",
+        "type": "正常系",
+        "spec": f"・{summary}API\n・{operation['method']} {spec_path(operation['path'])}",
+        "viewpoint": f"{scale + 'での' if scale else ''}{summary}が{limit}以内に完了すること",
+        "precondition": "\n".join(f"・{line}" for line in preconditions),
+        "dataset": dataset,
+        "threshold_ms": threshold_ms,
+        "steps": [f"1.{summary}APIを実行する"],
+        "expected": [f"・レスポンスタイムが{limit}以内であること\n・正常に応答すること"],
+        "note": GENERATED_NOTE,
+    }
+
+
+def build_api_items(operations, overrides=()):
+    """swagger.yml の操作ごと・段階ごとのひな形を生成し、手書きの試験項目で上書きした項目を返す"""
+    # ひな形: [(照合キー, 段階を表すキー, 件数, 項目)]
+    slots = []
+    for operation in operations:
+        key = endpoint_key(operation["method"], operation["path"])
+        for tier_name, scale_key, dataset, threshold in endpoint_tiers(operation["method"], operation["path"]):
+            item = skeleton_item(operation, tier_name, scale_key, dataset, threshold)
+            slots.append((key, scale_key, dataset.get(scale_key), item))
+
+    placed = [[] for _ in slots]    # ひな形の位置に並べる手書きの項目
+    replaced = set()
+    extra = []
+    majors = {}
+    for override in overrides:
+        test_item = to_test_item(override)
+        sizes = dict(test_item.dataset)
+        # 明示したエンドポイントがあれば API 名からの対応付けは使わない
+        found = spec_endpoints(test_item.spec)
+        keys = {key for key, (_, _, source) in found.items() if source == "explicit"} or set(found)
+        matched = [
+            index for index, (key, scale_key, count, _) in enumerate(slots)
+            if key in keys and (scale_key is None or sizes.get(scale_key) == count)
+        ]
+        if not matched:
+            extra.append(override)
+            continue
+        placed[matched[0]].append(override)
+        replaced.update(matched)
+        for key in keys:
+            majors.setdefault(key, test_item.major)
+
+    items = []
+    for index, (key, _, _, item) in enumerate(slots):
+        if index in replaced:
+            items += placed[index]
+            continue
+        if key in majors:
+            item = dict(item, major=majors[key])
+        items.append(item)
+    return items + extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description="swagger.yml の全エンドポイントのデータ規模別性能試験項目を生成する")
+    parser.add_argument("--swagger", default=SWAGGER_PATH, help="OpenAPI 仕様のパス（既定: docs/swagger.yml）")
+    parser.add_argument("--overrides", default="performance",
+                        help="上書きする手書きの項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx、既定: performance）")
+    parser.add_argument("--no-overrides", action="store_true", help="手書きの項目で上書きしない")
+    parser.add_argument("-o", "--output", help="試験項目を書き出すパス（.json / .jsonl）")
+    parser.add_argument("--xlsx", help="試験書(xlsx)のファイル名（create_test_document で生成する）")
+    parser.add_argument("--output-dir", help="試験書の出力ディレクトリ（既定: スクリプトと同じディレクトリ）")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2-PT", help="ID採番に使う試験種別（既定: IT2-PT）")
+    args = parser.parse_args()
+
+    overrides = [] if args.no_overrides else list(iter_items(args.overrides))
+    operations = load_openapi_operations(args.swagger)
+    items = build_api_items(operations, overrides)
+    generated = sum(1 for item in items if to_test_item(item).note == GENERATED_NOTE)
+    print(f"{len(operations)} endpoint(s): {len(items)} item(s) "
+          f"({generated} generated, {len(items) - generated} hand-written)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            if args.output.endswith(".jsonl"):
+                for item in items:
+                    f.write(json.dumps(to_test_item(item).to_dict(), ensure_ascii=False) + "\n")
+            else:
+                json.dump([to_test_item(item).to_dict() for item in items], f, ensure_ascii=False, indent=2)
+        print(f"Exported: {args.output}")
+    if args.xlsx:
+        doc_name = os.path.splitext(os.path.basename(args.xlsx))[0]
+        create_test_document(args.screen_id, doc_name, "システム全体（API性能テスト）", items, args.test_type,
+                             args.xlsx, args.output_dir, validate=True)
+
+
+if __name__ == "__main__":
+    main()
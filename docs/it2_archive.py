@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 負荷テスト生サンプルアーカイブ
+k6 の計測結果（--out json= / --out csv=）の http_req_duration を1回だけ変換し、
+列ごとの固定長配列として1ファイル（.k6a）に保存する。再分析（パーセンタイルの追加、タグ別の内訳、
+時間帯の切り出し）は、アーカイブをメモリマップで開いて NumPy の配列ビューとして読むだけで済む。
+
+ファイル形式（リトルエンディアン）:
+    MAGIC（8バイト） + ヘッダー長（uint64） + ヘッダー（JSON）
+    + DATA_ALIGN バイト境界から各列の配列（ヘッダーの columns に dtype・データ部先頭からの位置・要素数）
+
+    列             dtype   内容
+    time_us        int64   時刻（UNIX 時刻、マイクロ秒）。時刻順に並べ替えて保存する
+    latency_ms     float32 レイテンシ（ms）
+    status         uint16  HTTPステータス（接続エラーは 0）
+    failed         bool    失敗か（expected_response タグ、なければステータスで判定）
+    endpoint       uint32  "<メソッド> <name タグ（なければ URL）>" の文字列番号
+    vu             uint32  VU 番号（k6 の vu システムタグ。なければ 0）
+    test_id        uint16  試験項目ID の文字列番号（test_id タグ、なければ変換時の指定）
+    index          int64   時間索引。INDEX_STEP_S 秒ごとの区間の先頭サンプル位置（区間数 + 1 個）
+
+    文字列の列（エンドポイント・試験項目ID）は、列ごとの文字列表（ヘッダーの strings）に1回だけ保存し、
+    列には表の番号を入れる。列ごとに表を分けるため、URL の種類が多くても試験項目IDの番号は増えない。
+    試験項目IDごとの件数・時間帯もヘッダーに持つため、一覧の表示に列を読む必要はない。
+
+it2_timeseries（と、それを使う it2_capacity / it2_cloudwatch）には k6 の結果ファイルの代わりに
+<アーカイブ>.k6a または <アーカイブ>.k6a#<試験項目ID> を指定できる。
+"""
+
+import argparse
+import csv
+import json
+import os
+import struct
+import tempfile
+import time
+from urllib.parse import parse_qsl
+
+import numpy as np
+
+from it2_sql_time import parse_time
+from it2_timeseries import CHUNK_LINES, _failed
+
+ARCHIVE_SUFFIX = ".k6a"
+MAGIC = b"K6ARCH01"
+DATA_ALIGN = 64
+
+# 保存する列と dtype（索引 index は別に作る）
+COLUMNS = {
+    "time_us": "<i8",
+    "latency_ms": "<f4",
+    "status": "<u2",
+    "failed": "|b1",
+    "endpoint": "<u4",
+    "vu": "<u4",
+    "test_id": "<u2",
+}
+
+# 文字列表で番号に置き換える列
+STRING_COLUMNS = ("endpoint", "test_id")
+
+# 時間索引の区間の幅（秒）
+INDEX_STEP_S = 1
+
+# 並べ替えた列を書き出す単位（要素数）
+COPY_BLOCK = 1 << 22
+
+METRIC = "http_req_duration"
+
+
+def iter_k6_samples(path, default_test_id=""):
+    """k6 の結果ファイルの http_req_duration を
+    (時刻[µs], レイテンシ[ms], ステータス, 失敗か, エンドポイント, VU, 試験項目ID) として順に返す"""
+
+    def sample(timestamp, value, tags):
+        status = tags.get("status") or "0"
+        endpoint = f"{tags.get('method', '')} {tags.get('name') or tags.get('url', '')}".strip()
+        return (round(parse_time(timestamp) * 1_000_000), float(value),
+                int(status) if status.isdigit() else 0,
+                _failed(tags.get("expected_response"), status), endpoint,
+                int(tags.get("vu") or 0), tags.get("test_id") or default_test_id)
+
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("metric_name") != METRIC:
+                    continue
+                # vu・test_id などの追加タグは extra_tags に "key=value&..." で入る
+                tags = dict(parse_qsl(row.get("extra_tags") or ""), **{k: v for k, v in row.items() if v})
+                yield sample(float(row["timestamp"]), row["metric_value"], tags)
+        else:
+            marker = f'"metric":"{METRIC}"'
+            for line in f:
+                if marker not in line or '"type":"Point"' not in line:
+                    continue
+                data = json.loads(line)["data"]
+                yield sample(data["time"], data["value"], data.get("tags") or {})
+
+
+class _ColumnSpool:
+    """変換中の列を一時ファイルに追記する（文字列は番号に置き換える）"""
+
+    def __init__(self, directory):
+        self.files = {name: open(os.path.join(directory, name), "wb") for name in COLUMNS}
+        self.paths = {name: f.name for name, f in self.files.items()}
+        self.strings = {name: {} for name in STRING_COLUMNS}
+        self.tests = {}
+        self.count = 0
+
+    def intern(self, name, values):
+        """文字列を列 name の文字列表の番号にする（表が列の dtype に収まらなければ ValueError）"""
+        table = self.strings[name]
+        ids = [table.setdefault(value, len(table)) for value in values]
+        if len(table) > np.iinfo(COLUMNS[name]).max + 1:
+            raise ValueError(f"too many distinct values for the {name} column")
+        return ids
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        arrays = {
+            "time_us": np.asarray(columns[0], dtype=np.int64),
+            "latency_ms": np.asarray(columns[1], dtype=np.float32),
+            "status": np.asarray(columns[2], dtype=np.uint16),
+            "failed": np.asarray(columns[3], dtype=bool),
+            "endpoint": np.asarray(self.intern("endpoint", columns[4]), dtype=np.uint32),
+            "vu": np.asarray(columns[5], dtype=np.uint32),
+            "test_id": np.asarray(self.intern("test_id", columns[6]), dtype=np.uint16),
+        }
+        for name, array in arrays.items():
+            array.astype(COLUMNS[name], copy=False).tofile(self.files[name])
+        # 試験項目IDごとの件数と時間帯
+        for test in np.unique(arrays["test_id"]):
+            times = arrays["time_us"][arrays["test_id"] == test]
+            stats = self.tests.setdefault(int(test), [0, int(times.min()), int(times.max())])
+            stats[0] += len(times)
+            stats[1] = min(stats[1], int(times.min()))
+            stats[2] = max(stats[2], int(times.max()))
+        self.count += len(rows)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def convert(sources, output):
+    """k6 の結果ファイル [(既定の試験項目ID, パス)] を1つのアーカイブに変換し、サンプル数を返す"""
+    directory = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(dir=directory) as spool_dir:
+        spool = _ColumnSpool(spool_dir)
+        try:
+            for test_id, path in sources:
+                rows = []
+                for sample in iter_k6_samples(path, test_id):
+                    rows.append(sample)
+                    if len(rows) >= CHUNK_LINES:
+                        spool.write(rows)
+                        rows = []
+                spool.write(rows)
+        finally:
+            spool.close()
+        if spool.count == 0:
+            raise ValueError(f"no {METRIC} samples in {', '.join(path for _, path in sources)}")
+
+        spooled = {name: np.memmap(spool.paths[name], dtype=COLUMNS[name], mode="r") for name in COLUMNS}
+        times = spooled["time_us"]
+        # k6 の出力は VU ごとの書き出しで時刻が前後するため、時刻順でなければ並べ替える
+        order = None if np.all(times[1:] >= times[:-1]) else np.argsort(times, kind="stable")
+        sorted_times = times if order is None else times[order]
+        index_start = int(sorted_times[0] // 1_000_000)
+        buckets = int(sorted_times[-1] // 1_000_000) - index_start + 1
+        bounds = (index_start + np.arange(buckets + 1) * INDEX_STEP_S) * 1_000_000
+        index = np.searchsorted(sorted_times, bounds, side="left").astype(np.int64)
+
+        strings = {name: sorted(table, key=table.get) for name, table in spool.strings.items()}
+        header = {
+            "version": 1,
+            "metric": METRIC,
+            "count": spool.count,
+            "strings": strings,
+            "tests": {strings["test_id"][test]: {"count": n, "start_us": first, "end_us": last}
+                      for test, (n, first, last) in sorted(spool.tests.items())},
+            "sources": [{"test_id": test_id, "path": os.path.abspath(path)} for test_id, path in sources],
+            "index": {"start_s": index_start, "step_s": INDEX_STEP_S},
+            "columns": {},
+        }
+        offset = 0
+        for name, dtype in (*COLUMNS.items(), ("index", "<i8")):
+            length = len(index) if name == "index" else spool.count
+            header["columns"][name] = {"dtype": dtype, "offset": offset, "length": length}
+            offset += -(-length * np.dtype(dtype).itemsize // DATA_ALIGN) * DATA_ALIGN
+
+        partial = output + ".tmp"
+        with open(partial, "wb") as f:
+            encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            f.write(MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+            data_start = _aligned(f.tell())
+            for name in (*COLUMNS, "index"):
+                f.seek(data_start + header["columns"][name]["offset"])
+                if name == "index":
+                    index.tofile(f)
+                    continue
+                column = spooled[name]
+                for start in range(0, spool.count, COPY_BLOCK):
+                    block = slice(start, start + COPY_BLOCK)
+                    np.asarray(column[block] if order is None else column[order[block]]).tofile(f)
+            f.truncate(data_start + offset)
+        del spooled, times, sorted_times
+        os.replace(partial, output)
+    return spool.count
+
+
+def _aligned(position):
+    return -(-position // DATA_ALIGN) * DATA_ALIGN
+
+
+class SampleArchive:
+    """アーカイブをメモリマップで開き、列を NumPy の配列ビューとして提供する"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: not a sample archive")
+            length = struct.unpack("<Q", f.read(8))[0]
+            self.header = json.loads(f.read(length))
+        data_start = _aligned(len(MAGIC) + 8 + length)
+        self.strings = self.header["strings"]
+        self.string_ids = {name: {value: i for i, value in enumerate(table)} for name, table in self.strings.items()}
+        self.tests = self.header["tests"]
+        self.columns = {}
+        for name, spec in self.header["columns"].items():
+            if spec["length"] == 0:
+                self.columns[name] = np.zeros(0, dtype=spec["dtype"])
+                continue
+            self.columns[name] = np.memmap(path, dtype=spec["dtype"], mode="r",
+                                           offset=data_start + spec["offset"], shape=(spec["length"],))
+
+    def __len__(self):
+        return self.header["count"]
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def decode(self, name, ids):
+        """列 name の文字列番号の配列を文字列の配列にする"""
+        return np.asarray(self.strings[name], dtype=object)[np.asarray(ids)]
+
+    def _position(self, t, side):
+        """時刻 t（UNIX 時刻、秒）のサンプル位置を時間索引で絞り込んでから二分探索する"""
+        index = self.columns["index"]
+        t_us = round(t * 1_000_000)
+        bucket = int((t_us // 1_000_000 - self.header["index"]["start_s"]) // self.header["index"]["step_s"])
+        if bucket < 0:
+            return 0
+        if bucket >= len(index) - 1:
+            return len(self)
+        lo, hi = int(index[bucket]), int(index[bucket + 1])
+        return lo + int(np.searchsorted(self.columns["time_us"][lo:hi], t_us, side=side))
+
+    def time_slice(self, start=None, end=None):
+        """時刻が start 以上 end 未満（UNIX 時刻、秒）のサンプルの範囲（slice）"""
+        lo = 0 if start is None else self._position(start, "left")
+        hi = len(self) if end is None else self._position(end, "left")
+        return slice(lo, max(lo, hi))
+
+    def select(self, start=None, end=None, test_id=None, endpoint=None, columns=None):
+        """条件に合うサンプルの列 {列名: 配列} を返す
+
+        時間帯だけの指定では複製しない配列ビューを返す。試験項目ID・エンドポイントを指定した場合は
+        試験項目の時間帯に絞り込んでから、一致する行だけを取り出す。
+        """
+        if test_id is not None:
+            test = self.tests.get(test_id)
+            if test is None:
+                return {name: self.columns[name][:0] for name in columns or COLUMNS}
+            start = max(start or 0, test["start_us"] / 1_000_000)
+            end = min(end or float("inf"), (test["end_us"] + 1) / 1_000_000)
+        rows = self.time_slice(start, end)
+        selected = {name: self.columns[name][rows] for name in columns or COLUMNS}
+
+        mask = None
+        for name, value in (("test_id", test_id), ("endpoint", endpoint)):
+            if value is None:
+                continue
+            matched = self.columns[name][rows] == self.string_ids[name].get(value, -1)
+            mask = matched if mask is None else mask & matched
+        if mask is not None and not mask.all():
+            selected = {name: array[mask] for name, array in selected.items()}
+        return selected
+
+    def iter_chunks(self, test_id=None, size=CHUNK_LINES):
+        """it2_timeseries.iter_k6_chunks と同じ (時刻[秒], レイテンシ[ms], 失敗か) の配列を size 件ずつ返す"""
+        selected = self.select(test_id=test_id, columns=("time_us", "latency_ms", "failed"))
+        for start in range(0, len(selected["time_us"]), size):
+            chunk = slice(start, start + size)
+            yield (selected["time_us"][chunk] / 1_000_000, selected["latency_ms"][chunk].astype(np.float64),
+                   np.asarray(selected["failed"][chunk]))
+
+
+def open_archive(path):
+    """<アーカイブ>[#<試験項目ID>] を開き、(アーカイブ, 試験項目ID（指定がなければ None）) を返す"""
+    path, _, test_id = path.partition("#")
+    return SampleArchive(path), test_id or None
+
+
+def breakdown(archive, selected, by, percentiles):
+    """列 by の値ごとの件数・エラー率・パーセンタイル [(値, 件数, エラー率, [パーセンタイル])]"""
+    keys = selected[by]
+    latency = selected["latency_ms"]
+    failed = selected["failed"]
+    order = np.argsort(keys, kind="stable")
+    values, starts = np.unique(keys[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    labels = archive.decode(by, values) if by in STRING_COLUMNS else values
+    result = []
+    for label, rows in zip(labels, groups):
+        result.append((label, len(rows), float(failed[rows].mean()),
+                       np.percentile(latency[rows], percentiles).tolist()))
+    return sorted(result, key=lambda r: r[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="k6 の生サンプルを列指向のアーカイブに変換・参照する")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="k6 の結果ファイルをアーカイブに変換する")
+    convert_parser.add_argument("runs", nargs="+", help="[<試験項目ID>=]<k6 結果ファイル（.json / .csv）>")
+    convert_parser.add_argument("-o", "--output", required=True, help=f"アーカイブ（{ARCHIVE_SUFFIX}）の出力先")
+
+    info_parser = commands.add_parser("info", help="アーカイブの概要を表示する")
+    info_parser.add_argument("archive", help="アーカイブのパス")
+
+    query_parser = commands.add_parser("query", help="時間帯・試験項目IDで絞り込んでパーセンタイルを求める")
+    query_parser.add_argument("archive", help="アーカイブのパス（<パス>#<試験項目ID> も可）")
+    query_parser.add_argument("--test-id", help="試験項目ID")
+    query_parser.add_argument("--endpoint", help="エンドポイント（\"GET /api/test-groups\" など）")
+    query_parser.add_argument("--from", dest="start", help="開始時刻（ISO 8601 / UNIX 時刻、試験項目の開始からの秒数は +秒）")
+    query_parser.add_argument("--to", dest="end", help="終了時刻（同上）")
+    query_parser.add_argument("--by", choices=("endpoint", "status", "vu", "test_id"), help="内訳を求める列")
+    query_parser.add_argument("--percentile", type=float, nargs="+", default=[50, 95, 99],
+                              help="求めるパーセンタイル（既定: 50 95 99）")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        started = time.perf_counter()
+        sources = []
+        for run in args.runs:
+            test_id, _, path = run.rpartition("=")
+            sources.append((test_id, path))
+        count = convert(sources, args.output)
+        print(f"Archived: {args.output} ({count} samples, {os.path.getsize(args.output) / 2 ** 20:.1f} MiB, "
+              f"{time.perf_counter() - started:.1f}s)")
+        return
+
+    started = time.perf_counter()
+    archive, test_id = open_archive(args.archive)
+    if args.command == "info":
+        print(f"{args.archive}: {len(archive)} samples, {len(archive.strings['endpoint'])} endpoint(s) "
+              f"(opened in {(time.perf_counter() - started) * 1000:.1f} ms)")
+        for name, test in archive.tests.items():
+            duration = (test["end_us"] - test["start_us"]) / 1_000_000
+            print(f"  {name or '(no test id)'}: {test['count']} samples, {duration:.0f}s from "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(test['start_us'] / 1_000_000))} UTC")
+        return
+
+    test_id = args.test_id or test_id
+    origin = archive.tests[test_id]["start_us"] / 1_000_000 if test_id in archive.tests else 0.0
+
+    def bound(value):
+        if value is None:
+            return None
+        return origin + float(value[1:]) if value.startswith("+") else parse_time(value)
+
+    selected = archive.select(bound(args.start), bound(args.end), test_id, args.endpoint)
+    count = len(selected["latency_ms"])
+    if count == 0:
+        print("No samples.")
+        return
+    labels = [f"p{p:g}" for p in args.percentile]
+    values = np.percentile(selected["latency_ms"], args.percentile)
+    print(f"{count} samples, error rate {selected['failed'].mean() * 100:.2f}%: "
+          + ", ".join(f"{label} {value:.1f}ms" for label, value in zip(labels, values))
+          + f" ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    if args.by:
+        for key, n, error_rate, values in breakdown(archive, selected, args.by, args.percentile):
+            key = str(key) or "-"
+            print(f"  {key:<40} {n:>9}  {error_rate * 100:5.2f}%  "
+                  + "  ".join(f"{label}={value:.1f}" for label, value in zip(labels, values)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験書 一括生成スクリプト
+マニフェストに列挙した文書をキューで順に生成し、中断後は未完了分から再開する
+
+マニフェスト形式（JSON）:
+    {
+      "output_dir": "out",            # 省略時はマニフェストと同じディレクトリ
+      "documents": [
+        {
+          "screen_id": "ST01",
+          "doc_name": "IT2_総合試験項目書_性能テスト",
+          "target_name": "システム全体（性能テスト）",
+          "items": "performance",     # ITEM_SOURCES の名前、または .json / .jsonl / .xlsx のパス
+          "test_type": "IT2-PT",
+          "filename": "IT2_総合試験項目書_性能テスト.xlsx",
+          "filter": {"type": "異常系"}  # 任意: major / medium / type / id_range [first, last]
+        }
+      ]
+    }
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from generate_it2_test_docs import ITEM_SOURCES, apply_item_filter, create_test_document
+from it2_reader import iter_workbook_items
+
+# マニフェストの各文書に必須のキー
+DOCUMENT_KEYS = ("screen_id", "doc_name", "target_name", "items", "test_type", "filename")
+
+# 文書の filter に指定できるキー
+FILTER_KEYS = ("major", "medium", "type", "id_range")
+
+
+def load_manifest(path):
+    """マニフェストを読み込み、(出力ディレクトリ, 文書リスト) を返す"""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    documents = manifest.get("documents", [])
+    for index, doc in enumerate(documents):
+        missing = [key for key in DOCUMENT_KEYS if key not in doc]
+        if missing:
+            raise ValueError(f"documents[{index}]: missing keys {', '.join(missing)}")
+        unknown = set(doc.get("filter", {})) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"documents[{index}]: unknown filter keys {', '.join(sorted(unknown))}")
+        if doc["items"] not in ITEM_SOURCES:
+            # ファイル指定の項目ソースはマニフェストからの相対パスで解決する
+            doc["items"] = os.path.join(base_dir, doc["items"])
+
+    output_dir = os.path.join(base_dir, manifest.get("output_dir", ""))
+    return output_dir, documents
+
+
+def iter_items(source):
+    """項目ソースから試験項目を順に返す（.jsonl は1行ずつ、.xlsx は既存の試験項目書から読み込む）"""
+    if source in ITEM_SOURCES:
+        yield from ITEM_SOURCES[source]()
+        return
+    if source.endswith(".xlsx"):
+        yield from iter_workbook_items(source)
+        return
+    with open(source, encoding="utf-8") as f:
+        if source.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def load_items(source):
+    """項目ソース（組み込み名 / .json / .jsonl / .xlsx）から試験項目を読み込む"""
+    return list(iter_items(source))
+
+
+def iter_document_items(doc):
+    """文書の項目ソースに filter を適用した試験項目を順に返す"""
+    return apply_item_filter(iter_items(doc["items"]), doc.get("filter"))
+
+
+def document_key(doc, output_path):
+    """文書の入力（マニフェスト記述と項目ソースの内容）と出力先から再開判定用のキーを求める"""
+    digest = hashlib.sha256(json.dumps(
+        dict(doc, output_path=os.path.abspath(output_path)), sort_keys=True, ensure_ascii=False,
+    ).encode("utf-8"))
+    if doc["items"] in ITEM_SOURCES:
+        items = ITEM_SOURCES[doc["items"]]()
+        digest.update(json.dumps(items, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    else:
+        with open(doc["items"], "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_progress(path):
+    """進捗ファイルから完了済みの文書キーを読み込む（書きかけの最終行は無視する）"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def document_args(doc, items, output_dir):
+    """マニフェストの文書記述を create_test_document の引数にする"""
+    args = {key: doc[key] for key in DOCUMENT_KEYS}
+    args.update(items=items, output_dir=output_dir)
+    return args
+
+
+def generate_document(doc, output_dir, validate=False):
+    """1文書を生成し、所要時間（秒）を返す（ワーカープロセスでも実行される）"""
+    started = time.perf_counter()
+    create_test_document(**document_args(doc, iter_document_items(doc), output_dir), validate=validate)
+    return time.perf_counter() - started
+
+
+def run_batch(manifest_path, output_dir=None, jobs=1, progress_path=None, restart=False, validate=False):
+    """マニフェストの文書を一括生成し、(文書ごとの所要時間 [(filename, 秒)], 失敗した文書 [(filename, エラー)]) を返す
+
+    validate を指定すると、各文書の保存前にレイアウトを検査する（問題があれば失敗として扱う）。
+    失敗した文書は進捗に記録しないため、次回の実行で生成し直す。1文書の失敗では残りの生成を止めない。
+    """
+    manifest_output_dir, documents = load_manifest(manifest_path)
+    output_dir = output_dir or manifest_output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    progress_path = progress_path or f"{manifest_path}.progress.jsonl"
+    if restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+    done = load_progress(progress_path)
+
+    queue = []
+    for doc in documents:
+        output_path = os.path.join(output_dir, doc["filename"])
+        key = document_key(doc, output_path)
+        # 完了済みでも出力ファイルが消えていれば生成し直す
+        if key in done and os.path.exists(output_path):
+            print(f"Skipped (done): {doc['filename']}")
+        else:
+            queue.append((key, doc))
+
+    timings = []
+    failures = []
+    with open(progress_path, "a", encoding="utf-8") as progress:
+
+        def record(key, doc, seconds):
+            # 完了した文書だけを記録し、クラッシュしても記録済み分は失われないようにする
+            progress.write(json.dumps(
+                {"key": key, "filename": doc["filename"], "seconds": round(seconds, 3)},
+                ensure_ascii=False,
+            ) + "\n")
+            progress.flush()
+            os.fsync(progress.fileno())
+            timings.append((doc["filename"], seconds))
+
+        def record_failure(doc, error):
+            print(f"Failed: {doc['filename']}: {error}")
+            failures.append((doc["filename"], str(error)))
+
+        if jobs <= 1:
+            # 単一プロセスではテンプレート等のキャッシュを全文書で共有する
+            for key, doc in queue:
+                try:
+                    seconds = generate_document(doc, output_dir, validate)
+                except Exception as e:
+                    record_failure(doc, e)
+                    continue
+                record(key, doc, seconds)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = {
+                    executor.submit(generate_document, doc, output_dir, validate): (key, doc)
+                    for key, doc in queue
+                }
+                # 失敗した文書があっても残りの結果を受け取り、完了した文書は進捗に記録する
+                for future in as_completed(futures):
+                    key, doc = futures[future]
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        record_failure(doc, e)
+                        continue
+                    record(key, doc, seconds)
+
+    return timings, failures
+
+
+def print_timing_summary(timings, failures=()):
+    """文書ごとの所要時間を降順で表示し、失敗した文書を列挙する"""
+    if failures:
+        print(f"\n=== Failed ({len(failures)} documents) ===")
+        for filename, error in failures:
+            print(f"{filename}: {error}")
+    if not timings:
+        if not failures:
+            print("\nNothing to generate.")
+        return
+    print("\n=== Timing summary ===")
+    width = max(len(filename) for filename, _ in timings)
+    for filename, seconds in sorted(timings, key=lambda t: t[1], reverse=True):
+        print(f"{filename:<{width}}  {seconds:8.3f}s")
+    total = sum(seconds for _, seconds in timings)
+    print(f"{'Total (' + str(len(timings)) + ' documents)':<{width}}  {total:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験書をマニフェストから一括生成する")
+    parser.add_argument("manifest", help="マニフェスト(JSON)のパス")
+    parser.add_argument("--output-dir", help="出力ディレクトリ（マニフェストの指定より優先）")
+    parser.add_argument("--jobs", type=int, default=1, help="並列ワーカー数（既定: 1）")
+    parser.add_argument("--progress", help="進捗ファイルのパス（既定: <manifest>.progress.jsonl）")
+    parser.add_argument("--restart", action="store_true", help="進捗を破棄して最初から生成する")
+    parser.add_argument("--validate", action="store_true", help="保存前に結合範囲・罫線の整合性を検査する")
+    args = parser.parse_args()
+
+    timings, failures = run_batch(args.manifest, args.output_dir, args.jobs, args.progress, args.restart, args.validate)
+    print_timing_summary(timings, failures)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
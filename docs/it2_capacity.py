@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 キャパシティ分析スクリプト
+同時接続テスト（LT-1/LT-2/LT-3: tests/load/lt-1-2-3-concurrent-list.js）の結果を同時ユーザ数の
+段階として束ね、Universal Scalability Law（USL）を当てはめて最大スループット・膝点・
+許容できる最大同時ユーザ数を推定する
+
+    X(N) = λN / (1 + σ(N-1) + κN(N-1))
+
+    λ: 1ユーザあたりのスループット、σ: 競合（直列化）、κ: コヒーレンシ（相互待ち）
+
+lt-1-2-3-concurrent-list.js は shared-iterations で VU 数と同じ回数しか実行しないため、
+経過時間からのスループットは起動時間に左右される。スループットは閉じた系の
+リトルの法則 X = N / (R + Z)（R: 平均レスポンスタイム、Z: 思考時間）で求める。
+
+N/X = (1 + σ(N-1) + κN(N-1)) / λ は 1/λ, σ/λ, κ/λ について線形なので、最小二乗法で解く。
+結果は負荷テストの試験書に「キャパシティ分析」シートとして追加する。
+"""
+
+import argparse
+import json
+import os
+from itertools import combinations
+
+import numpy as np
+import openpyxl
+
+from generate_it2_test_docs import (
+    BOLD_FONT, HEADER_ALIGNMENT, HEADER_FILL, HEADER_FONT, NORMAL_FONT, THIN_BORDER, WRAP_ALIGNMENT,
+    iter_test_items, to_test_item,
+)
+from it2_batch import iter_items
+from it2_timeseries import BIN_COUNT, bin_values, iter_k6_chunks, latency_bins
+
+SHEET_NAME = "キャパシティ分析"
+
+# 予測曲線を書き出す同時ユーザ数の上限（計測した最大ユーザ数、または最大点に対する倍率）
+CURVE_SCALE = 4
+
+# 予測曲線に含める最大点の上限（計測した最大ユーザ数に対する倍率。κ が非常に小さいと最大点が遠くなるため）
+PEAK_SCALE_LIMIT = 4
+
+
+def load_tier(path):
+    """k6 の結果（--summary-export の JSON / --out json= / --out csv=）から段階の計測値を求める"""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            try:
+                first = json.loads(f.readline())
+            except ValueError:
+                first = None
+            # --out json= は1行1レコード（"type" を持つ）、--summary-export は複数行の1オブジェクト
+            if not (isinstance(first, dict) and "type" in first):
+                f.seek(0)
+                metrics = json.load(f).get("metrics", {})
+                duration = metrics["http_req_duration"]
+                duration = duration.get("values", duration)
+                failed = metrics.get("http_req_failed", {})
+                failed = failed.get("values", failed)
+                requests = metrics.get("http_reqs", {})
+                requests = requests.get("values", requests)
+                vus = metrics.get("vus_max", {})
+                vus = vus.get("values", vus)
+                return {
+                    "requests": int(requests.get("count", 0)),
+                    "mean_ms": float(duration["avg"]),
+                    "p95_ms": float(duration["p(95)"]),
+                    "error_rate": float(failed.get("rate", failed.get("value", 0.0))),
+                    "vus": vus.get("max", vus.get("value")),
+                }
+
+    counts = np.zeros(BIN_COUNT, dtype=np.int64)
+    total = 0.0
+    errors = 0
+    for _, values, failed in iter_k6_chunks(path):
+        counts += np.bincount(latency_bins(values), minlength=BIN_COUNT)
+        total += float(values.sum())
+        errors += int(failed.sum())
+    requests = int(counts.sum())
+    if requests == 0:
+        raise ValueError(f"{path}: no http_req_duration samples")
+    p95 = bin_values()[np.searchsorted(np.cumsum(counts), np.ceil(requests * 0.95))]
+    return {"requests": requests, "mean_ms": total / requests, "p95_ms": float(p95),
+            "error_rate": errors / requests, "vus": None}
+
+
+def fit_usl(users, throughput):
+    """USL のパラメータ (λ, σ, κ) を最小二乗法で求める（σ, κ は 0 以上に制約）
+
+    段階が2つなら κ = 0（Amdahl の法則）として σ のみ、1つなら λ のみを求める。
+    """
+    n = np.asarray(users, dtype=np.float64)
+    y = n / np.asarray(throughput, dtype=np.float64)
+    columns = (np.ones_like(n), n - 1, n * (n - 1))
+    free = [1, 2][:max(0, len(n) - 1)]
+
+    # 負の係数が出たら、その係数を 0 に固定した組み合わせで解き直す（残差最小の解を採用）
+    best = None
+    for size in range(len(free), -1, -1):
+        for chosen in combinations(free, size):
+            used = [0, *chosen]
+            coef, *_ = np.linalg.lstsq(np.column_stack([columns[i] for i in used]), y, rcond=None)
+            if coef[0] <= 0 or (coef[1:] < 0).any():
+                continue
+            full = np.zeros(3)
+            full[used] = coef
+            residual = float(np.sum((np.column_stack(columns) @ full - y) ** 2))
+            if best is None or residual < best[0] - 1e-12:
+                best = (residual, full)
+        if best is not None:
+            break
+    if best is None:
+        raise ValueError("USL fit failed (throughput must be positive)")
+    a, b, c = best[1]
+    return 1 / a, b / a, c / a
+
+
+def usl_throughput(n, lam, sigma, kappa):
+    """USL による同時ユーザ数 n のスループット（req/s）"""
+    n = np.asarray(n, dtype=np.float64)
+    return lam * n / (1 + sigma * (n - 1) + kappa * n * (n - 1))
+
+
+def capacity(tiers, threshold_ms, think_time_ms=0.0):
+    """段階ごとの計測値から USL を当てはめ、キャパシティの推定値を返す"""
+    tiers = sorted(tiers, key=lambda tier: tier["users"])
+    users = np.array([tier["users"] for tier in tiers], dtype=np.float64)
+    mean_s = np.array([tier["mean_ms"] for tier in tiers]) / 1000
+    throughput = users / (mean_s + think_time_ms / 1000)
+    lam, sigma, kappa = fit_usl(users, throughput)
+
+    predicted = usl_throughput(users, lam, sigma, kappa)
+    spread = np.sum((throughput - throughput.mean()) ** 2)
+    r2 = 1 - float(np.sum((throughput - predicted) ** 2) / spread) if spread > 0 else 1.0
+
+    # スループットが最大になる同時ユーザ数（κ = 0 なら頭打ちのみで最大点はない）
+    peak_users = float(np.sqrt((1 - sigma) / kappa)) if kappa > 0 and sigma < 1 else None
+    ceiling = float(usl_throughput(peak_users, lam, sigma, kappa)) if peak_users else (
+        lam / sigma if sigma > 0 else None)
+
+    # 最大点が計測範囲から遠い（κ がほぼ 0）場合は、曲線を計測範囲の CURVE_SCALE 倍までにとどめる
+    bounded = peak_users is not None and peak_users <= users.max() * PEAK_SCALE_LIMIT
+    limit = int(np.ceil((peak_users if bounded else users.max()) * CURVE_SCALE))
+    grid = np.arange(1, max(limit, int(users.max())) + 1)
+    curve = usl_throughput(grid, lam, sigma, kappa)
+    # p95 は平均レスポンスタイムに計測値の p95/平均 の比を掛けて予測する
+    p95_ratio = float(np.mean([tier["p95_ms"] / tier["mean_ms"] for tier in tiers]))
+    curve_p95 = (grid / curve - think_time_ms / 1000) * 1000 * p95_ratio
+
+    # 膝点: 正規化したスループット曲線と、始点と最大点を結ぶ直線との差が最大になる点（Kneedle）
+    # 曲線内に最大点がなければ、膝点は曲線の範囲の取り方で決まってしまうため推定しない（None）
+    knee = None
+    if bounded:
+        end = int(np.argmax(curve)) + 1
+        x = (grid[:end] - 1) / max(grid[end - 1] - 1, 1)
+        y = (curve[:end] - curve[0]) / max(curve[end - 1] - curve[0], 1e-12)
+        knee = int(grid[int(np.argmax(y - x))]) if end > 2 else int(grid[end - 1])
+
+    # 許容できる最大同時ユーザ数: 予測 p95 が閾値以内で、スループットが低下し始める前
+    # 曲線の端まで閾値以内なら上限は推定できない（None。曲線の端のユーザ数を超えるとだけ言える）
+    within = (curve_p95 <= threshold_ms) & (grid <= (peak_users or np.inf))
+    max_users = None if within[-1] else int(grid[within].max()) if within.any() else 0
+
+    for tier, x_measured, x_model in zip(tiers, throughput, predicted):
+        tier["throughput_rps"] = float(x_measured)
+        tier["model_rps"] = float(x_model)
+    return {
+        "lambda": lam,
+        "sigma": sigma,
+        "kappa": kappa,
+        "r2": r2,
+        "peak_users": peak_users,
+        "max_throughput_rps": ceiling,
+        "knee_users": knee,
+        "max_users": max_users,
+        "threshold_ms": threshold_ms,
+        "think_time_ms": think_time_ms,
+        "p95_ratio": p95_ratio,
+        "tiers": tiers,
+        "curve": {"users": grid.tolist(), "throughput_rps": curve.tolist(), "p95_ms": curve_p95.tolist()},
+    }
+
+
+def format_max_users(result):
+    """許容最大同時ユーザ数（予測範囲内で上限に達しなければ「<曲線の端>超」）"""
+    if result["max_users"] is None:
+        return f"{result['curve']['users'][-1]}超"
+    return result["max_users"]
+
+
+def write_capacity_sheet(path, result, sheet_name=SHEET_NAME):
+    """負荷テストの試験書にキャパシティ分析シートを追加する（既存のシートは置き換える）"""
+    wb = openpyxl.load_workbook(path)
+    if sheet_name in wb.sheetnames:
+        del wb[sheet_name]
+    ws = wb.create_sheet(sheet_name)
+
+    def header(row, labels):
+        for col, label in enumerate(labels, start=1):
+            cell = ws.cell(row=row, column=col, value=label)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            cell.border = THIN_BORDER
+
+    def values(row, row_values, number_formats=None):
+        for col, value in enumerate(row_values, start=1):
+            cell = ws.cell(row=row, column=col, value=value)
+            cell.font = NORMAL_FONT
+            cell.alignment = WRAP_ALIGNMENT
+            cell.border = THIN_BORDER
+            if number_formats and col in number_formats:
+                cell.number_format = number_formats[col]
+
+    # 計測した段階
+    header(1, ["試験項目ID", "同時ユーザ数", "リクエスト数", "平均(ms)", "p95(ms)", "エラー率",
+               "スループット(req/s)", "USL予測(req/s)"])
+    row = 2
+    for tier in result["tiers"]:
+        values(row, [tier["test_id"], tier["users"], tier["requests"], tier["mean_ms"], tier["p95_ms"],
+                     tier["error_rate"], tier["throughput_rps"], tier["model_rps"]],
+               {4: "0", 5: "0", 6: "0.00%", 7: "0.00", 8: "0.00"})
+        row += 1
+
+    # 推定結果
+    row += 1
+    header(row, ["項目", "値", "説明"])
+    estimates = [
+        ("λ", result["lambda"], "0.0000", "1ユーザあたりのスループット(req/s)"),
+        ("σ（競合）", result["sigma"], "0.0000", "直列化による損失"),
+        ("κ（コヒーレンシ）", result["kappa"], "0.000000", "相互待ちによる損失"),
+        ("決定係数", result["r2"], "0.000", "計測スループットに対する当てはまり"),
+        ("最大スループット(req/s)", result["max_throughput_rps"], "0.00", "USLによる上限"),
+        ("最大スループット時の同時ユーザ数", result["peak_users"], "0.0", "これを超えるとスループットが低下する"),
+        ("膝点（同時ユーザ数）", result["knee_users"], "0", "ユーザ増加に対するスループットの伸びが鈍り始める点"
+         if result["knee_users"] is not None else "スループットの最大点が予測範囲にないため推定不可"),
+        ("許容最大同時ユーザ数", format_max_users(result), "0",
+         f"予測p95が{result['threshold_ms']:.0f}ms以内かつスループット低下前の最大値"),
+    ]
+    for label, value, number_format, description in estimates:
+        row += 1
+        values(row, [label, value if value is not None else "-", description], {2: number_format})
+        ws.cell(row=row, column=1).font = BOLD_FONT
+
+    # 予測曲線
+    row += 2
+    header(row, ["同時ユーザ数", "予測スループット(req/s)", "予測p95(ms)"])
+    curve = result["curve"]
+    for users, x, p95 in zip(curve["users"], curve["throughput_rps"], curve["p95_ms"]):
+        row += 1
+        values(row, [users, x, p95], {2: "0.00", 3: "0"})
+
+    ws.column_dimensions["A"].width = 34.0
+    ws.column_dimensions["B"].width = 22.0
+    ws.column_dimensions["C"].width = 50.0
+    for col_letter in "DEFGH":
+        ws.column_dimensions[col_letter].width = 16.0
+
+    wb.save(path)
+    return ws
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同時接続テストの段階ごとの結果に USL を当てはめ、キャパシティを推定する")
+    parser.add_argument("runs", nargs="+",
+                        help="<試験項目ID>=<k6 結果ファイル（--summary-export の JSON / --out json= / --out csv=）>")
+    parser.add_argument("--source", default="load", help="同時ユーザ数を求める項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx、既定: load）")
+    parser.add_argument("--screen-id", default="ST02", help="ID採番に使う画面ID（既定: ST02）")
+    parser.add_argument("--test-type", default="IT2-LT", help="ID採番に使う試験種別（既定: IT2-LT）")
+    parser.add_argument("--threshold", type=float, default=3000.0, help="許容する p95 レスポンスタイム（ms、既定: 3000）")
+    parser.add_argument("--think-time", type=float, default=0.0, help="1リクエストごとの思考時間（ms、既定: 0）")
+    parser.add_argument("--json", help="推定結果を書き出す JSON のパス")
+    parser.add_argument("--workbook", help="キャパシティ分析シートを追加する負荷テストの試験書(xlsx)のパス")
+    args = parser.parse_args()
+
+    # 同時ユーザ数は試験項目のデータ規模（users）、なければ k6 の vus_max
+    users = {test_id: dict(to_test_item(item).dataset).get("users")
+             for test_id, item in iter_test_items(iter_items(args.source), args.screen_id, args.test_type)}
+    tiers = []
+    for run in args.runs:
+        test_id, _, path = run.partition("=")
+        if not path:
+            parser.error(f"invalid run (expected <test_id>=<path>): {run}")
+        tier = load_tier(path)
+        tier["users"] = users.get(test_id) or tier.pop("vus")
+        tier.pop("vus", None)
+        if not tier["users"]:
+            parser.error(f"{test_id}: concurrency unknown (no dataset users / vus_max)")
+        tiers.append(dict(test_id=test_id, source=os.path.abspath(path), **tier))
+
+    result = capacity(tiers, args.threshold, args.think_time)
+    peak = f"{result['peak_users']:.1f}" if result["peak_users"] else "-"
+    knee = result["knee_users"] if result["knee_users"] is not None else "-"
+    max_users = result["max_users"] if result["max_users"] is not None else f"> {result['curve']['users'][-1]}"
+    print(f"USL: λ={result['lambda']:.4f} σ={result['sigma']:.4f} κ={result['kappa']:.6f} (R²={result['r2']:.3f})")
+    print(f"Peak users: {peak}, knee: {knee}, max users (p95<={args.threshold:.0f}ms): {max_users}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.workbook:
+        write_capacity_sheet(args.workbook, result)
+        print(f"Exported: {args.workbook} ({SHEET_NAME})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 サーバ側メトリクス突合スクリプト
+CloudWatch からエクスポートしたメトリクス（CPU・メモリ使用率、RDS 接続数など）を
+k6 の計測結果の時間軸にそろえ、負荷テストの試験項目ごとにサーバ側の証跡を求める
+
+    ・計測期間中のメトリクスの平均・最大（最大となった時刻）と上限超過の点数
+    ・メトリクスとレイテンシ（p95）・スループットの相関係数
+
+対応するエクスポート形式
+    ・aws cloudwatch get-metric-data の出力（MetricDataResults）
+    ・aws cloudwatch get-metric-statistics の出力（Datapoints。Maximum があれば最大値に使う）
+    ・CSV（先頭行が見出し、時刻の列と数値の列。コンソールの「CSV としてダウンロード」など）
+    メトリクス名は Label（なければ Id）または CSV の見出し。<接頭辞>=<パス> で "rds.CPUUtilization" のように区別できる。
+
+CloudWatch のデータポイントは時刻から期間（データポイントの間隔）分を表す。
+k6 の計測結果は it2_timeseries と同じ時間窓 × 対数ビンのヒストグラムに集計し、
+    ・時間窓を、その時刻を含むデータポイントに searchsorted で対応付けて共通の時間軸（時間窓）にそろえる
+    ・相関はデータポイントごとにヒストグラムを合算して p95・スループットを求め、メトリクスの値と比べる
+結果は試験項目IDごとに JSON と試験書の備考セル（【サーバ側メトリクス】）へ書き出す。
+"""
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from generate_it2_test_docs import annotate_item_notes
+from it2_sql_time import parse_time
+from it2_timeseries import PERCENTILES, WindowedHistogram, iter_k6_chunks, rolling_percentiles, write_series
+
+# 備考に書き込むセクションの見出し
+NOTE_HEADING = "サーバ側メトリクス"
+
+# 既定の上限（PERFORMANCE_TEST_GUIDE.md「CloudWatchによるサーバー側監視」の異常の目安）
+METRIC_LIMITS = {"CPUUtilization": 80.0, "MemoryUtilization": 80.0}
+
+# 値として使う統計（get-metric-statistics、先にあるものを優先）
+STATISTIC_KEYS = ("Average", "Maximum", "Sum", "Minimum", "SampleCount")
+
+# CSV の時刻の列として扱う見出し（小文字、なければ先頭列）
+TIME_COLUMNS = ("timestamp", "timestamps", "time", "datetime", "date", "label")
+
+# 単位ごとの表示
+UNIT_SUFFIXES = {"Percent": "%", "Bytes": "B", "Seconds": "s", "Milliseconds": "ms"}
+
+# 相関係数を求める最小のデータポイント数
+MIN_CORRELATION_POINTS = 3
+
+
+def metric_time(value, utc_offset=0.0):
+    """メトリクスの時刻を UNIX 時刻（秒）にする（タイムゾーンのない時刻は UTC+utc_offset 時間とみなす）"""
+    if isinstance(value, str) and utc_offset:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return parse_time(value)
+        if parsed.tzinfo is None:
+            return parsed.replace(tzinfo=timezone(timedelta(hours=utc_offset))).timestamp()
+        return parsed.timestamp()
+    return parse_time(value)
+
+
+def make_metric(name, times, values, unit="", peaks=None):
+    """メトリクス {name, times, values, peaks, unit, period} を作る（時刻順に並べ、欠損を除く）"""
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    peaks = values if peaks is None else np.asarray(peaks, dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    times, values, peaks = times[order], values[order], peaks[order]
+    valid = ~np.isnan(values)
+    times, values, peaks = times[valid], values[valid], np.where(np.isnan(peaks[valid]), values[valid], peaks[valid])
+    if not unit and name.endswith("Utilization"):
+        unit = "Percent"
+    # データポイントの期間は時刻の間隔の中央値（1点しかなければ CloudWatch の標準の60秒）
+    period = float(np.median(np.diff(times))) if len(times) > 1 else 60.0
+    return {"name": name, "times": times, "values": values, "peaks": peaks, "unit": unit, "period": period}
+
+
+def _json_metrics(data, prefix, utc_offset):
+    """get-metric-data / get-metric-statistics の出力からメトリクスを取り出す"""
+    if isinstance(data, list):
+        for entry in data:
+            yield from _json_metrics(entry, prefix, utc_offset)
+        return
+    for result in data.get("MetricDataResults", []):
+        times = [metric_time(t, utc_offset) for t in result.get("Timestamps", [])]
+        yield make_metric(prefix + (result.get("Label") or result["Id"]), times, result.get("Values", []))
+    if "Datapoints" in data:
+        points = data["Datapoints"]
+        key = next((k for k in STATISTIC_KEYS if any(k in p for p in points)), None)
+        if key is None:
+            return
+        times = [metric_time(p["Timestamp"], utc_offset) for p in points]
+        values = [p.get(key, np.nan) for p in points]
+        peaks = [p.get("Maximum", np.nan) for p in points] if key != "Maximum" else None
+        unit = next((p["Unit"] for p in points if "Unit" in p), "")
+        yield make_metric(prefix + data.get("Label", "metric"), times, values, unit, peaks)
+
+
+def _csv_metrics(f, prefix, utc_offset):
+    """見出し付き CSV の数値の列をメトリクスとして取り出す"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if not header:
+        return
+    names = [name.strip() for name in header]
+    time_col = next((i for i, name in enumerate(names) if name.lower() in TIME_COLUMNS), 0)
+    times = []
+    columns = {i: [] for i in range(len(names)) if i != time_col}
+    for row in reader:
+        if not row or not row[time_col].strip():
+            continue
+        times.append(metric_time(row[time_col].strip(), utc_offset))
+        for i, values in columns.items():
+            try:
+                values.append(float(row[i]))
+            except (IndexError, ValueError):
+                values.append(np.nan)
+    for i, values in columns.items():
+        if not np.all(np.isnan(values)):
+            yield make_metric(prefix + names[i], times, values)
+
+
+def load_metric_file(path, prefix="", utc_offset=0.0):
+    """CloudWatch のエクスポート（.json / .csv）からメトリクスのリストを読み込む"""
+    prefix = f"{prefix}." if prefix else ""
+    with open(path, encoding="utf-8-sig") as f:
+        if path.endswith(".csv"):
+            metrics = list(_csv_metrics(f, prefix, utc_offset))
+        else:
+            metrics = list(_json_metrics(json.load(f), prefix, utc_offset))
+    if not metrics:
+        raise ValueError(f"{path}: no metrics found")
+    return metrics
+
+
+def load_run(path, step):
+    """k6 の結果ファイルを時間窓ごとのヒストグラムに集計する"""
+    histogram = WindowedHistogram(step)
+    for times, values, failed in iter_k6_chunks(path):
+        histogram.add(times, values, failed)
+    hist, errors, start = histogram.trimmed()
+    if len(hist) == 0:
+        raise ValueError(f"{path}: no http_req_duration samples")
+    return {"hist": hist, "errors": errors, "start": start, "step": step, "end": start + len(hist) * step}
+
+
+def join_windows(window_times, metric):
+    """時間窓の開始時刻ごとに、その時刻を含むデータポイントの番号を返す（なければ -1）"""
+    times = metric["times"]
+    if len(times) == 0:
+        # データのないメトリクス（ディメンションの誤りや無通信の期間で CloudWatch が空で返す）
+        return np.full(len(window_times), -1)
+    index = np.searchsorted(times, window_times, side="right") - 1
+    covered = (index >= 0) & (window_times < times[np.maximum(index, 0)] + metric["period"])
+    return np.where(covered, index, -1)
+
+
+def pearson(x, y):
+    """相関係数（点数が足りない・どちらかが一定の場合は None）"""
+    if len(x) < MIN_CORRELATION_POINTS or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def correlate(run, metric, limit=None):
+    """1回の計測と1つのメトリクスを突合し、(結果, 共通の時間軸にそろえたメトリクスの値) を返す"""
+    step = run["step"]
+    window_times = run["start"] + np.arange(len(run["hist"])) * step
+    index = join_windows(window_times, metric)
+    aligned = np.full(len(window_times), np.nan)
+    aligned[index >= 0] = metric["values"][index[index >= 0]]
+
+    times = metric["times"]
+    during = (times + metric["period"] > run["start"]) & (times < run["end"])
+    result = {"metric": metric["name"], "unit": metric["unit"], "period_s": metric["period"],
+              "points": int(during.sum())}
+    if not during.any():
+        return result, aligned
+
+    values, peaks = metric["values"][during], metric["peaks"][during]
+    peak = int(np.argmax(peaks))
+    result.update(
+        average=float(values.mean()),
+        peak=float(peaks[peak]),
+        peak_offset_s=float(max(times[during][peak] - run["start"], 0.0)),
+    )
+    if limit is not None:
+        result.update(limit=limit, over_limit=int((peaks > limit).sum()))
+
+    # データポイントごとに時間窓のヒストグラムを合算する（時間窓は時刻順なので番号は単調増加）
+    joined = index >= 0
+    if joined.any():
+        points, starts = np.unique(index[joined], return_index=True)
+        hist = np.add.reduceat(run["hist"][joined], starts, axis=0)
+        windows = np.diff(np.append(starts, joined.sum()))
+        requests = hist.sum(axis=1)
+        busy = requests > 0
+        p95 = rolling_percentiles(hist[busy], 1)[PERCENTILES.index(95)]
+        rps = requests[busy] / (windows[busy] * step)
+        series = metric["values"][points[busy]]
+        result.update(r_p95=pearson(series, p95), r_rps=pearson(series, rps))
+    return result, aligned
+
+
+def format_value(value, unit):
+    suffix = UNIT_SUFFIXES.get(unit, "")
+    return f"{value:.1f}{suffix}" if suffix == "%" or abs(value) < 100 else f"{value:,.0f}{suffix}"
+
+
+def format_evidence(results):
+    """1つの試験項目のメトリクスごとの結果を備考に書き込む文字列にする"""
+    lines = []
+    for result in results:
+        if "average" not in result:
+            lines.append(f"{result['metric']}: 計測期間のデータなし")
+            continue
+        unit = result["unit"]
+        line = (f"{result['metric']}: 平均 {format_value(result['average'], unit)} / "
+                f"最大 {format_value(result['peak'], unit)}（{result['peak_offset_s'] / 60:.1f}分）")
+        if "limit" in result:
+            line += (f"、上限 {format_value(result['limit'], unit)} 超過 {result['over_limit']}点"
+                     if result["over_limit"] else f"、上限 {format_value(result['limit'], unit)} 以内")
+        correlations = [f"{label} r={result[key]:+.2f}" for key, label in (("r_p95", "p95"), ("r_rps", "スループット"))
+                        if result.get(key) is not None]
+        if correlations:
+            line += f"（相関 {', '.join(correlations)}）"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_assignments(values, convert=str):
+    """<名前>=<値> の並びを dict にする"""
+    result = {}
+    for value in values or []:
+        name, sep, rest = value.partition("=")
+        if not sep:
+            raise ValueError(f"expected <name>=<value>: {value}")
+        result[name] = convert(rest)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CloudWatch のメトリクスを負荷テストの計測結果と突合し、試験項目IDごとに書き出す")
+    parser.add_argument("runs", nargs="+", help="<試験項目ID>=<k6 結果ファイル（.json / .csv）>")
+    parser.add_argument("--metrics", nargs="+", required=True,
+                        help="CloudWatch のエクスポート（.json / .csv）。[<接頭辞>=]<パス>")
+    parser.add_argument("--step", type=float, default=5.0, help="時間窓の幅（秒、既定: 5）")
+    parser.add_argument("--utc-offset", type=float, default=0.0,
+                        help="メトリクスのタイムゾーンのない時刻の UTC からの時差（時間、JST は 9、既定: 0）")
+    parser.add_argument("--limit", action="append",
+                        help="上限 <メトリクス名>=<値>（複数指定可、既定: CPUUtilization / MemoryUtilization = 80）")
+    parser.add_argument("--json", help="試験項目IDごとの突合結果を書き出す JSON のパス")
+    parser.add_argument("--series-dir", help="時間窓ごとの負荷とメトリクスを <試験項目ID>.csv として書き出すディレクトリ")
+    parser.add_argument("--workbook", help="備考を書き込む試験書(xlsx)のパス")
+    args = parser.parse_args()
+
+    try:
+        runs = parse_assignments(args.runs)
+        limits = dict(METRIC_LIMITS, **parse_assignments(args.limit, float))
+    except ValueError as e:
+        parser.error(str(e))
+    metrics = []
+    for spec in args.metrics:
+        prefix, _, path = spec.rpartition("=")
+        metrics += load_metric_file(path, prefix, args.utc_offset)
+    print(f"Loaded {len(metrics)} metric(s): {', '.join(m['name'] for m in metrics)}")
+
+    evidence = {}
+    for test_id, path in runs.items():
+        run = load_run(path, args.step)
+        results = []
+        series = {"t_s": np.arange(len(run["hist"])) * run["step"], "requests": run["hist"].sum(axis=1)}
+        for metric in metrics:
+            # 上限は接頭辞を除いたメトリクス名でも指定できる
+            limit = limits.get(metric["name"], limits.get(metric["name"].rpartition(".")[2]))
+            result, aligned = correlate(run, metric, limit)
+            results.append(result)
+            series[metric["name"]] = aligned
+        evidence[test_id] = {"source": os.path.abspath(path), "start": run["start"],
+                             "duration_s": run["end"] - run["start"], "metrics": results}
+        covered = sum(1 for result in results if "average" in result)
+        print(f"{test_id}: {run['end'] - run['start']:.0f}s, {covered}/{len(results)} metric(s) overlap the run")
+        if args.series_dir:
+            os.makedirs(args.series_dir, exist_ok=True)
+            write_series(os.path.join(args.series_dir, f"{test_id}.csv"), series)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(evidence, f, ensure_ascii=False, indent=2)
+        print(f"Exported: {args.json}")
+    if args.workbook:
+        notes = {test_id: format_evidence(entry["metrics"]) for test_id, entry in evidence.items()}
+        missing = annotate_item_notes(args.workbook, notes, NOTE_HEADING)
+        for test_id in sorted(missing):
+            print(f"Not found in workbook: {test_id}")
+        print(f"Annotated: {args.workbook}")
+
+
+if __name__ == "__main__":
+    main()
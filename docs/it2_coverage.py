@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 API カバレッジ索引生成スクリプト
+試験項目の設計仕様（spec）からエンドポイントを抽出して試験項目IDと対応付け、
+docs/swagger.yml の全エンドポイントと突き合わせた索引を生成する
+
+設計仕様のエンドポイントは次の2通りで求める。
+    ・「GET /api/test-groups/[groupId]」のような明示（it2_sql_time.SPEC_ENDPOINT）
+    ・「テスト集計API」のような API 名（SPEC_API_ALIASES で swagger.yml のエンドポイントに対応付け）
+
+出力:
+    JSON  エンドポイント → 試験項目ID、試験項目ID → エンドポイント、
+          swagger.yml にないエンドポイント、エンドポイントを特定できない試験項目
+    xlsx  「APIカバレッジ」シート（エンドポイントごとの試験種別別の試験項目ID）
+"""
+
+import argparse
+import json
+import os
+import re
+
+import openpyxl
+
+from generate_it2_test_docs import (
+    DEFAULT_DOCUMENTS, HEADER_ALIGNMENT, HEADER_FILL, HEADER_FONT, NORMAL_FONT, THIN_BORDER,
+    WRAP_ALIGNMENT, iter_test_items, to_test_item,
+)
+from it2_batch import iter_document_items, iter_items, load_manifest
+from it2_sql_time import SPEC_ENDPOINT
+
+SWAGGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "swagger.yml")
+
+# swagger.yml の servers の共通パス（paths はこれを除いた形で記述されている）
+API_PREFIX = "/api"
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+
+SHEET_NAME = "APIカバレッジ"
+
+# 設計仕様の API 名 → エンドポイント（swagger.yml の記法）
+#   設計仕様の「・」行を「、」で区切った語と完全一致したものだけを対応付ける
+SPEC_API_ALIASES = {
+    "テストグループ一覧": ("GET /test-groups",),
+    "テストグループ一覧API": ("GET /test-groups",),
+    "テストグループCRUD API": (
+        "GET /test-groups", "POST /test-groups", "GET /test-groups/{groupId}",
+        "PUT /test-groups/{groupId}", "DELETE /test-groups/{groupId}",
+    ),
+    "テストグループ複製API": ("POST /test-groups/{groupId}",),
+    "テストケース一覧": ("GET /test-groups/{groupId}/cases",),
+    "テストケース一覧API": ("GET /test-groups/{groupId}/cases",),
+    "テストケース編集API": ("GET /test-groups/{groupId}/cases/{tid}", "PUT /test-groups/{groupId}/cases/{tid}"),
+    "テスト結果入力API": ("POST /test-groups/{groupId}/cases/{tid}/results",),
+    "テスト結果履歴API": ("GET /test-groups/{groupId}/cases/{tid}/results",),
+    "集計": ("GET /test-groups/{groupId}/report-data",),
+    "テスト集計API": ("GET /test-groups/{groupId}/report-data",),
+    "ファイルアップロード": ("POST /files/test-info", "POST /files/evidences"),
+    "ファイルアップロードAPI": ("POST /files/test-info", "POST /files/evidences"),
+    "ファイル参照API": ("POST /files/url",),
+    "テストケースインポートバッチ": ("POST /batch/upload-url", "POST /batch/test-import", "GET /batch/status/{jobId}"),
+    "ユーザインポートバッチ": ("POST /batch/upload-url", "POST /batch/user-import", "GET /batch/status/{jobId}"),
+    "インポート結果API": ("GET /import-results", "GET /import-results/{importResultId}"),
+    "認証API": ("GET /auth/[...nextauth]",),
+    "NextAuth.jsセッション管理": ("GET /auth/[...nextauth]",),
+    "ユーザ管理API": (
+        "GET /users", "POST /users", "GET /users/{userId}", "PUT /users/{userId}", "DELETE /users/{userId}",
+    ),
+}
+
+# パス引数（{groupId} / [groupId]）を同一視するための正規表現
+PATH_PARAM = re.compile(r"\{[^}]*\}|\[(?!\.\.\.)[^\]]*\]")
+
+SWAGGER_PATH_LINE = re.compile(r"^  (/\S*):\s*$")
+SWAGGER_METHOD_LINE = re.compile(r"^    (" + "|".join(HTTP_METHODS) + r"):\s*$")
+SWAGGER_SUMMARY_LINE = re.compile(r"^      summary:\s*(.*?)\s*$")
+SWAGGER_TAG_LINE = re.compile(r"^        - (.*?)\s*$")
+
+
+def endpoint_key(method, path):
+    """メソッドとパスから照合用のキーにする（/api を除き、パス引数の名前と記法を無視する）"""
+    if path.startswith(API_PREFIX + "/"):
+        path = path[len(API_PREFIX):]
+    return f"{method.upper()} {PATH_PARAM.sub('{}', path.rstrip('/') or '/')}"
+
+
+def load_openapi_operations(path=SWAGGER_PATH):
+    """swagger.yml の paths から操作 [{"method", "path", "summary", "tag"}] を記述順に返す
+
+    paths は「2字下げのパス → 4字下げのメソッド → 6字下げの summary / tags」の構造のみを読む。
+    """
+    operations = []
+    in_paths = False
+    current_path = operation = None
+    in_tags = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line[0].isspace():
+                in_paths = line.startswith("paths:")
+                continue
+            if not in_paths:
+                continue
+            m = SWAGGER_PATH_LINE.match(line)
+            if m:
+                current_path, operation = m.group(1), None
+                continue
+            m = SWAGGER_METHOD_LINE.match(line)
+            if m and current_path:
+                operation = {"method": m.group(1).upper(), "path": current_path, "summary": "", "tag": ""}
+                operations.append(operation)
+                in_tags = False
+                continue
+            if operation is None:
+                continue
+            if line.startswith("      ") and not line.startswith("       "):
+                in_tags = line.strip() == "tags:"
+                m = SWAGGER_SUMMARY_LINE.match(line)
+                if m:
+                    operation["summary"] = m.group(1).strip("'\"")
+            elif in_tags and not operation["tag"]:
+                m = SWAGGER_TAG_LINE.match(line)
+                if m:
+                    operation["tag"] = m.group(1)
+    return operations
+
+
+def spec_endpoints(spec):
+    """設計仕様から (メソッド, パス, 抽出方法) を重複なく返す（抽出方法は explicit / alias）"""
+    found = {}
+    for method, path in SPEC_ENDPOINT.findall(spec or ""):
+        found.setdefault(endpoint_key(method, path), (method, path, "explicit"))
+    for line in (spec or "").split("\n"):
+        for term in line.lstrip("・").split("、"):
+            for endpoint in SPEC_API_ALIASES.get(term.strip(), ()):
+                method, path = endpoint.split(" ", 1)
+                found.setdefault(endpoint_key(method, path), (method, API_PREFIX + path, "alias"))
+    return found
+
+
+def build_index(catalogs, swagger_path=SWAGGER_PATH):
+    """試験種別ごとの試験項目と swagger.yml から索引を作る
+
+    catalogs は [(試験種別, 画面ID, 試験項目の反復可能オブジェクト)]。
+    """
+    operations = load_openapi_operations(swagger_path)
+    endpoints = {}
+    by_key = {}
+    for operation in operations:
+        name = f"{operation['method']} {API_PREFIX}{operation['path']}"
+        endpoints[name] = dict(summary=operation["summary"], tag=operation["tag"], tests={})
+        by_key[endpoint_key(operation["method"], operation["path"])] = name
+
+    items = {}
+    undocumented = {}
+    unmapped = []
+    test_types = []
+    for test_type, screen_id, catalog in catalogs:
+        if test_type not in test_types:
+            test_types.append(test_type)
+        for test_id, item in iter_test_items(catalog, screen_id, test_type):
+            item = to_test_item(item)
+            found = spec_endpoints(item.spec)
+            if not found:
+                unmapped.append({"test_id": test_id, "test_type": test_type, "major": item.major,
+                                 "minor": item.minor})
+                continue
+            hits = []
+            for key, (method, path, source) in found.items():
+                name = by_key.get(key)
+                if name is None:
+                    name = f"{method} {path}"
+                    undocumented.setdefault(name, []).append(test_id)
+                else:
+                    endpoints[name]["tests"].setdefault(test_type, []).append(test_id)
+                hits.append({"endpoint": name, "source": source, "documented": key in by_key})
+            items[test_id] = {"test_type": test_type, "major": item.major, "minor": item.minor,
+                              "endpoints": hits}
+
+    covered = sum(1 for entry in endpoints.values() if entry["tests"])
+    summary = {
+        "operations": len(endpoints),
+        "covered": covered,
+        "coverage": covered / len(endpoints) if endpoints else 0.0,
+        "by_test_type": {
+            test_type: sum(1 for entry in endpoints.values() if test_type in entry["tests"])
+            for test_type in test_types
+        },
+        "items": len(items) + len(unmapped),
+        "unmapped_items": len(unmapped),
+    }
+    return {
+        "swagger": os.path.abspath(swagger_path),
+        "test_types": test_types,
+        "summary": summary,
+        "endpoints": endpoints,
+        "items": items,
+        "undocumented": undocumented,
+        "unmapped_items": unmapped,
+    }
+
+
+def write_coverage_sheet(path, index, sheet_name=SHEET_NAME):
+    """カバレッジシートを書き出す（ブックがあればシートを置き換え、なければ新規作成）"""
+    if os.path.exists(path):
+        wb = openpyxl.load_workbook(path)
+        if sheet_name in wb.sheetnames:
+            del wb[sheet_name]
+        ws = wb.create_sheet(sheet_name)
+    else:
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = sheet_name
+
+    def header(row, labels):
+        for col, label in enumerate(labels, start=1):
+            cell = ws.cell(row=row, column=col, value=label)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            cell.border = THIN_BORDER
+
+    def values(row, row_values, number_formats=None):
+        for col, value in enumerate(row_values, start=1):
+            cell = ws.cell(row=row, column=col, value=value)
+            cell.font = NORMAL_FONT
+            cell.alignment = WRAP_ALIGNMENT
+            cell.border = THIN_BORDER
+            if number_formats and col in number_formats:
+                cell.number_format = number_formats[col]
+
+    test_types = index["test_types"]
+    summary = index["summary"]
+
+    # 全体
+    header(1, ["エンドポイント数", "試験項目あり", "カバレッジ"] + test_types)
+    values(2, [summary["operations"], summary["covered"], summary["coverage"]]
+           + [summary["by_test_type"][test_type] for test_type in test_types], {3: "0.0%"})
+
+    # エンドポイントごとの試験項目ID
+    header(4, ["メソッド", "パス", "概要", "タグ"] + test_types + ["項目数"])
+    row = 5
+    for name, entry in index["endpoints"].items():
+        method, endpoint_path = name.split(" ", 1)
+        tests = entry["tests"]
+        values(row, [method, endpoint_path, entry["summary"], entry["tag"]]
+               + ["\n".join(tests.get(test_type, ())) or "-" for test_type in test_types]
+               + [sum(len(ids) for ids in tests.values())])
+        row += 1
+
+    # swagger.yml にないエンドポイント・エンドポイントを特定できない試験項目
+    row += 1
+    header(row, ["swagger.yml にないエンドポイント", "試験項目ID"])
+    for name, test_ids in index["undocumented"].items():
+        row += 1
+        values(row, [name, "\n".join(test_ids)])
+    row += 2
+    header(row, ["エンドポイントを特定できない試験項目ID", "テスト大項目", "テスト小項目"])
+    for item in index["unmapped_items"]:
+        row += 1
+        values(row, [item["test_id"], item["major"], item["minor"]])
+
+    ws.column_dimensions["A"].width = 40.0
+    ws.column_dimensions["B"].width = 46.0
+    ws.column_dimensions["C"].width = 34.0
+    ws.column_dimensions["D"].width = 16.0
+    for offset in range(len(test_types) + 1):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(5 + offset)].width = 20.0
+
+    wb.save(path)
+    return ws
+
+
+def default_catalogs():
+    """既定の3文書（性能・負荷・シナリオ）の (試験種別, 画面ID, 試験項目)"""
+    return [(doc["test_type"], doc["screen_id"], iter_items(doc["items"])) for doc in DEFAULT_DOCUMENTS]
+
+
+def manifest_catalogs(path):
+    """マニフェストの文書ごとの (試験種別, 画面ID, 試験項目)（filter を適用する）"""
+    _, documents = load_manifest(path)
+    return [(doc["test_type"], doc["screen_id"], iter_document_items(doc)) for doc in documents]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="試験項目のエンドポイントと swagger.yml を突き合わせたカバレッジ索引を生成する")
+    parser.add_argument("--manifest", help="対象文書のマニフェスト（省略時は性能・負荷・シナリオの既定3文書）")
+    parser.add_argument("--swagger", default=SWAGGER_PATH, help="OpenAPI 仕様のパス（既定: docs/swagger.yml）")
+    parser.add_argument("--json", help="索引を書き出す JSON のパス")
+    parser.add_argument("--xlsx", help="カバレッジシートを書き出す xlsx のパス（既存のブックにはシートを追加する）")
+    args = parser.parse_args()
+
+    catalogs = manifest_catalogs(args.manifest) if args.manifest else default_catalogs()
+    index = build_index(catalogs, args.swagger)
+    summary = index["summary"]
+    print(f"Coverage: {summary['covered']}/{summary['operations']} endpoints ({summary['coverage']:.1%}), "
+          + ", ".join(f"{t}: {n}" for t, n in summary["by_test_type"].items()))
+    for name, test_ids in index["undocumented"].items():
+        print(f"Not in swagger: {name} ({', '.join(test_ids)})")
+    if index["unmapped_items"]:
+        print(f"No endpoint: {len(index['unmapped_items'])} item(s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        print(f"Exported: {args.json}")
+    if args.xlsx:
+        write_coverage_sheet(args.xlsx, index)
+        print(f"Exported: {args.xlsx} ({SHEET_NAME})")
+
+
+if __name__ == "__main__":
+    main()
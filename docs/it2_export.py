@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験項目 エクスポートスクリプト
+試験項目を JSON Lines / CSV / Markdown / HTML で出力する
+
+IDは試験書と同じ iter_test_items で採番し、項目を1件ずつ書き出すため、
+大規模な項目ソース（.jsonl）でもメモリ使用量は一定に保たれる。
+"""
+
+import argparse
+import csv
+import html
+import json
+import os
+import sys
+
+from generate_it2_test_docs import iter_test_items, to_test_item
+from it2_batch import iter_document_items, iter_items, load_manifest
+
+# 出力する項目（キー, 見出し）。見出しは試験書の列見出しに合わせる
+EXPORT_FIELDS = [
+    ("id", "ID"),
+    ("major", "テスト大項目"),
+    ("medium", "テスト中項目"),
+    ("minor", "テスト小項目"),
+    ("type", "正常系/異常系"),
+    ("spec", "設計仕様"),
+    ("viewpoint", "テスト観点"),
+    ("precondition", "前提条件"),
+    ("steps", "テスト手順"),
+    ("expected", "期待結果"),
+    ("note", "備考"),
+]
+
+# 形式ごとの拡張子
+EXPORT_EXTENSIONS = {"jsonl": ".jsonl", "csv": ".csv", "md": ".md", "html": ".html"}
+
+
+def item_record(test_id, item):
+    """試験項目を出力用のレコードに変換する（既定値は TestItem と同じ）"""
+    return dict(id=test_id, **to_test_item(item).to_dict())
+
+
+def _text(value):
+    """手順・期待結果のリストを改行区切りの文字列にする"""
+    if isinstance(value, list):
+        return "\n".join(value)
+    return value
+
+
+def export_jsonl(records, out):
+    """1項目1行の JSON Lines で出力する"""
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def export_csv(records, out):
+    """見出し行付きの CSV で出力する（手順・期待結果はセル内改行）"""
+    writer = csv.writer(out)
+    writer.writerow([label for _, label in EXPORT_FIELDS])
+    for record in records:
+        writer.writerow([_text(record[key]) for key, _ in EXPORT_FIELDS])
+
+
+def export_markdown(records, out):
+    """Markdown の表で出力する"""
+
+    def cell(value):
+        return _text(value).replace("|", "\\|").replace("\n", "<br>")
+
+    out.write("| " + " | ".join(label for _, label in EXPORT_FIELDS) + " |\n")
+    out.write("|" + "---|" * len(EXPORT_FIELDS) + "\n")
+    for record in records:
+        out.write("| " + " | ".join(cell(record[key]) for key, _ in EXPORT_FIELDS) + " |\n")
+
+
+def export_html(records, out, title=""):
+    """HTML の表で出力する"""
+
+    def cell(value):
+        return html.escape(_text(value)).replace("\n", "<br>")
+
+    out.write("<!DOCTYPE html>\n<html lang=\"ja\">\n<head>\n<meta charset=\"utf-8\">\n")
+    out.write(f"<title>{html.escape(title)}</title>\n</head>\n<body>\n<table border=\"1\">\n")
+    out.write("<thead><tr>" + "".join(f"<th>{label}</th>" for _, label in EXPORT_FIELDS) + "</tr></thead>\n")
+    out.write("<tbody>\n")
+    for record in records:
+        out.write("<tr>" + "".join(f"<td>{cell(record[key])}</td>" for key, _ in EXPORT_FIELDS) + "</tr>\n")
+    out.write("</tbody>\n</table>\n</body>\n</html>\n")
+
+
+EXPORTERS = {
+    "jsonl": export_jsonl,
+    "csv": export_csv,
+    "md": export_markdown,
+    "html": export_html,
+}
+
+
+def export_items(items, screen_id, test_type, fmt, out, title=""):
+    """試験項目を1件ずつ採番・変換して指定形式で書き出す"""
+    records = (item_record(test_id, item) for test_id, item in iter_test_items(items, screen_id, test_type))
+    if fmt == "html":
+        export_html(records, out, title)
+    else:
+        EXPORTERS[fmt](records, out)
+
+
+def export_manifest(manifest_path, fmt, output_dir=None):
+    """マニフェストの全文書を、xlsx と同じファイル名（拡張子のみ変更）で書き出す"""
+    manifest_output_dir, documents = load_manifest(manifest_path)
+    output_dir = output_dir or manifest_output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    for doc in documents:
+        filename = os.path.splitext(doc["filename"])[0] + EXPORT_EXTENSIONS[fmt]
+        output_path = os.path.join(output_dir, filename)
+        with open(output_path, "w", encoding="utf-8", newline="") as out:
+            export_items(iter_document_items(doc), doc["screen_id"], doc["test_type"], fmt, out, doc["doc_name"])
+        print(f"Exported: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験項目を JSON Lines / CSV / Markdown / HTML で出力する")
+    parser.add_argument("format", choices=sorted(EXPORTERS), help="出力形式")
+    parser.add_argument("source", help="項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx）、--manifest 指定時はマニフェスト")
+    parser.add_argument("--manifest", action="store_true", help="source をマニフェストとして全文書を出力する")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2", help="ID採番に使う試験種別（既定: IT2）")
+    parser.add_argument("-o", "--output", help="出力先（--manifest 時はディレクトリ、省略時は標準出力）")
+    args = parser.parse_args()
+
+    if args.manifest:
+        export_manifest(args.source, args.format, args.output)
+        return
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            export_items(iter_items(args.source), args.screen_id, args.test_type, args.format, out)
+    else:
+        export_items(iter_items(args.source), args.screen_id, args.test_type, args.format, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 前提データ生成スクリプト
+試験項目のデータ規模（dataset）から、前提条件のテストデータを PostgreSQL の
+COPY 形式ファイルとダミー添付ファイルとして一括生成する
+
+列の並び・任意項目・既定値は prisma/schema.prisma から読み込む。
+行は1件ずつファイルへ書き出すため、大規模なデータ規模でもメモリ使用量は一定に保たれる。
+
+出力形式（試験項目IDごとのディレクトリ）:
+    <output>/<試験項目ID>/
+        load.sql          # \\copy による投入スクリプト（このディレクトリで psql -f load.sql を実行）
+        <テーブル名>.copy  # COPY テキスト形式のデータ
+        files/            # 添付ファイル・エビデンス（file_path / evidence_path と同じキーで配置）
+    <output>/fixtures.json  # 試験項目IDごとのテーブル別件数
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+from generate_it2_test_docs import iter_test_items, to_test_item
+from it2_batch import iter_items
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prisma", "schema.prisma")
+
+# 外部キーの参照順に並べた投入対象テーブル
+FIXTURE_TABLES = (
+    "mt_users",
+    "mt_tags",
+    "mt_user_tags",
+    "tt_test_groups",
+    "tt_test_group_tags",
+    "tt_test_cases",
+    "tt_test_contents",
+    "tt_test_case_files",
+    "tt_test_results",
+    "tt_test_results_history",
+    "tt_test_evidences",
+)
+
+# 前提データとして生成するデータ規模のキー（csv_* 等のインポート入力ファイルは it2_import_files.py で生成する）
+FIXTURE_KEYS = ("users", "groups", "test_cases", "contents", "files", "results", "history", "evidences", "tags")
+
+# 連番IDを明示して投入するテーブル（投入後にシーケンスを進める）
+SERIAL_TABLES = ("mt_users", "mt_tags", "tt_test_groups")
+
+# 添付ファイルの実体を配置するテーブルと、そのパス列
+ATTACHMENT_COLUMNS = {"tt_test_case_files": "file_path", "tt_test_evidences": "evidence_path"}
+
+# tt_test_case_files.file_type（batch/src/types/test-case-import.types.ts の FileType）
+FILE_TYPE_CONTROL_SPEC = 0
+FILE_TYPE_DATA_FLOW = 1
+
+# mt_users.user_role（テスト管理者）、tt_test_group_tags.test_role（設計者, 実施者, 閲覧者）
+FIXTURE_USER_ROLE = 1
+TEST_ROLES = (0, 1, 2)
+
+# テスト結果の判定（集計で OK / 参照OK / NG がそろうように循環させる）
+FIXTURE_JUDGMENTS = ("OK", "OK", "OK", "参照OK", "NG")
+
+# 1x1 の PNG（エビデンスのダミー画像。指定サイズまで末尾を埋める）
+DUMMY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+DUMMY_PDF = b"%PDF-1.4\n% ProofLink IT2 fixture\n"
+
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def load_schema(path=SCHEMA_PATH):
+    """schema.prisma からテーブルごとのスカラー列 [(列名, 任意か, 既定値)] を読み込む"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    models = dict(re.findall(r"^model\s+(\w+)\s*\{(.*?)^\}", text, re.MULTILINE | re.DOTALL))
+
+    schema = {}
+    for model, body in models.items():
+        columns = []
+        for line in body.splitlines():
+            tokens = line.split()
+            if len(tokens) < 2 or tokens[0].startswith(("@@", "//")):
+                continue
+            name, type_name = tokens[0], tokens[1]
+            # リレーション（他モデル型・配列）は列ではない
+            if type_name.endswith("[]") or type_name.rstrip("?") in models:
+                continue
+            default = re.search(r"@default\((.*?\)?)\)", line)
+            columns.append((name, type_name.endswith("?"), default.group(1) if default else None))
+        schema[model] = columns
+    return schema
+
+
+def copy_value(value):
+    """値を COPY テキスト形式の1フィールドにする"""
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+class CopyFile:
+    """1テーブル分の COPY 形式ファイル（列はスキーマ順、未指定の列は既定値で埋める）"""
+
+    def __init__(self, path, table, columns, timestamp):
+        self.path = path
+        self.table = table
+        self.columns = [name for name, _, _ in columns]
+        self.defaults = {}
+        for name, optional, default in columns:
+            if default == "now()":
+                self.defaults[name] = timestamp
+            elif default in ("true", "false"):
+                self.defaults[name] = default == "true"
+            elif default is not None and re.fullmatch(r"-?\d+", default):
+                self.defaults[name] = int(default)
+            elif optional:
+                self.defaults[name] = None
+        self.count = 0
+        self.file = open(path, "w", encoding="utf-8", newline="\n")
+
+    def write(self, row):
+        values = []
+        for name in self.columns:
+            if name in row:
+                values.append(row[name])
+            elif name in self.defaults:
+                values.append(self.defaults[name])
+            else:
+                raise ValueError(f"{self.table}.{name}: value required")
+        self.file.write("\t".join(copy_value(value) for value in values) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def fixture_tid(index):
+    """0からの通し番号をインポートバッチの形式（数字-数字-数字-数字）のTIDにする"""
+    return f"1-{index // 10000 + 1}-{index // 100 % 100 + 1}-{index % 100 + 1}"
+
+
+def iter_fixture_rows(test_id, sizes, ids, base_date):
+    """データ規模に従って (テーブル名, 行) を投入順に返す
+
+    ids はテーブルごとの次の連番ID（SERIAL_TABLES）で、採番した分だけ進める。
+    """
+    stamp = base_date.strftime("%Y%m%d") + "090000"
+    slug = test_id.lower()
+    with_results = sizes.get("results", 0) or sizes.get("history", 0) or sizes.get("evidences", 0)
+    history = sizes.get("history", 0)
+
+    user_ids = []
+    for n in range(sizes.get("users", 0)):
+        user_ids.append(ids["mt_users"])
+        ids["mt_users"] += 1
+        yield "mt_users", {
+            "id": user_ids[-1],
+            "email": f"{slug}-user{n + 1}@example.com",
+            "name": f"{test_id} ユーザ{n + 1}",
+            "user_role": FIXTURE_USER_ROLE,
+            "department": "性能試験",
+            "company": "ProofLink",
+            "password": "",
+        }
+
+    tag_ids = []
+    for n in range(sizes.get("tags", 0)):
+        tag_ids.append(ids["mt_tags"])
+        ids["mt_tags"] += 1
+        yield "mt_tags", {"id": tag_ids[-1], "name": f"{test_id}-tag{n + 1}"}
+    for user_id in user_ids:
+        for tag_id in tag_ids:
+            yield "mt_user_tags", {"user_id": user_id, "tag_id": tag_id}
+
+    executor = f"{test_id} ユーザ1" if user_ids else "fixture"
+    # groups を省略した場合、テストケースがあれば1グループとする
+    for g in range(sizes.get("groups", 1 if sizes.get("test_cases") else 0)):
+        group_id = ids["tt_test_groups"]
+        ids["tt_test_groups"] += 1
+        yield "tt_test_groups", {
+            "id": group_id,
+            "oem": "FIXTURE",
+            "model": test_id,
+            "event": f"G{g + 1}",
+            "variation": "STD",
+            "destination": "JP",
+            "specs": f"{test_id} 前提データ",
+            "test_startdate": base_date - timedelta(days=max(history, 1)),
+            "test_enddate": base_date + timedelta(days=30),
+            "created_by": user_ids[0] if user_ids else None,
+            "updated_by": user_ids[0] if user_ids else None,
+        }
+        for n, tag_id in enumerate(tag_ids):
+            yield "tt_test_group_tags", {
+                "test_group_id": group_id, "tag_id": tag_id, "test_role": TEST_ROLES[n % len(TEST_ROLES)],
+            }
+
+        for c in range(sizes.get("test_cases", 0)):
+            tid = fixture_tid(c)
+            key = {"test_group_id": group_id, "tid": tid}
+            yield "tt_test_cases", dict(
+                key,
+                first_layer=f"機能{c // 100 + 1}",
+                second_layer=f"画面{c // 10 % 10 + 1}",
+                third_layer=f"操作{c % 10 + 1}",
+                fourth_layer="-",
+                purpose=f"{tid} の動作確認",
+                request_id=f"REQ-{c + 1:05d}",
+                check_items="表示内容が正しいこと",
+                test_procedure="1.画面を開く\n2.操作を実行する",
+            )
+
+            for f in range(sizes.get("files", 0)):
+                if f % 2 == 0:
+                    file_type, file_name, prefix = FILE_TYPE_CONTROL_SPEC, f"control_spec_{f + 1}.pdf", "contorol_spec"
+                else:
+                    file_type, file_name, prefix = FILE_TYPE_DATA_FLOW, f"data_flow_{f + 1}.pdf", "data_flow"
+                yield "tt_test_case_files", dict(
+                    key,
+                    file_type=file_type,
+                    file_no=f + 1,
+                    file_name=file_name,
+                    file_path=f"test-cases/{group_id}/{tid}/{prefix}_{stamp}_{file_name}",
+                )
+
+            for no in range(1, sizes.get("contents", 0) + 1):
+                content_key = dict(key, test_case_no=no)
+                yield "tt_test_contents", dict(
+                    content_key, test_case=f"テスト内容{no}", expected_value=f"期待値{no}", is_target=True,
+                )
+                if not with_results:
+                    continue
+
+                judgment = FIXTURE_JUDGMENTS[(c + no) % len(FIXTURE_JUDGMENTS)]
+                result = dict(
+                    content_key,
+                    result=f"結果{no}",
+                    judgment=judgment,
+                    software_version="1.0.0",
+                    hardware_version="HW-A",
+                    comparator_version="CMP-1",
+                    execution_date=base_date,
+                    executor=executor,
+                    note=None,
+                )
+                yield "tt_test_results", result
+                # 履歴は古い順に1日ずつ遡り、最新の履歴がテスト結果と一致する
+                for h in range(1, history + 1):
+                    yield "tt_test_results_history", dict(
+                        result, history_count=h, execution_date=base_date - timedelta(days=history - h),
+                    )
+
+                for e in range(1, sizes.get("evidences", 0) + 1):
+                    name = f"evidence_{e}.png"
+                    history_count = max(history, 1)
+                    yield "tt_test_evidences", dict(
+                        content_key,
+                        history_count=history_count,
+                        evidence_no=e,
+                        evidence_name=name,
+                        evidence_path=f"evidences/{group_id}/{tid}/evidence_{no}_{history_count}_{stamp}_{name}",
+                    )
+
+
+def dummy_file(prototypes, path, file_size):
+    """拡張子に応じたダミーファイルを配置する（同じ内容のファイルはハードリンクで共有する）"""
+    ext = os.path.splitext(path)[1]
+    if ext not in prototypes:
+        head = DUMMY_PNG if ext == ".png" else DUMMY_PDF
+        prototypes[ext] = os.path.join(prototypes["dir"], f"prototype{ext}")
+        with open(prototypes[ext], "wb") as f:
+            f.write(head + b"\0" * max(file_size - len(head), 0))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(prototypes[ext], path)
+    except OSError:
+        shutil.copyfile(prototypes[ext], path)
+
+
+def load_script(copy_files, first_ids, ids, password_hash):
+    """COPY 形式ファイルを1トランザクションで投入する psql スクリプトを生成する"""
+    lines = ["-- psql -v fixture_password=<ログインパスワード> -f load.sql（このディレクトリで実行）", "BEGIN;"]
+    for copy_file in copy_files:
+        if copy_file.count:
+            lines.append(f"\\copy {copy_file.table} ({', '.join(copy_file.columns)}) "
+                         f"FROM '{os.path.basename(copy_file.path)}'")
+    user_ids = (first_ids["mt_users"], ids["mt_users"] - 1)
+    if user_ids[1] >= user_ids[0] and not password_hash:
+        # パスワードは投入時に1度だけ bcrypt でハッシュ化して全ユーザに設定する
+        lines.append("CREATE EXTENSION IF NOT EXISTS pgcrypto;")
+        lines.append(
+            "UPDATE mt_users u SET password = h.hash "
+            "FROM (SELECT crypt(:'fixture_password', gen_salt('bf', 10)) AS hash) h "
+            f"WHERE u.id BETWEEN {user_ids[0]} AND {user_ids[1]};"
+        )
+    for table in SERIAL_TABLES:
+        if ids[table] > first_ids[table]:
+            lines.append(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                         f"GREATEST((SELECT MAX(id) FROM {table}), 1));")
+    lines.append("COMMIT;")
+    return "\n".join(lines) + "\n"
+
+
+def write_fixture(test_id, sizes, output_dir, schema, ids, base_date, file_size, password_hash, prototypes):
+    """1試験項目分の前提データを書き出し、テーブル別件数と添付ファイル数を返す"""
+    fixture_dir = os.path.join(output_dir, test_id)
+    os.makedirs(fixture_dir, exist_ok=True)
+    timestamp = datetime.combine(base_date, datetime.min.time()).replace(hour=9)
+    first_ids = dict(ids)
+
+    copy_files = {
+        table: CopyFile(os.path.join(fixture_dir, f"{table}.copy"), table, schema[table], timestamp)
+        for table in FIXTURE_TABLES
+    }
+    attachments = 0
+    try:
+        for table, row in iter_fixture_rows(test_id, sizes, ids, base_date):
+            if table == "mt_users" and password_hash:
+                row["password"] = password_hash
+            copy_files[table].write(row)
+            if table in ATTACHMENT_COLUMNS:
+                path = os.path.join(fixture_dir, "files", *row[ATTACHMENT_COLUMNS[table]].split("/"))
+                dummy_file(prototypes, path, file_size)
+                attachments += 1
+    finally:
+        for copy_file in copy_files.values():
+            copy_file.close()
+
+    # 行のないテーブルのファイルは残さない
+    for copy_file in copy_files.values():
+        if not copy_file.count:
+            os.remove(copy_file.path)
+    with open(os.path.join(fixture_dir, "load.sql"), "w", encoding="utf-8", newline="\n") as f:
+        f.write(load_script(copy_files.values(), first_ids, ids, password_hash))
+
+    return {table: copy_file.count for table, copy_file in copy_files.items() if copy_file.count}, attachments
+
+
+def generate_fixtures(items, screen_id, test_type, output_dir, only=None, base_id=900000,
+                      base_date=None, file_size=1024, password_hash=None, schema_path=SCHEMA_PATH):
+    """データ規模を持つ試験項目ごとに前提データを生成し、{試験項目ID: 件数情報} を返す"""
+    schema = load_schema(schema_path)
+    missing = [table for table in FIXTURE_TABLES if table not in schema]
+    if missing:
+        raise ValueError(f"tables not found in schema: {', '.join(missing)}")
+    base_date = base_date or date.today()
+    os.makedirs(output_dir, exist_ok=True)
+
+    ids = {table: base_id for table in SERIAL_TABLES}
+    prototypes = {"dir": os.path.join(output_dir, ".prototypes")}
+    os.makedirs(prototypes["dir"], exist_ok=True)
+    index = {}
+    for test_id, item in iter_test_items(items, screen_id, test_type):
+        item = to_test_item(item)
+        sizes = {key: count for key, count in item.dataset if key in FIXTURE_KEYS}
+        if not sizes or (only and test_id not in only):
+            continue
+        started = time.perf_counter()
+        rows, attachments = write_fixture(test_id, sizes, output_dir, schema, ids,
+                                          base_date, file_size, password_hash, prototypes)
+        index[test_id] = {"dataset": sizes, "rows": rows, "attachments": attachments}
+        print(f"Generated: {test_id} ({sum(rows.values())} rows, {attachments} files, "
+              f"{time.perf_counter() - started:.2f}s)")
+
+    with open(os.path.join(output_dir, "fixtures.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験項目のデータ規模から前提データ（COPY形式・添付ファイル）を生成する")
+    parser.add_argument("source", help="項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx）")
+    parser.add_argument("-o", "--output-dir", required=True, help="出力ディレクトリ")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2-PT", help="ID採番に使う試験種別（既定: IT2-PT）")
+    parser.add_argument("--only", nargs="+", help="生成する試験項目ID（省略時はデータ規模を持つ全項目）")
+    parser.add_argument("--base-id", type=int, default=900000, help="連番IDの開始値（既定: 900000）")
+    parser.add_argument("--date", type=date.fromisoformat, help="実施日・履歴の基準日 YYYY-MM-DD（既定: 今日）")
+    parser.add_argument("--file-size", type=int, default=1024, help="ダミー添付ファイルのサイズ（バイト、既定: 1024）")
+    parser.add_argument("--password-hash", help="ユーザのパスワード（bcrypt ハッシュ）。省略時は投入時に pgcrypto で設定する")
+    parser.add_argument("--schema", default=SCHEMA_PATH, help="schema.prisma のパス")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = generate_fixtures(
+        iter_items(args.source), args.screen_id, args.test_type, args.output_dir, set(args.only or ()),
+        args.base_id, args.date, args.file_size, args.password_hash, args.schema,
+    )
+    total = sum(sum(entry["rows"].values()) for entry in index.values())
+    print(f"\n{len(index)} fixture(s), {total} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 インポート入力ファイル生成スクリプト
+試験項目のデータ規模（dataset）から、テストケースインポートバッチ用の ZIP
+（テストケースCSV + 添付ファイル）とユーザインポートバッチ用の CSV を生成する
+
+CSV の列・形式は batch/src/utils/test-case-csv-parser.ts / csv-parser.ts に合わせる。
+CSV 行・添付ファイルは ZIP のエントリへ直接書き出すため、件数が増えても
+メモリ使用量は一定に保たれる。
+
+出力形式:
+    <output>/<試験項目ID>/test-cases.zip  # test-cases.csv + files/attachment_NNNN.pdf
+    <output>/<試験項目ID>/users.csv
+    <output>/import_files.json            # 試験項目IDごとのファイル・件数・不正レコード・sha256
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+
+from generate_it2_test_docs import iter_test_items, to_test_item
+from it2_batch import iter_items
+from it2_fixtures import DUMMY_PDF, fixture_tid
+
+# インポート入力ファイルとして生成するデータ規模のキー
+IMPORT_KEYS = ("csv_cases", "attachments", "invalid_row", "missing_row", "csv_users", "csv_tags")
+
+# テストケースCSVの見出し（batch/src/utils/test-case-csv-parser.ts の COLUMN_MAPPING 順）
+TEST_CASE_CSV_HEADER = (
+    "TID", "No", "第1層", "第2層", "第3層", "第4層", "目的", "要求ID", "確認観点", "制御仕様",
+    "データフロー", "テスト手順", "テストケース", "期待値", "結果", "判定", "実施日", "ソフトVer.",
+    "ハードVer.", "コンパラVer.", "実施者", "エビデンス", "備考",
+)
+
+# ユーザCSVの見出し（batch/src/utils/csv-parser.ts の COLUMN_MAPPING 順）
+USER_CSV_HEADER = ("ID", "ID(メールアドレス)", "氏名", "パスワード", "部署", "会社名", "権限", "タグ", "ステータス")
+
+# ユーザCSVの権限（システム管理者, テスト管理者, 一般）を順に割り当てる
+USER_ROLES = (0, 1, 2)
+
+# ユーザに割り当てるタグの種類数
+TAG_POOL_SIZE = 10
+
+# 添付ファイルを書き込む単位（バイト）
+WRITE_CHUNK = 1 << 16
+
+
+def iter_test_case_rows(test_id, sizes, attachment_names):
+    """テストケースCSVのデータ行を (レコード番号, 行, 不正の種類) として順に返す"""
+    invalid_row = sizes.get("invalid_row", 0)
+    missing_row = sizes.get("missing_row", 0)
+    count = len(attachment_names)
+    previous = None
+    for record in range(1, sizes.get("csv_cases", 0) + 1):
+        c = record - 1
+        tid = fixture_tid(c)
+        row = [
+            tid, "1", f"機能{c // 100 + 1}", f"画面{c // 10 % 10 + 1}", f"操作{c % 10 + 1}", "-",
+            f"{tid} の動作確認", f"REQ-{record:05d}", "表示内容が正しいこと",
+            attachment_names[(2 * c) % count], attachment_names[(2 * c + 1) % count],
+            "1.画面を開く\n2.操作を実行する", f"{test_id} テスト内容", "期待値", "", "", "",
+            "", "", "", "", "", "",
+        ]
+        invalid = None
+        if record == invalid_row and previous is not None:
+            # 直前のレコードと TID/No が重複し、tt_test_contents の主キー違反になる
+            row[0], row[1] = previous[0], previous[1]
+            invalid = "duplicate_tid"
+        elif record == missing_row:
+            row[2] = ""
+            invalid = "missing_required"
+        previous = row
+        yield record, row, invalid
+
+
+def write_test_case_zip(path, test_id, sizes, attachment_size):
+    """テストケースCSVと添付ファイルを ZIP に直接書き出し、内容の要約を返す"""
+    attachments = sizes.get("attachments", 0)
+    if attachments < 1:
+        raise ValueError(f"{test_id}: attachments must be at least 1 (制御仕様・データフローは必須)")
+    attachment_names = [f"attachment_{n:04d}.pdf" for n in range(1, attachments + 1)]
+
+    invalid_rows = []
+    tids = set()
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        with io.TextIOWrapper(zf.open("test-cases.csv", "w", force_zip64=True),
+                              encoding="utf-8-sig", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(TEST_CASE_CSV_HEADER)
+            for record, row, invalid in iter_test_case_rows(test_id, sizes, attachment_names):
+                writer.writerow(row)
+                tids.add(row[0])
+                if invalid:
+                    # 行番号はバッチのエラーメッセージと同じ（見出し行を1行目とする）
+                    invalid_rows.append({"record": record, "line": record + 1, "kind": invalid})
+
+        padding = b"\0" * WRITE_CHUNK
+        for name in attachment_names:
+            with zf.open(f"files/{name}", "w", force_zip64=True) as out:
+                out.write(DUMMY_PDF)
+                remaining = attachment_size - len(DUMMY_PDF)
+                while remaining > 0:
+                    out.write(padding[:min(remaining, WRITE_CHUNK)])
+                    remaining -= WRITE_CHUNK
+
+    return {
+        "kind": "test_case_zip",
+        "records": sizes.get("csv_cases", 0),
+        "test_cases": len(tids),
+        "attachments": attachments,
+        "invalid_rows": invalid_rows,
+    }
+
+
+def write_user_csv(path, test_id, sizes, password):
+    """ユーザCSVを1行ずつ書き出し、内容の要約を返す"""
+    slug = test_id.lower()
+    max_tags = sizes.get("csv_tags", 0)
+    tags = [f"{test_id}-tag{n + 1}" for n in range(max(TAG_POOL_SIZE, max_tags))]
+    assigned = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(USER_CSV_HEADER)
+        for n in range(sizes.get("csv_users", 0)):
+            count = max_tags - (n % 2) if max_tags > 1 else max_tags
+            user_tags = [tags[(n + k) % len(tags)] for k in range(count)]
+            assigned += len(user_tags)
+            writer.writerow([
+                "", f"{slug}-import{n + 1}@example.com", f"{test_id} インポートユーザ{n + 1}", password,
+                "性能試験", "ProofLink", USER_ROLES[n % len(USER_ROLES)], ";".join(user_tags), "0",
+            ])
+    return {"kind": "user_csv", "records": sizes.get("csv_users", 0), "user_tags": assigned}
+
+
+def file_digest(path):
+    """ファイルの sha256 を分割読み込みで求める"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def generate_import_files(items, screen_id, test_type, output_dir, only=None,
+                          attachment_size=1024, password="Passw0rd!"):
+    """インポート入力のデータ規模を持つ試験項目ごとにファイルを生成し、{試験項目ID: ファイル一覧} を返す"""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    for test_id, item in iter_test_items(items, screen_id, test_type):
+        item = to_test_item(item)
+        sizes = {key: count for key, count in item.dataset if key in IMPORT_KEYS}
+        if not sizes or (only and test_id not in only):
+            continue
+
+        started = time.perf_counter()
+        item_dir = os.path.join(output_dir, test_id)
+        os.makedirs(item_dir, exist_ok=True)
+        entries = []
+        if sizes.get("csv_cases"):
+            path = os.path.join(item_dir, "test-cases.zip")
+            entries.append((path, write_test_case_zip(path, test_id, sizes, attachment_size)))
+        if sizes.get("csv_users"):
+            path = os.path.join(item_dir, "users.csv")
+            entries.append((path, write_user_csv(path, test_id, sizes, password)))
+
+        files = []
+        for path, summary in entries:
+            files.append(dict(
+                summary,
+                path=os.path.relpath(path, output_dir).replace(os.sep, "/"),
+                bytes=os.path.getsize(path),
+                sha256=file_digest(path),
+            ))
+        manifest[test_id] = {"dataset": sizes, "files": files}
+        total = sum(entry["bytes"] for entry in files)
+        print(f"Generated: {test_id} ({len(files)} file(s), {total:,} bytes, "
+              f"{time.perf_counter() - started:.2f}s)")
+
+    with open(os.path.join(output_dir, "import_files.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験項目のデータ規模からインポートバッチの入力ファイル（ZIP/CSV）を生成する")
+    parser.add_argument("source", help="項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx）")
+    parser.add_argument("-o", "--output-dir", required=True, help="出力ディレクトリ")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2-PT", help="ID採番に使う試験種別（既定: IT2-PT）")
+    parser.add_argument("--only", nargs="+", help="生成する試験項目ID（省略時はインポート入力のデータ規模を持つ全項目）")
+    parser.add_argument("--attachment-size", type=int, default=1024, help="添付ファイル1件のサイズ（バイト、既定: 1024）")
+    parser.add_argument("--password", default="Passw0rd!", help="ユーザCSVに設定するパスワード（既定: Passw0rd!）")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = generate_import_files(
+        iter_items(args.source), args.screen_id, args.test_type, args.output_dir,
+        set(args.only or ()), args.attachment_size, args.password,
+    )
+    print(f"\n{len(manifest)} item(s) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
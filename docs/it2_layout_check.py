@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験書 レイアウト検査スクリプト
+生成済みの試験書(xlsx)の結合範囲と罫線を check_layout で検査する
+（結合範囲の重なり・試験項目行の結合漏れ・結合範囲に隠れた値・外周の罫線の欠落）
+
+openpyxl は重なった結合範囲を拒否しないため、Excel で開いたときに「修復」される前に検出する。
+問題があれば終了コード 1 を返す。
+"""
+
+import argparse
+import sys
+import time
+
+import openpyxl
+
+from generate_it2_test_docs import check_layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験書(xlsx)の結合範囲・罫線の整合性を検査する")
+    parser.add_argument("paths", nargs="+", help="検査する試験書(xlsx)のパス")
+    parser.add_argument("--sheet", default="画面試験項目", help="検査するシート名（既定: 画面試験項目）")
+    parser.add_argument("--first-row", type=int, default=5, help="試験項目の開始行（既定: 5）")
+    parser.add_argument("--limit", type=int, default=20, help="ファイルごとに表示する問題の件数（既定: 20）")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.paths:
+        started = time.perf_counter()
+        wb = openpyxl.load_workbook(path)
+        if args.sheet not in wb.sheetnames:
+            failed += 1
+            print(f"NG: {path} (sheet '{args.sheet}' not found; available: {', '.join(wb.sheetnames)})")
+            continue
+        ws = wb[args.sheet]
+        issues = check_layout(ws, args.first_row)
+        elapsed = time.perf_counter() - started
+        if not issues:
+            print(f"OK: {path} ({len(ws.merged_cells.ranges)} merged ranges, {elapsed:.2f}s)")
+            continue
+        failed += 1
+        print(f"NG: {path} ({len(issues)} issue(s), {elapsed:.2f}s)")
+        for kind, cells, message in issues[:args.limit]:
+            print(f"  {kind:<8} {cells:<12} {message}")
+        if len(issues) > args.limit:
+            print(f"  ... {len(issues) - args.limit} more")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
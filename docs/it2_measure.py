@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 性能試験 適応計測スクリプト
+scripts/measure_api.sh は決まった回数（COUNT）の平均で判定するが、ばらつきの大きい API では
+回数が足りず、安定した API では時間を浪費する。本スクリプトは試験項目ごとに、
+平均または p95 の信頼区間の半幅が推定値の tolerance 倍以内に収まるまで計測を続ける
+（時間・回数の上限に達した場合はそこで打ち切る）。
+
+    平均の信頼区間: t 分布（自由度 n-1）
+    p95 の信頼区間: 順序統計量による分布によらない区間（二項分布の正規近似で順位を求める）
+
+計測計画（JSON）:
+    {
+      "ST01-IT2-PT-14": {"method": "GET", "url": "${BASE_URL}/api/test-groups"},
+      "ST01-IT2-PT-1": {"method": "POST", "url": "${BASE_URL}/api/test-groups/1",
+                        "data": {"action": "duplicate"}, "threshold_ms": 3000}
+    }
+    url の環境変数は展開する。threshold_ms を省略した項目は項目ソースの threshold_ms を使う。
+
+Cookie は scripts/login.sh が保存した $COOKIE_FILE を使う。
+判定は --workbook の試験書の実行結果・実施日に、計測回数と信頼区間は備考の【計測結果】に書き込む。
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import time
+from datetime import date
+from statistics import NormalDist, fmean, stdev
+from urllib.parse import urlsplit
+
+from generate_it2_test_docs import annotate_item_notes, iter_test_items, to_test_item
+from it2_batch import iter_items
+from it2_workload import load_cookie
+
+NOTE_HEADING = "計測結果"
+
+STATISTICS = ("mean", "p95")
+
+STATISTIC_LABELS = {"mean": "平均", "p95": "p95"}
+
+# 計測を打ち切った理由
+STOP_REASONS = {"converged": "収束", "budget": "時間上限", "max_samples": "回数上限", "error": "HTTPエラー"}
+
+
+def t_cdf(t, df):
+    """整数の自由度の t 分布の分布関数（θ = atan(t/√df) による閉形式）"""
+    theta = math.atan(abs(t) / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    term, series = 1.0, 0.0
+    if df % 2:
+        for j in range(1, (df - 1) // 2 + 1):
+            series += term
+            term *= 2 * j / (2 * j + 1) * c2
+        a = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * series)
+    else:
+        for j in range(1, df // 2 + 1):
+            series += term
+            term *= (2 * j - 1) / (2 * j) * c2
+        a = math.sin(theta) * series
+    return (1 + a) / 2 if t >= 0 else (1 - a) / 2
+
+
+def t_quantile(p, df):
+    """t 分布の p 分位点
+
+    自由度 5 以上は正規分位点からの Cornish-Fisher 展開（誤差 0.1% 程度）。
+    それ未満は展開の誤差が大きい（自由度 2 の 97.5% 点で 24%）ため、分布関数を二分法で解く。
+    """
+    if df < 5:
+        if p < 0.5:
+            return -t_quantile(1 - p, df)
+        low, high = 0.0, 1.0
+        while t_cdf(high, df) < p:
+            low, high = high, high * 2
+        for _ in range(100):
+            middle = (low + high) / 2
+            if t_cdf(middle, df) < p:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+    z = NormalDist().inv_cdf(p)
+    return (z + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def mean_interval(samples, confidence):
+    """平均と信頼区間 (推定値, 下限, 上限)"""
+    n = len(samples)
+    mean = fmean(samples)
+    if n < 2:
+        return mean, -math.inf, math.inf
+    half = t_quantile((1 + confidence) / 2, n - 1) * stdev(samples) / math.sqrt(n)
+    return mean, mean - half, mean + half
+
+
+def percentile_interval(samples, confidence, q=0.95):
+    """q 分位点と信頼区間 (推定値, 下限, 上限)。順位が範囲外になる側は無限大とする"""
+    ordered = sorted(samples)
+    n = len(ordered)
+    estimate = ordered[max(0, math.ceil(q * n) - 1)]
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    spread = z * math.sqrt(n * q * (1 - q))
+    lower_rank = math.floor(n * q - spread)
+    upper_rank = math.ceil(n * q + spread) + 1
+    lower = ordered[lower_rank - 1] if lower_rank >= 1 else -math.inf
+    upper = ordered[upper_rank - 1] if upper_rank <= n else math.inf
+    return estimate, lower, upper
+
+
+def interval(samples, statistic, confidence):
+    if statistic == "mean":
+        return mean_interval(samples, confidence)
+    return percentile_interval(samples, confidence)
+
+
+class Requester:
+    """1項目分の HTTP リクエストを送り、応答本文を読み終えるまでの時間（ms）を返す
+
+    既定では measure_api.sh（curl を毎回起動）と同じく毎回接続し直す。keep_alive では接続を使い回す。
+    """
+
+    def __init__(self, method, url, data=None, cookie=None, keep_alive=False, timeout=300):
+        parts = urlsplit(url)
+        self.method = method.upper()
+        self.target = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.host = parts.hostname
+        self.port = parts.port
+        self.connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                                 else http.client.HTTPConnection)
+        self.body = None if data is None else (data if isinstance(data, str) else json.dumps(data)).encode("utf-8")
+        self.headers = {"Accept": "application/json"}
+        if self.body is not None:
+            self.headers["Content-Type"] = "application/json"
+        if cookie:
+            self.headers["Cookie"] = cookie
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.connection = None
+
+    def __call__(self):
+        """(HTTPステータス, 時間[ms]) を返す（接続エラーはステータス 0）"""
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            self.connection.request(self.method, self.target, body=self.body, headers=self.headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 0
+            self.close()
+        elapsed = (time.perf_counter() - started) * 1000
+        if not self.keep_alive:
+            self.close()
+        return status, elapsed
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def measure(request, statistic="mean", tolerance=0.05, confidence=0.95, min_samples=10,
+            max_samples=200, budget_s=60.0, warmup=1, stop_on_error=True):
+    """信頼区間が収束するまで request() を繰り返し、計測結果を返す"""
+    for _ in range(warmup):
+        request()
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    reason = "max_samples"
+    estimate, lower, upper = math.nan, -math.inf, math.inf
+    while len(samples) < max_samples:
+        status, elapsed = request()
+        samples.append(elapsed)
+        if status == 0 or status >= 400:
+            errors += 1
+            if stop_on_error:
+                reason = "error"
+                break
+        if len(samples) >= min_samples:
+            estimate, lower, upper = interval(samples, statistic, confidence)
+            if (upper - lower) / 2 <= tolerance * estimate:
+                reason = "converged"
+                break
+        if time.perf_counter() - started >= budget_s:
+            reason = "budget"
+            break
+    if len(samples) < min_samples:
+        # 最小回数に届かずに打ち切った場合、推定値だけを求め、信頼区間は未確定とする
+        estimate, _, _ = interval(samples, statistic, confidence)
+        lower, upper = -math.inf, math.inf
+    elif reason == "error":
+        estimate, lower, upper = interval(samples, statistic, confidence)
+
+    mean_ms = fmean(samples)
+    ordered = sorted(samples)
+    return {
+        "statistic": statistic,
+        "samples": len(samples),
+        "errors": errors,
+        "estimate_ms": estimate,
+        "ci_low_ms": lower if math.isfinite(lower) else None,
+        "ci_high_ms": upper if math.isfinite(upper) else None,
+        "confidence": confidence,
+        "tolerance": tolerance,
+        "converged": reason == "converged",
+        "stop_reason": reason,
+        "elapsed_s": time.perf_counter() - started,
+        "mean_ms": mean_ms,
+        "p95_ms": ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)],
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+        "values_ms": [round(value, 1) for value in samples],
+    }
+
+
+def verdict(result, threshold_ms):
+    """判定（HTTPエラーがあれば NG、判定基準があれば推定値と比較、なければ空）"""
+    if result["errors"]:
+        return "NG"
+    if not threshold_ms:
+        return ""
+    return "OK" if result["estimate_ms"] <= threshold_ms else "NG"
+
+
+def format_result(result, threshold_ms):
+    """計測結果を備考に書き込む文字列にする"""
+    label = STATISTIC_LABELS[result["statistic"]]
+    low, high = result["ci_low_ms"], result["ci_high_ms"]
+    bounds = f"{low:.0f}〜{high:.0f}ms" if low is not None and high is not None else "未確定"
+    lines = [
+        f"計測回数: {result['samples']}回（{STOP_REASONS[result['stop_reason']]}、"
+        f"許容幅 ±{result['tolerance'] * 100:.0f}%）",
+        f"{label}: {result['estimate_ms']:.0f}ms（{result['confidence'] * 100:.0f}%信頼区間 {bounds}）",
+        f"平均 {result['mean_ms']:.0f}ms / p95 {result['p95_ms']:.0f}ms / 最小 {result['min_ms']:.0f}ms / "
+        f"最大 {result['max_ms']:.0f}ms",
+    ]
+    if threshold_ms:
+        lines.append(f"判定基準: {label} ≦ {threshold_ms}ms")
+    if result["errors"]:
+        lines.append(f"HTTPエラー: {result['errors']}件")
+    return "\n".join(lines)
+
+
+def load_plan(path):
+    """計測計画を読み込み、url の環境変数を展開する"""
+    with open(path, encoding="utf-8") as f:
+        plan = json.load(f)
+    for test_id, entry in plan.items():
+        if "url" not in entry:
+            raise ValueError(f"{test_id}: url is required")
+        entry["url"] = os.path.expandvars(entry["url"])
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="信頼区間が収束するまで API のレスポンスタイムを計測し、判定を試験書に書き込む")
+    parser.add_argument("plan", help="計測計画(JSON)のパス")
+    parser.add_argument("--only", nargs="+", help="計測する試験項目ID（省略時は計画の全項目）")
+    parser.add_argument("--statistic", choices=STATISTICS, default="mean", help="収束・判定に使う統計量（既定: mean）")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="信頼区間の半幅の許容割合（既定: 0.05 = ±5%%）")
+    parser.add_argument("--confidence", type=float, default=0.95, help="信頼係数（既定: 0.95）")
+    parser.add_argument("--min-samples", type=int, default=10, help="最小計測回数（既定: 10）")
+    parser.add_argument("--max-samples", type=int, default=200, help="最大計測回数（既定: 200）")
+    parser.add_argument("--budget", type=float, default=60.0, help="1項目あたりの計測時間の上限（秒、既定: 60）")
+    parser.add_argument("--warmup", type=int, default=1, help="集計に含めない最初の計測回数（既定: 1）")
+    parser.add_argument("--keep-alive", action="store_true", help="接続を使い回す（既定は measure_api.sh と同じく毎回接続）")
+    parser.add_argument("--continue-on-error", action="store_true", help="HTTPエラーが発生しても計測を続ける")
+    parser.add_argument("--source", default="performance", help="判定基準（threshold_ms）を求める項目ソース（既定: performance）")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2-PT", help="ID採番に使う試験種別（既定: IT2-PT）")
+    parser.add_argument("--cookie-file", default=os.environ.get("COOKIE_FILE"), help="Cookie ファイル（既定: $COOKIE_FILE）")
+    parser.add_argument("--json", help="計測結果を書き出す JSON のパス")
+    parser.add_argument("--workbook", help="判定・計測結果を書き込む試験書(xlsx)のパス")
+    args = parser.parse_args()
+
+    plan = load_plan(args.plan)
+    thresholds = {test_id: to_test_item(item).threshold_ms
+                  for test_id, item in iter_test_items(iter_items(args.source), args.screen_id, args.test_type)}
+    cookie = load_cookie(args.cookie_file) if args.cookie_file else None
+
+    results = {}
+    for test_id, entry in plan.items():
+        if args.only and test_id not in args.only:
+            continue
+        threshold_ms = entry.get("threshold_ms") or thresholds.get(test_id, 0)
+        request = Requester(entry.get("method", "GET"), entry["url"], entry.get("data"), cookie, args.keep_alive)
+        try:
+            result = measure(request, args.statistic, args.tolerance, args.confidence, args.min_samples,
+                             args.max_samples, args.budget, args.warmup, not args.continue_on_error)
+        finally:
+            request.close()
+        result.update(threshold_ms=threshold_ms, verdict=verdict(result, threshold_ms))
+        results[test_id] = result
+        bounds = ", ".join("-" if bound is None else f"{bound:.0f}"
+                           for bound in (result["ci_low_ms"], result["ci_high_ms"]))
+        print(f"{test_id}: {result['statistic']} {result['estimate_ms']:.0f}ms [{bounds}] "
+              f"n={result['samples']} ({result['stop_reason']}) {result['verdict'] or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.workbook:
+        today = date.today().strftime("%Y/%m/%d")
+        notes = {test_id: format_result(result, result["threshold_ms"]) for test_id, result in results.items()}
+        values = {test_id: {"実行結果": result["verdict"], "実施日": today}
+                  for test_id, result in results.items() if result["verdict"]}
+        missing = annotate_item_notes(args.workbook, notes, NOTE_HEADING, values=values)
+        for test_id in sorted(missing):
+            print(f"Not found in workbook: {test_id}")
+        print(f"Annotated: {args.workbook}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験書 大規模シート並列生成スクリプト
+1枚の画面試験項目シートに大量の項目がある場合に、項目をテスト大項目の境目で
+連続したチャンクに分け、ワーカープロセスでシートXMLの行と結合範囲を生成して連結する
+
+表紙・改版履歴・ヘッダーは通常どおり openpyxl で生成し、保存後の xlsx の
+画面試験項目シートに生成した行（sheetData）と結合範囲（mergeCells）を差し込む。
+セルの表現（インライン文字列・スタイルID・結合セルの外周罫線）は
+write_test_items の出力と同じになる。
+"""
+
+import argparse
+import io
+import os
+import posixpath
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+from generate_it2_test_docs import (
+    COL_MAP,
+    EDGE_NAMES,
+    GROUP_MERGE_FIELDS,
+    LAST_ITEM_COL,
+    ItemSummary,
+    RowLayoutTemplate,
+    col_to_num,
+    create_summary_sheet,
+    format_test_id,
+    group_merges,
+    item_row_merges,
+    merge_layout_cells,
+    new_document_workbook,
+    number_items,
+    to_test_item,
+    write_item_properties,
+)
+from it2_batch import iter_document_items, load_manifest
+
+# 試験項目シートのデータ開始行
+DATA_START_ROW = 5
+
+# スタイルIDの表で値を持つセルに使うキー
+CONTENT_XF = "content"
+
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def split_chunks(items, chunk_items):
+    """(連番, TestItem) の列をテスト大項目の境目で、おおよそ chunk_items 件ずつの連続したチャンクに分ける"""
+    chunks = []
+    current = []
+    for test_num, item in items:
+        if len(current) >= chunk_items and item.major != current[-1][1].major:
+            chunks.append(current)
+            current = []
+        current.append((test_num, item))
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _cell_xml(ref, xf, value):
+    """openpyxl と同じ形式でセル要素を生成する（値は文字列のみ）"""
+    if value is None:
+        return f'<c r="{ref}" s="{xf}" t="n" />'
+    if value.startswith("=") and len(value) > 1:
+        return f'<c r="{ref}" s="{xf}"><f>{escape(value[1:])}</f><v /></c>'
+    if value == "":
+        return f'<c r="{ref}" s="{xf}" t="inlineStr" />'
+    stripped = value.strip()
+    space = ' xml:space="preserve"' if stripped and stripped != value else ""
+    return f'<c r="{ref}" s="{xf}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+
+
+def render_chunk(task):
+    """チャンクの行XMLと結合範囲XMLを生成する（ワーカープロセスで実行される）
+
+    task は ([(連番, TestItem)], 開始行, screen_id, test_type, スタイルID表)。
+    戻り値は (行XML, 結合範囲XML, 結合範囲の数)。
+    """
+    items, start_row, screen_id, test_type, xf_map = task
+    value_cols = {field: col_to_num(col) for field, col in COL_MAP.items()}
+    layouts = {}
+    cells = {}
+    values = {}
+    merges = []
+
+    def place(row, merge_list):
+        for r, c, edges in merge_layout_cells(merge_list):
+            cells[(row + r, c)] = edges
+        for r_s, c_s, r_e, c_e in merge_list:
+            merges.append((row + r_s, c_s, row + r_e, c_e))
+
+    row = start_row
+    major_start = row
+    prev_major = None
+    for test_num, item in items:
+        if prev_major is not None and item.major != prev_major:
+            for field in GROUP_MERGE_FIELDS:
+                place(major_start, group_merges(field, row - major_start))
+            values[(major_start, value_cols["テスト大項目"])] = prev_major
+            major_start = row
+
+        if item.num_rows not in layouts:
+            layouts[item.num_rows] = item_row_merges(item.num_rows)
+        place(row, layouts[item.num_rows])
+
+        for i, step in enumerate(item.steps):
+            values[(row + i, value_cols["テスト手順"])] = step
+        for i, expected in enumerate(item.expected):
+            values[(row + i, value_cols["期待結果"])] = expected
+        values[(row, value_cols["ID"])] = format_test_id(screen_id, test_type, test_num)
+        values[(row, value_cols["テスト中項目"])] = item.medium
+        if item.minor:
+            values[(row, value_cols["テスト小項目"])] = item.minor
+        values[(row, value_cols["正常系/異常系"])] = item.type
+        if item.spec:
+            values[(row, value_cols["設計仕様"])] = item.spec
+        values[(row, value_cols["テスト観点"])] = item.viewpoint
+        if item.precondition:
+            values[(row, value_cols["前提条件"])] = item.precondition
+        if item.note:
+            values[(row, value_cols["備考"])] = item.note
+
+        row += item.num_rows
+        prev_major = item.major
+
+    # チャンクはテスト大項目の境目で分割されているため、最後のグループもここで閉じる
+    if prev_major is not None:
+        for field in GROUP_MERGE_FIELDS:
+            place(major_start, group_merges(field, row - major_start))
+        values[(major_start, value_cols["テスト大項目"])] = prev_major
+
+    last_col = col_to_num(LAST_ITEM_COL)
+    letters = [None] + [get_column_letter(c) for c in range(1, last_col + 1)]
+    parts = []
+    for r in range(start_row, row):
+        parts.append(f'<row r="{r}">')
+        for c in range(1, last_col + 1):
+            value = values.get((r, c))
+            if value is not None:
+                xf = xf_map[CONTENT_XF]
+            else:
+                xf = xf_map[cells[(r, c)]]
+            parts.append(_cell_xml(f"{letters[c]}{r}", xf, value))
+        parts.append("</row>")
+
+    merge_xml = "".join(
+        f'<mergeCell ref="{letters[c_s]}{r_s}:{letters[c_e]}{r_e}" />'
+        for r_s, c_s, r_e, c_e in merges
+    )
+    return "".join(parts), merge_xml, len(merges)
+
+
+def register_item_styles(wb):
+    """項目行で使うスタイルをブックに登録し、セル種別 → スタイルID(xf) の表を返す"""
+    template = RowLayoutTemplate(wb)
+    xf_map = {
+        None: wb._cell_styles.add(template.border_style),
+        CONTENT_XF: wb._cell_styles.add(template.content_style),
+    }
+    for n in range(len(EDGE_NAMES) + 1):
+        for edges in combinations(EDGE_NAMES, n):
+            xf_map[edges] = wb._cell_styles.add(template._edge_style(edges))
+    return xf_map
+
+
+def sheet_part_name(archive, sheet_title):
+    """xlsx 内の、指定シート名のワークシートXMLのパスを返す"""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship")}
+    for sheet in workbook.iter(f"{{{SHEET_NS}}}sheet"):
+        if sheet.get("name") == sheet_title:
+            target = targets[sheet.get(f"{{{REL_NS}}}id")]
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise KeyError(sheet_title)
+
+
+def create_test_document_parallel(screen_id, doc_name, target_name, items, test_type, filename,
+                                  output_dir=None, jobs=None, chunk_items=None):
+    """画面試験項目シートの行を並列生成してテスト試験書Excelファイルを作成"""
+    jobs = jobs or os.cpu_count() or 1
+    items = [(test_num, to_test_item(item)) for test_num, item in number_items(items)]
+    chunk_items = chunk_items or max(1, -(-len(items) // (jobs * 4)))
+
+    # チャンクごとの開始行（前のチャンクまでの行数から求める）
+    wb = new_document_workbook(screen_id, doc_name, target_name)
+    xf_map = register_item_styles(wb)
+    summary = ItemSummary()
+    tasks = []
+    row = DATA_START_ROW
+    for chunk in split_chunks(items, chunk_items):
+        tasks.append((chunk, row, screen_id, test_type, xf_map))
+        for test_num, item in chunk:
+            summary.add(item, row, test_num)
+            row += item.num_rows
+    last_row = row - 1
+    create_summary_sheet(wb, summary, test_type)
+    write_item_properties(wb, summary, screen_id, test_type)
+
+    header = io.BytesIO()
+    wb.save(header)
+
+    output_path = os.path.join(output_dir or os.path.dirname(__file__), filename)
+    with zipfile.ZipFile(header) as src, \
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as dst, \
+            tempfile.TemporaryFile() as merge_buffer:
+        sheet_name = sheet_part_name(src, "画面試験項目")
+        for info in src.infolist():
+            if info.filename != sheet_name:
+                dst.writestr(info, src.read(info.filename))
+                continue
+
+            xml = src.read(info.filename).decode("utf-8")
+            if last_row >= DATA_START_ROW:
+                xml = re.sub(r'<dimension ref="A1:[A-Z]+\d+"',
+                             f'<dimension ref="A1:{LAST_ITEM_COL}{last_row}"', xml, count=1)
+            head, tail = xml.split("</sheetData>", 1)
+            merge_head, merge_tail = tail.split("</mergeCells>", 1)
+            merge_open = re.search(r'<mergeCells count="(\d+)">', merge_head)
+
+            with dst.open(info.filename, "w", force_zip64=True) as out:
+                out.write(head.encode("utf-8"))
+                merge_count = int(merge_open.group(1))
+                if jobs > 1 and len(tasks) > 1:
+                    with ProcessPoolExecutor(max_workers=jobs) as executor:
+                        results = executor.map(render_chunk, tasks)
+                        for rows_xml, merge_xml, count in results:
+                            out.write(rows_xml.encode("utf-8"))
+                            merge_buffer.write(merge_xml.encode("utf-8"))
+                            merge_count += count
+                else:
+                    for rows_xml, merge_xml, count in map(render_chunk, tasks):
+                        out.write(rows_xml.encode("utf-8"))
+                        merge_buffer.write(merge_xml.encode("utf-8"))
+                        merge_count += count
+
+                out.write(b"</sheetData>")
+                out.write(merge_head[:merge_open.start()].encode("utf-8"))
+                out.write(f'<mergeCells count="{merge_count}">'.encode("utf-8"))
+                out.write(merge_head[merge_open.end():].encode("utf-8"))
+                merge_buffer.seek(0)
+                for block in iter(lambda: merge_buffer.read(1 << 20), b""):
+                    out.write(block)
+                out.write(b"</mergeCells>")
+                out.write(merge_tail.encode("utf-8"))
+
+    print(f"Generated: {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大規模な画面試験項目シートを並列生成する")
+    parser.add_argument("manifest", help="マニフェスト(JSON)のパス")
+    parser.add_argument("--output-dir", help="出力ディレクトリ（マニフェストの指定より優先）")
+    parser.add_argument("--jobs", type=int, help="ワーカー数（既定: CPU数）")
+    parser.add_argument("--chunk-items", type=int, help="1チャンクの目安項目数（既定: 項目数 / (ワーカー数 × 4)）")
+    args = parser.parse_args()
+
+    manifest_output_dir, documents = load_manifest(args.manifest)
+    output_dir = args.output_dir or manifest_output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    for doc in documents:
+        started = time.perf_counter()
+        create_test_document_parallel(
+            doc["screen_id"], doc["doc_name"], doc["target_name"], iter_document_items(doc),
+            doc["test_type"], doc["filename"], output_dir, args.jobs, args.chunk_items,
+        )
+        print(f"  {doc['filename']}: {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+ProofLink 試験項目書 読み込みスクリプト
+既存の試験項目書（xlsx）を読み取り専用で1行ずつ読み、試験項目（TestItem）に戻す
+
+対応する形式（ヘッダー行の見出しで列を判定する）
+    ・COL_MAP 形式（setup_test_sheet と同じ、4行目が見出し）
+        docs/IT1_試験項目書_テストケース編集.xlsx、本スクリプト群が生成した IT2 試験書
+    ・1行1項目の表形式（1行目が テストID / テスト項目 / テスト観点 / ... の見出し）
+        テストグループ一覧画面_結合テスト仕様書_IT1_IT2.xlsx
+
+結合セルは先頭セルの値を結合範囲全体に引き継いで解決する。
+    ・ID 列の結合範囲（または次の ID まで）を1項目とする
+    ・テスト大項目（E:N）など複数項目にまたがる結合は、範囲内の各項目に同じ値を設定する
+    ・テスト手順・期待結果は1行を1要素とし、縦に結合した行は空の要素にする（行の対応を保つ）
+    ・備考は行ごとの値を改行でつなぐ
+
+シートの一覧・共有文字列は openpyxl の read_only モードで読み、セルの値はシートの XML を
+expat で逐次解析して必要な列だけを取り出す。結合範囲は sheetData の後ろの mergeCells だけを読むため、
+大きなシートでもブック全体をメモリに展開しない。
+シートに書き出さないデータ規模（dataset）・レスポンスタイム上限（threshold_ms）は、
+本スクリプト群が生成した試験書ではユーザー設定プロパティ（write_item_properties）から読み戻す。
+それ以外の試験項目書の項目はどちらも持たない（指定なし）。
+.xlsx は it2_batch の項目ソースとしてもそのまま指定できる。
+"""
+
+import argparse
+import json
+import os
+import re
+import warnings
+from functools import partial
+from itertools import chain
+from xml.parsers import expat
+
+import openpyxl
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+
+from generate_it2_test_docs import ITEM_TYPES, read_item_properties, to_test_item
+
+# 見出し → 試験項目のフィールド（id は試験項目ID）
+HEADER_FIELDS = {
+    "ID": "id",
+    "テストID": "id",
+    "テスト大項目": "major",
+    "テスト項目": "major",
+    "テスト中項目": "medium",
+    "テスト小項目": "minor",
+    "正常系/異常系": "type",
+    "設計仕様": "spec",
+    "テスト観点": "viewpoint",
+    "前提条件": "precondition",
+    "テスト手順": "steps",
+    "期待結果": "expected",
+    "備考": "note",
+}
+
+# 1行1要素として読むフィールド
+LIST_FIELDS = ("steps", "expected")
+
+# 項目の先頭行の値（結合範囲から引き継いだ値を含む）を使うフィールド
+SCALAR_FIELDS = ("major", "medium", "minor", "type", "spec", "viewpoint", "precondition")
+
+# 見出し行を探す範囲（先頭からの行数）
+HEADER_SCAN_ROWS = 10
+
+# シートの XML を読む単位（バイト）
+READ_CHUNK = 1 << 20
+
+# sheetData の後ろにある結合範囲の一覧の開始タグと、各結合範囲の ref 属性
+MERGE_CELLS_RE = re.compile(rb"<(?:\w+:)?mergeCells[\s>]")
+MERGE_REF_RE = re.compile(rb"<(?:\w+:)?mergeCell\s[^>]*?\bref=\"([A-Z]+[0-9]+:[A-Z]+[0-9]+)\"")
+
+# expat が返す名前空間付きの要素名（名前空間と要素名を "}" で区切る）
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+CELL_TAG = SHEET_NS + "c"
+ROW_TAG = SHEET_NS + "row"
+TEXT_TAGS = (SHEET_NS + "v", SHEET_NS + "t")
+
+
+def find_header(row):
+    """見出し行なら {フィールド: 列番号} を返す（ID とテスト手順の見出しが必要）"""
+    columns = {}
+    for col, value in sorted(row.items()):
+        field = HEADER_FIELDS.get(value.strip())
+        if field is not None:
+            columns.setdefault(field, col)
+    if "id" in columns and "steps" in columns:
+        return columns
+    return None
+
+
+def read_vertical_merges(ws, columns):
+    """columns の列を先頭とする縦方向の結合範囲 {列番号: {開始行: 終了行}} を返す
+
+    read_only のシートは結合範囲を持たないため、シートの XML から mergeCells 以降だけを取り出す
+    （mergeCells は sheetData の後ろにあるため、それまでは XML として解析せずに読み飛ばす）。
+    """
+    spans = {col: {} for col in columns}
+    buffer = b""
+    found = False
+    with ws._get_source() as src:
+        for chunk in iter(partial(src.read, READ_CHUNK), b""):
+            buffer += chunk
+            if not found:
+                match = MERGE_CELLS_RE.search(buffer)
+                if match is None:
+                    # タグがチャンクの境界をまたぐ場合に備えて末尾を残す
+                    buffer = buffer[-64:]
+                    continue
+                buffer = buffer[match.start():]
+                found = True
+    if found:
+        for match in MERGE_REF_RE.finditer(buffer):
+            min_col, min_row, _, max_row = range_boundaries(match.group(1).decode("ascii"))
+            if max_row > min_row and min_col in spans:
+                spans[min_col][min_row] = max_row
+    return spans
+
+
+class SheetRowReader:
+    """シートの XML を expat で逐次解析し、行ごとの {列番号: 文字列} を返す
+
+    openpyxl の read_only モードは書式だけの空セルも1つずつセルとして解析するため、
+    罫線付きの空セルが大半を占める試験項目書では、必要な列の値だけを取り出すこちらが速い。
+    columns が None の間は全列を取り出す（見出し行を探す間）。
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.columns = None
+        self.shared_strings = ws._shared_strings
+        self.rows = []
+        self.row_number = 0
+        self.values = None
+        self.col = 0
+        self.cell_type = None
+        self.capture = False
+        self.in_text = False
+        self.text = []
+
+    def __iter__(self):
+        """(行番号, {列番号: 文字列}) を行番号の昇順に返す（空の行は値のない dict）"""
+        parser = expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._characters
+        last = 0
+        with self.ws._get_source() as src:
+            for chunk in chain(iter(partial(src.read, READ_CHUNK), b""), [None]):
+                if chunk is None:
+                    parser.Parse(b"", True)
+                else:
+                    parser.Parse(chunk, False)
+                rows, self.rows = self.rows, []
+                for row_number, values in rows:
+                    # XML に現れない行は空の行として返す
+                    for missing in range(last + 1, row_number):
+                        yield missing, {}
+                    last = row_number
+                    yield row_number, values
+
+    def _start(self, name, attrs):
+        if name == CELL_TAG:
+            ref = attrs.get("r")
+            self.col = column_index_from_string(ref.rstrip("0123456789")) if ref else self.col + 1
+            self.capture = self.columns is None or self.col in self.columns
+            if self.capture:
+                self.cell_type = attrs.get("t")
+                self.text = []
+        elif name == ROW_TAG:
+            ref = attrs.get("r")
+            self.row_number = int(ref) if ref else self.row_number + 1
+            self.values = {}
+            self.col = 0
+        elif self.capture and name in TEXT_TAGS:
+            self.in_text = True
+
+    def _characters(self, data):
+        if self.in_text:
+            self.text.append(data)
+
+    def _end(self, name):
+        if name == CELL_TAG:
+            if self.capture and self.text:
+                value = "".join(self.text)
+                if self.cell_type == "s":
+                    value = self.shared_strings[int(value)]
+                elif self.cell_type == "b":
+                    value = "TRUE" if value == "1" else "FALSE"
+                self.values[self.col] = value
+            self.capture = False
+        elif name == ROW_TAG:
+            self.rows.append((self.row_number, self.values))
+        elif name in TEXT_TAGS:
+            self.in_text = False
+
+
+def iter_sheet_items(ws):
+    """シートの試験項目を (試験項目ID, 項目dict) として順に返す（見出し行がなければ何も返さない）"""
+    reader = SheetRowReader(ws)
+    rows = iter(reader)
+    columns = None
+    for row_number, row in rows:
+        columns = find_header(row)
+        if columns is not None or row_number >= HEADER_SCAN_ROWS:
+            break
+    if columns is None:
+        return
+
+    reader.columns = set(columns.values())
+    spans = read_vertical_merges(ws, columns.values())
+    # 列ごとの結合中の値 (終了行, 値)
+    active = {col: (0, "") for col in columns.values()}
+    # 表形式で種別の列がなければシート名から判断する
+    default_type = ITEM_TYPES[1] if ITEM_TYPES[1] in ws.title else ITEM_TYPES[0]
+
+    current = None
+    for row_number, row in rows:
+        fresh = {}
+        resolved = {}
+        for field, col in columns.items():
+            end, value = active[col]
+            if row_number <= end:
+                resolved[field] = value
+                continue
+            value = row.get(col, "")
+            end = spans[col].get(row_number)
+            if end is not None:
+                active[col] = (end, value)
+            fresh[field] = resolved[field] = value
+
+        test_id = fresh.get("id", "").strip()
+        if test_id:
+            if current is not None:
+                yield finish_item(current)
+            current = {"id": test_id, "steps": [], "expected": [], "note": []}
+            for field in SCALAR_FIELDS:
+                current[field] = resolved.get(field, "")
+            current["type"] = current["type"].strip() or default_type
+        elif current is None:
+            # 最初の項目より前の行
+            continue
+        elif "id" in fresh and not any(fresh.get(field) for field in (*LIST_FIELDS, "note")):
+            # ID が結合されていない空行（ID が結合されている行は手順の行の対応を保つため残す）
+            continue
+
+        for field in LIST_FIELDS:
+            current[field].append(fresh.get(field, ""))
+        if fresh.get("note"):
+            current["note"].append(fresh["note"])
+
+    if current is not None:
+        yield finish_item(current)
+
+
+def finish_item(current):
+    """読み込んだ行を試験項目dictにまとめ、(試験項目ID, 項目dict) を返す"""
+    item = {field: current[field] for field in SCALAR_FIELDS}
+    for field in LIST_FIELDS:
+        values = current[field]
+        while values and not values[-1]:
+            values.pop()
+        item[field] = values
+    item["note"] = "\n".join(current["note"])
+    return current["id"], item
+
+
+def read_items(path, sheets=None):
+    """試験項目書から (シート名, 試験項目ID, TestItem) を順に返す
+
+    sheets を省略すると見出し行のある全シートを読む。
+    """
+    with warnings.catch_warnings():
+        # データの入力規則など、読み込みに関係しない拡張の警告は抑止する
+        warnings.simplefilter("ignore", UserWarning)
+        wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        parameters = read_item_properties(wb)
+        for ws in wb.worksheets:
+            if sheets and ws.title not in sheets:
+                continue
+            for test_id, item in iter_sheet_items(ws):
+                try:
+                    yield ws.title, test_id, to_test_item(dict(item, **parameters.get(test_id, {})))
+                except ValueError as e:
+                    raise ValueError(f"{os.path.basename(path)}!{ws.title} {test_id}: {e}") from None
+    finally:
+        wb.close()
+
+
+def iter_workbook_items(path, sheets=None):
+    """試験項目書の試験項目（TestItem）だけを順に返す（項目ソースとして使う）"""
+    for _, _, item in read_items(path, sheets):
+        yield item
+
+
+def main():
+    parser = argparse.ArgumentParser(description="既存の試験項目書(xlsx)から試験項目を読み込む")
+    parser.add_argument("paths", nargs="+", help="試験項目書(xlsx)のパス")
+    parser.add_argument("--sheet", action="append", help="読み込むシート名（複数指定可、既定: 見出し行のある全シート）")
+    parser.add_argument("-o", "--output", help="試験項目を書き出すパス（.json / .jsonl）")
+    args = parser.parse_args()
+
+    items = []
+    for path in args.paths:
+        counts = {}
+        for sheet, _, item in read_items(path, args.sheet):
+            counts[sheet] = counts.get(sheet, 0) + 1
+            items.append(item)
+        print(f"{path}: " + (", ".join(f"{sheet} {n} item(s)" for sheet, n in counts.items()) or "no items"))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            if args.output.endswith(".jsonl"):
+                for item in items:
+                    f.write(json.dumps(item.to_dict(), ensure_ascii=False) + "\n")
+            else:
+                json.dump([item.to_dict() for item in items], f, ensure_ascii=False, indent=2)
+        print(f"Exported: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
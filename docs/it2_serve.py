@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験書 オンデマンド生成サーバ
+テンプレート・スタイルを読み込んだプロセスを常駐させ、HTTP で要求された試験書を
+その場で生成して返す（ファイルには書き出さず、メモリ上の xlsx をそのまま送る）
+
+    GET  /                      生成できる文書の一覧（JSON）
+    GET  /documents/<filename>  マニフェスト（既定: DEFAULT_DOCUMENTS）の文書を生成して返す
+                                （<filename> は filename または doc_name）
+    POST /documents             本文の文書記述（JSON）から生成して返す
+                                  {"screen_id": ..., "doc_name": ..., "target_name": ...,
+                                   "items": "performance" または試験項目の配列,
+                                   "test_type": ..., "filename": ..., "filter": {...}}
+    GET  /stats                 キャッシュの状態（JSON）
+
+生成結果は文書記述と試験項目の内容のハッシュをキーに、合計サイズ上限つきの LRU に保持する。
+同じキーの生成中に届いた要求は、生成を重複させずにその結果を待つ。
+ハッシュは ETag としても返し、If-None-Match が一致すれば 304 を返す。
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from generate_it2_test_docs import (
+    DEFAULT_DOCUMENTS, ITEM_SOURCES, apply_item_filter, get_document_template, number_items,
+    render_test_document, to_test_item,
+)
+from it2_batch import DOCUMENT_KEYS, FILTER_KEYS, iter_items, load_manifest
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 応答本文を書き出す単位（バイト）
+STREAM_CHUNK = 64 * 1024
+
+# POST で受け付ける本文の上限（バイト）
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+class DocumentCache:
+    """生成済みの試験書（xlsx のバイト列）を合計サイズ上限つきで保持する LRU
+
+    get_or_render は同じキーの生成を1回にまとめる（生成中の要求は結果を待つ）。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.counts = {"hit": 0, "miss": 0, "shared": 0, "evicted": 0}
+
+    def get_or_render(self, key, render):
+        """(バイト列, "hit" / "miss" / "shared") を返す（render の例外は待っていた要求にも送出する）"""
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                self.counts["hit"] += 1
+                return data, "hit"
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = self.pending[key] = Future()
+            self.counts["miss" if owner else "shared"] += 1
+
+        if not owner:
+            return future.result(), "shared"
+        try:
+            data = render()
+        except BaseException as e:
+            with self.lock:
+                del self.pending[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self._store(key, data)
+            del self.pending[key]
+        future.set_result(data)
+        return data, "miss"
+
+    def _store(self, key, data):
+        # 上限を超える1件は保持しない
+        if len(data) > self.max_bytes:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.counts["evicted"] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, entries=len(self.entries), bytes=self.size, max_bytes=self.max_bytes,
+                        pending=len(self.pending))
+
+
+def resolve_document(doc):
+    """文書記述を検証し、(create_test_document の引数（items は (連番, TestItem) のリスト）, キー) を返す"""
+    missing = [key for key in DOCUMENT_KEYS if key not in doc]
+    if missing:
+        raise ValueError(f"missing keys {', '.join(missing)}")
+    # 必須キーは空でない文字列に限る（items のみ項目のリストも受け付ける）
+    invalid = [
+        key for key in DOCUMENT_KEYS
+        if not (key == "items" and isinstance(doc[key], list)) and not (isinstance(doc[key], str) and doc[key])
+    ]
+    if invalid:
+        raise ValueError(f"keys must be non-empty strings: {', '.join(invalid)}")
+    if not isinstance(doc.get("filter") or {}, dict):
+        raise ValueError("filter must be an object")
+    unknown = set(doc.get("filter") or {}) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"unknown filter keys {', '.join(sorted(unknown))}")
+
+    source = doc["items"]
+    items = source if isinstance(source, list) else iter_items(source)
+    items = [(test_num, to_test_item(item))
+             for test_num, item in number_items(apply_item_filter(items, doc.get("filter")))]
+
+    args = {key: doc[key] for key in DOCUMENT_KEYS}
+    args["items"] = items
+    # 連番も含める（絞り込んだ文書は元の連番でIDを振るため）
+    described = dict(args, items=[(test_num, item.to_dict()) for test_num, item in items])
+    digest = hashlib.sha256(json.dumps(described, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return args, digest.hexdigest()
+
+
+class DocumentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, documents, cache, validate=False):
+        super().__init__(address, DocumentRequestHandler)
+        self.documents = documents
+        self.cache = cache
+        self.validate = validate
+        # openpyxl のブック構築は GIL で直列化されるため、生成は1件ずつ行う
+        self.render_lock = threading.Lock()
+
+    def find_document(self, name):
+        for doc in self.documents:
+            if name in (doc["filename"], doc["doc_name"]):
+                return doc
+        return None
+
+    def render(self, args, key):
+        """resolve_document の結果から (xlsx のバイト列, キャッシュ状態, 生成時間[ms]) を返す"""
+        started = time.perf_counter()
+
+        def render():
+            with self.render_lock:
+                return render_test_document(**args, validate=self.validate)
+
+        data, status = self.cache.get_or_render(key, render)
+        return data, status, (time.perf_counter() - started) * 1000
+
+
+class DocumentRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/":
+            self.send_json(HTTPStatus.OK, [
+                {"filename": doc["filename"], "doc_name": doc["doc_name"], "test_type": doc["test_type"],
+                 "url": "/documents/" + quote(doc["filename"])}
+                for doc in self.server.documents
+            ])
+        elif path == "/stats":
+            self.send_json(HTTPStatus.OK, self.server.cache.stats())
+        elif path.startswith("/documents/"):
+            doc = self.server.find_document(unquote(path[len("/documents/"):]))
+            if doc is None:
+                self.send_json(HTTPStatus.NOT_FOUND, {"error": f"unknown document: {unquote(path)}"})
+                return
+            self.send_document(doc)
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"not found: {path}"})
+
+    def do_POST(self):
+        # 本文を読まずに応答する場合は、残った本文を次の要求と誤認しないよう接続を閉じる
+        if urlsplit(self.path).path != "/documents":
+            self.close_connection = True
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"not found: {self.path}"})
+            return
+        if self.headers.get("Content-Length") is None:
+            self.close_connection = True
+            self.send_json(HTTPStatus.LENGTH_REQUIRED, {"error": "Content-Length required"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            self.close_connection = True
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": f"invalid Content-Length: {self.headers['Content-Length']}"})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"})
+            return
+        try:
+            doc = json.loads(self.rfile.read(length))
+            if not isinstance(doc, dict):
+                raise ValueError("request body must be a JSON object")
+            source = doc.get("items")
+            if not isinstance(source, list) and not (isinstance(source, str) and source in ITEM_SOURCES):
+                # 任意のファイルを読ませないよう、ファイル指定の項目ソースは受け付けない
+                raise ValueError(f"items must be a list or one of {', '.join(ITEM_SOURCES)}")
+        except ValueError as e:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        self.send_document(doc)
+
+    def send_document(self, doc):
+        try:
+            args, key = resolve_document(doc)
+        except (ValueError, TypeError) as e:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_error_json(e)
+            return
+
+        # 内容が変わっていなければ生成せずに 304 を返す
+        etag = f'"{key}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        try:
+            data, status, elapsed = self.server.render(args, key)
+        except ValueError as e:
+            self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_error_json(e)
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", XLSX_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(doc['filename'])}")
+        self.send_header("ETag", etag)
+        self.send_header("X-Cache", status)
+        self.send_header("Server-Timing", f"render;dur={elapsed:.1f}")
+        self.end_headers()
+        view = memoryview(data)
+        for offset in range(0, len(view), STREAM_CHUNK):
+            self.wfile.write(view[offset:offset + STREAM_CHUNK])
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, error):
+        """想定外の例外を記録し、500 を返す（応答せずにスレッドが終わると接続が切れるだけになる）"""
+        self.log_error("%s", traceback.format_exc().rstrip())
+        self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(error).__name__}: {error}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IT2試験書を HTTP で要求に応じて生成する")
+    parser.add_argument("--manifest", help="提供する文書のマニフェスト(JSON)（既定: DEFAULT_DOCUMENTS）")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けアドレス（既定: 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8765, help="待ち受けポート（既定: 8765）")
+    parser.add_argument("--cache-mb", type=float, default=64, help="キャッシュの合計サイズ上限（MB、既定: 64）")
+    parser.add_argument("--validate", action="store_true", help="生成時に結合範囲・罫線の整合性を検査する")
+    parser.add_argument("--prewarm", action="store_true", help="起動時に全文書を生成してキャッシュしておく")
+    args = parser.parse_args()
+
+    documents = load_manifest(args.manifest)[1] if args.manifest else DEFAULT_DOCUMENTS
+    cache = DocumentCache(int(args.cache_mb * 1024 * 1024))
+    server = DocumentServer((args.host, args.port), documents, cache, args.validate)
+
+    # テンプレート（固定部分とスタイル）を先に構築しておき、要求ごとには項目行だけを書き込む
+    get_document_template()
+    if args.prewarm:
+        for doc in documents:
+            data, _, elapsed = server.render(*resolve_document(doc))
+            print(f"  {doc['filename']}: {len(data):,} bytes, {elapsed:.0f} ms")
+
+    print(f"Serving {len(documents)} document(s) on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 SQL時間内訳スクリプト
+サーバーログ（utils/server-logger.ts の pino JSON）から SQL クエリとAPIリクエストを読み込み、
+計測したリクエストの時間帯に実行された SQL の時間を集計して、レイテンシを SQL / アプリに分ける
+
+結果は試験書の備考セルに【SQL時間内訳】として書き込む。
+
+ログは1行1JSONで、utils/database-logger.ts の出力を次のように扱う:
+    msg "Database Query" / "SQL Query Executed"  → SQL（data[0].executionTime, table）
+    msg "<METHOD> <パス>"                         → APIリクエスト（ログ時刻を終了時刻とする）
+
+計測時間帯ファイル（JSON）の形式:
+    {
+      "ST01-IT2-PT-14": [["2026-10-19T01:00:00.000Z", "2026-10-19T01:00:01.820Z"], ...],
+      "ST02-IT2-LT-1": {"from": "2026-10-19T02:00:00Z", "to": "2026-10-19T02:05:00Z"}
+    }
+    配列はリクエストごとの [開始, 終了]。from/to は、その時間帯のAPIログのうち
+    試験項目の設計仕様に記載されたエンドポイントへのリクエストを計測対象とする。
+    時刻は ISO 8601 または UNIX 時刻（秒）。
+
+ログの出力形式の制約（utils/server-logger.ts / logAPIEndpoint）:
+    ・JSON で出力されるのは NODE_ENV=production のときだけで、それ以外は pino-pretty の整形済みテキストに
+      なるため読み込めない（JSON の行が1行もないログはエラーにする）
+    ・APIログが全リクエスト分出力されるのは NODE_ENV=development のときだけで、それ以外の環境では
+      1000ms を超えたリクエストとエラーのみになる。from/to 指定ではそのログに載ったリクエストしか
+      計測対象にできないため、development 以外のログから求めた項目は「遅いリクエストのみ」と明記する。
+      全リクエストを対象にするには、k6 等の計測結果からリクエストごとの [開始, 終了] を配列で指定する
+
+同時に実行されたリクエストの時間帯が重なる場合、重なった時間帯の SQL は重なったリクエストの数で
+等分して計上する（どのリクエストのクエリかはログから判別できないため）。
+
+大きなログファイルは、約 INDEX_STRIDE バイトごとの時刻と位置を <ログ>.tsidx に保存し、
+2回目以降は必要な時間帯の位置から読み込む。
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from generate_it2_test_docs import annotate_item_notes, iter_test_items, to_test_item
+from it2_batch import iter_items
+
+# 時刻インデックスの間隔（バイト）と保存先の拡張子
+INDEX_STRIDE = 1 << 20
+INDEX_SUFFIX = ".tsidx"
+
+# 複数インスタンスのログ等で時刻が前後する場合の許容幅（秒）
+ORDER_SLACK = 5.0
+
+# 近接する計測時間帯をまとめて1回で読み込む間隔（秒）
+SPAN_GAP = 60.0
+
+# SQL のログメッセージ
+SQL_MESSAGES = ("Database Query", "SQL Query Executed")
+
+# 備考に書き込むセクションの見出し
+NOTE_HEADING = "SQL時間内訳"
+
+TIME_PATTERN = re.compile(rb'"time":\s*(?:"([^"]+)"|(\d+(?:\.\d+)?))')
+API_MESSAGE = re.compile(r"^(GET|POST|PUT|PATCH|DELETE) (/\S*)$")
+SPEC_ENDPOINT = re.compile(r"(GET|POST|PUT|PATCH|DELETE) (/api/\S+)")
+# JSON を解析する前に SQL / API の行を選り分けるための文字列
+EVENT_MARKERS = tuple(f'"msg":"{msg}'.encode("utf-8")
+                      for msg in SQL_MESSAGES + ("GET ", "POST ", "PUT ", "PATCH ", "DELETE "))
+
+
+def parse_time(value):
+    """ISO 8601 文字列・UNIX 時刻（秒 / pino 既定のミリ秒）を UNIX 時刻（秒）にする"""
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return parse_time(float(value))
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def line_time(line):
+    """ログ1行の時刻（秒）を JSON 全体を解析せずに取り出す"""
+    match = TIME_PATTERN.search(line)
+    if match is None:
+        return None
+    iso, number = match.groups()
+    return parse_time(iso.decode("ascii")) if iso else parse_time(float(number))
+
+
+def parse_ms(value):
+    """executionTime（"12.34ms" または数値）をミリ秒の数値にする"""
+    if isinstance(value, str):
+        value = value.removesuffix("ms")
+    return float(value)
+
+
+def build_time_index(path):
+    """ログを1回走査し、約 INDEX_STRIDE バイトごとに (それまでの最大時刻, 行の開始位置) を記録する"""
+    times = array("d")
+    offsets = array("q")
+    latest = float("-inf")
+    next_mark = 0
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if offset >= next_mark:
+                t = line_time(line)
+                if t is not None:
+                    # 時刻が前後しても二分探索できるよう単調増加にそろえる
+                    latest = max(latest, t)
+                    times.append(latest)
+                    offsets.append(offset)
+                    next_mark = offset + INDEX_STRIDE
+            offset += len(line)
+    return times, offsets
+
+
+def load_time_index(path):
+    """保存済みの時刻インデックスを読み込む（ログが更新されていれば作り直して保存する）"""
+    stat = os.stat(path)
+    index_path = path + INDEX_SUFFIX
+    try:
+        with open(index_path, "rb") as f:
+            size, mtime_ns, count = struct.unpack("<qqq", f.read(24))
+            if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                times = array("d")
+                offsets = array("q")
+                times.fromfile(f, count)
+                offsets.fromfile(f, count)
+                return times, offsets
+    except (OSError, EOFError, struct.error):
+        pass
+
+    times, offsets = build_time_index(path)
+    if not times and stat.st_size:
+        raise ValueError(f"{path}: no pino JSON lines (pino-pretty output of a non-production server "
+                         "cannot be read)")
+    try:
+        with open(index_path, "wb") as f:
+            f.write(struct.pack("<qqq", stat.st_size, stat.st_mtime_ns, len(times)))
+            times.tofile(f)
+            offsets.tofile(f)
+    except OSError:
+        # 書き込めない場所のログはインデックスを保存せずに使う
+        pass
+    return times, offsets
+
+
+def iter_log_events(path, index, start, end):
+    """start〜end（秒）の SQL / API イベントを (時刻, 種別, 内容) で順に返す
+
+    種別 "sql" の内容は (テーブル, ミリ秒)、"api" は (メソッド, パス, ステータス, ミリ秒, NODE_ENV)。
+    """
+    times, offsets = index
+    i = bisect_left(times, start - ORDER_SLACK) - 1
+    with open(path, "rb") as f:
+        f.seek(offsets[i] if i >= 0 else 0)
+        for line in f:
+            if not any(marker in line for marker in EVENT_MARKERS):
+                continue
+            t = line_time(line)
+            if t is None:
+                continue
+            if t > end + ORDER_SLACK:
+                break
+            if t < start or t > end:
+                continue
+            try:
+                record = json.loads(line)
+                data = (record.get("data") or [{}])[0]
+                msg = record.get("msg", "")
+                if msg in SQL_MESSAGES:
+                    yield t, "sql", (data.get("table") or "(unknown)", parse_ms(data["executionTime"]))
+                    continue
+                match = API_MESSAGE.match(msg)
+                if match:
+                    path_only = match.group(2).split("?", 1)[0]
+                    yield t, "api", (match.group(1), path_only, data.get("statusCode"),
+                                     parse_ms(data["executionTime"]), record.get("env"))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+
+
+def coalesce_spans(windows):
+    """(開始, 終了) の一覧を、近接するものをまとめた読み込み範囲にする"""
+    spans = []
+    for start, end in sorted(windows):
+        if spans and start - spans[-1][1] <= SPAN_GAP:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return spans
+
+
+def iter_span_events(log_paths, indexes, spans):
+    """読み込み範囲ごとに全ログファイルのイベントを返す"""
+    for start, end in spans:
+        for path in log_paths:
+            yield from iter_log_events(path, indexes[path], start, end)
+
+
+def endpoint_pattern(method, path):
+    """設計仕様のエンドポイント（/api/test-groups/[groupId] 等）をパスの正規表現にする"""
+    parts = [r"[^/]+" if part.startswith("[") else re.escape(part) for part in path.strip("/").split("/")]
+    return method, re.compile("^/" + "/".join(parts) + "/?$")
+
+
+def item_endpoints(items, screen_id, test_type):
+    """試験項目IDごとの設計仕様のエンドポイント [(メソッド, パス正規表現)]"""
+    endpoints = {}
+    for test_id, item in iter_test_items(items, screen_id, test_type):
+        item = to_test_item(item)
+        endpoints[test_id] = [endpoint_pattern(m, p) for m, p in SPEC_ENDPOINT.findall(item.spec)]
+    return endpoints
+
+
+def load_windows(path):
+    """計測時間帯ファイルを読み込み、(明示した時間帯 {ID: [(開始, 終了)]}, 範囲 {ID: (from, to)}) を返す"""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    explicit = {}
+    ranges = {}
+    for test_id, spec in raw.items():
+        if isinstance(spec, dict):
+            ranges[test_id] = (parse_time(spec["from"]), parse_time(spec["to"]))
+        else:
+            explicit[test_id] = [(parse_time(s), parse_time(e)) for s, e in spec]
+    return explicit, ranges
+
+
+# APIログが全リクエスト分出力される NODE_ENV（それ以外は 1000ms 超とエラーのみ）
+FULL_API_LOG_ENV = "development"
+
+
+def resolve_windows(log_paths, indexes, explicit, ranges, endpoints):
+    """範囲指定の試験項目は、範囲内のAPIログから計測対象のリクエスト時間帯を求める
+
+    (試験項目IDごとの時間帯, 遅いリクエストのAPIログしかない範囲指定の試験項目IDの集合) を返す。
+    """
+    windows = {test_id: list(w) for test_id, w in explicit.items()}
+    slow_only = set()
+    if not ranges:
+        return windows, slow_only
+
+    spans = coalesce_spans(ranges.values())
+    for t, kind, detail in iter_span_events(log_paths, indexes, spans):
+        if kind != "api":
+            continue
+        method, path, _, ms, env = detail
+        for test_id, (start, end) in ranges.items():
+            if not start <= t <= end:
+                continue
+            patterns = endpoints.get(test_id)
+            if patterns and not any(m == method and p.match(path) for m, p in patterns):
+                continue
+            windows.setdefault(test_id, []).append((t - ms / 1000, t))
+            if env != FULL_API_LOG_ENV:
+                slow_only.add(test_id)
+    return windows, slow_only
+
+
+def attribute_sql_time(log_paths, indexes, windows):
+    """計測時間帯ごとに SQL 時間を集計し、試験項目IDごとの内訳を返す
+
+    同時に実行されたリクエストの時間帯が重なる場合、重なった SQL の時間・件数は
+    重なった時間帯の数で等分する（SQL 時間はリクエストのレイテンシを上限とする）。
+    """
+    flat = sorted((start, end, test_id) for test_id, ws in windows.items() for start, end in ws)
+    starts = [start for start, _, _ in flat]
+    longest = max((end - start for start, end, _ in flat), default=0.0)
+    sql_ms = [0.0] * len(flat)
+    queries = [0.0] * len(flat)
+    tables = [defaultdict(float) for _ in flat]
+
+    spans = coalesce_spans((start, end) for start, end, _ in flat)
+    for t, kind, detail in iter_span_events(log_paths, indexes, spans):
+        if kind != "sql":
+            continue
+        table, ms = detail
+        # SQL のログ時刻（終了時刻）を含む時間帯を、開始時刻の降順に探す
+        matched = []
+        j = bisect_right(starts, t) - 1
+        while j >= 0 and starts[j] >= t - longest:
+            if t <= flat[j][1]:
+                matched.append(j)
+            j -= 1
+        share = 1 / len(matched) if matched else 0.0
+        for j in matched:
+            sql_ms[j] += ms * share
+            queries[j] += share
+            tables[j][table] += ms * share
+
+    breakdown = {}
+    for j, (start, end, test_id) in enumerate(flat):
+        latency = (end - start) * 1000
+        entry = breakdown.setdefault(test_id, {
+            "requests": 0, "latency_ms": 0.0, "sql_ms": 0.0, "queries": 0, "tables": defaultdict(float),
+        })
+        entry["requests"] += 1
+        entry["latency_ms"] += latency
+        entry["sql_ms"] += min(sql_ms[j], latency)
+        entry["queries"] += queries[j]
+        for table, ms in tables[j].items():
+            entry["tables"][table] += ms
+
+    for entry in breakdown.values():
+        n = entry["requests"]
+        entry["latency_ms"] /= n
+        entry["sql_ms"] /= n
+        entry["app_ms"] = entry["latency_ms"] - entry["sql_ms"]
+        entry["sql_ratio"] = entry["sql_ms"] / entry["latency_ms"] if entry["latency_ms"] else 0.0
+        entry["queries"] /= n
+        entry["tables"] = dict(sorted(((t, ms / n) for t, ms in entry["tables"].items()),
+                                      key=lambda pair: pair[1], reverse=True))
+    return breakdown
+
+
+def format_breakdown(entry, top=3):
+    """内訳を備考に書き込む文字列にする"""
+    lines = [
+        f"計測リクエスト: {entry['requests']}件（平均 {entry['latency_ms']:.0f}ms）",
+        f"SQL: 平均 {entry['sql_ms']:.0f}ms（{entry['sql_ratio'] * 100:.0f}%）、平均 {entry['queries']:.1f}クエリ",
+        f"アプリ: 平均 {entry['app_ms']:.0f}ms",
+    ]
+    if entry["tables"]:
+        tables = list(entry["tables"].items())[:top]
+        lines.append("SQL上位: " + ", ".join(f"{table} {ms:.0f}ms" for table, ms in tables))
+    if entry.get("slow_only"):
+        lines.append("※APIログが1000ms超・エラーのリクエストのみのため、計測対象はそれらに限る")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サーバーログからPT/LT項目のレイテンシを SQL / アプリ時間に分けて試験書に書き込む")
+    parser.add_argument("logs", nargs="+", help="サーバーログ（pino JSON Lines）のパス")
+    parser.add_argument("--windows", required=True, help="計測時間帯ファイル(JSON)のパス")
+    parser.add_argument("--workbook", help="備考を書き込む試験書(xlsx)のパス")
+    parser.add_argument("--source", help="範囲指定の項目のエンドポイントを求める項目ソース（ITEM_SOURCES の名前 / .json / .jsonl / .xlsx）")
+    parser.add_argument("--screen-id", default="ST01", help="ID採番に使う画面ID（既定: ST01）")
+    parser.add_argument("--test-type", default="IT2-PT", help="ID採番に使う試験種別（既定: IT2-PT）")
+    parser.add_argument("--json", help="内訳を JSON で書き出すパス")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    explicit, ranges = load_windows(args.windows)
+    endpoints = item_endpoints(iter_items(args.source), args.screen_id, args.test_type) if args.source else {}
+    try:
+        indexes = {path: load_time_index(path) for path in args.logs}
+    except ValueError as e:
+        parser.error(str(e))
+    windows, slow_only = resolve_windows(args.logs, indexes, explicit, ranges, endpoints)
+    breakdown = attribute_sql_time(args.logs, indexes, windows)
+    for test_id in slow_only & set(breakdown):
+        breakdown[test_id]["slow_only"] = True
+
+    for test_id in sorted(set(explicit) | set(ranges)):
+        if test_id not in breakdown:
+            print(f"No requests: {test_id}")
+            continue
+        entry = breakdown[test_id]
+        print(f"{test_id}: {entry['requests']} requests, latency {entry['latency_ms']:.0f}ms, "
+              f"SQL {entry['sql_ms']:.0f}ms ({entry['sql_ratio'] * 100:.0f}%)"
+              + (" [slow requests only]" if entry.get("slow_only") else ""))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(breakdown, f, ensure_ascii=False, indent=2)
+    if args.workbook:
+        notes = {test_id: format_breakdown(entry) for test_id, entry in breakdown.items()}
+        missing = annotate_item_notes(args.workbook, notes, NOTE_HEADING)
+        for test_id in sorted(missing):
+            print(f"Not found in workbook: {test_id}")
+        print(f"Annotated: {args.workbook}")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 負荷テスト時系列分析スクリプト
+k6 の計測結果（--out json= / --out csv=）を時間窓ごとに集計し、持続負荷（LT-7）・
+スパイク（LT-9）の評価に必要な推移を求める
+
+    ・移動パーセンタイル（p50 / p95 / p99）とスループット・エラー率
+    ・変化点（レイテンシの水準が変わった時刻）
+    ・レイテンシの増加傾向（ms/分）
+    ・スパイク後の回復時間
+    ・エラーの集中発生区間
+
+サンプルは CHUNK_LINES 行ずつ読み込み、時間窓 × 対数ビンのヒストグラムに加算する。
+ヒストグラムは足し合わせられるため、1時間を超える計測でもメモリ使用量は時間窓の数に比例するだけで済む。
+同じ計測を繰り返し分析する場合は、it2_archive で変換したアーカイブ（.k6a）を指定すると読み込みを省ける。
+結果は試験項目IDごとに JSON と試験書の備考セル（【時系列分析】）へ書き出す。
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from generate_it2_test_docs import annotate_item_notes
+from it2_sql_time import parse_time
+
+# 1回に読み込む行数
+CHUNK_LINES = 200_000
+
+# レイテンシの対数ビン（相対誤差 約1%、0.1ms〜1時間）
+BIN_GROWTH = 0.02
+BIN_MIN_MS = 0.1
+BIN_COUNT = int(np.ceil(np.log(3_600_000 / BIN_MIN_MS) / np.log1p(BIN_GROWTH))) + 1
+
+# 備考に書き込むセクションの見出し
+NOTE_HEADING = "時系列分析"
+
+PERCENTILES = (50, 95, 99)
+
+
+def latency_bins(values):
+    """レイテンシ（ms）を対数ビンの番号にする"""
+    clipped = np.maximum(values, BIN_MIN_MS)
+    bins = np.floor(np.log(clipped / BIN_MIN_MS) / np.log1p(BIN_GROWTH)).astype(np.int64)
+    return np.minimum(bins, BIN_COUNT - 1)
+
+
+def bin_values():
+    """各ビンの代表値（ビン内の幾何平均、ms）"""
+    return BIN_MIN_MS * (1 + BIN_GROWTH) ** (np.arange(BIN_COUNT) + 0.5)
+
+
+class WindowedHistogram:
+    """時間窓 × レイテンシビンのヒストグラム（チャンク単位で加算できる）"""
+
+    def __init__(self, step):
+        self.step = step
+        self.origin = None
+        self.hist = np.zeros((0, BIN_COUNT), dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+
+    def _ensure(self, first, last):
+        """窓番号 first〜last を保持できるよう配列を前後に広げる"""
+        if first < 0:
+            pad = -first
+            self.hist = np.vstack([np.zeros((pad, BIN_COUNT), dtype=np.int64), self.hist])
+            self.errors = np.concatenate([np.zeros(pad, dtype=np.int64), self.errors])
+            self.origin -= pad * self.step
+            last += pad
+        if last >= len(self.hist):
+            # 倍々に広げて再確保の回数を抑える
+            size = max(last + 1, len(self.hist) * 2)
+            grown = np.zeros((size, BIN_COUNT), dtype=np.int64)
+            grown[:len(self.hist)] = self.hist
+            self.hist = grown
+            self.errors = np.concatenate([self.errors, np.zeros(size - len(self.errors), dtype=np.int64)])
+
+    def add(self, times, values, failed):
+        """サンプル（UNIX 時刻[秒], レイテンシ[ms], 失敗か）の配列を加算する"""
+        if len(times) == 0:
+            return
+        if self.origin is None:
+            self.origin = np.floor(times.min() / self.step) * self.step
+        windows = np.floor((times - self.origin) / self.step).astype(np.int64)
+        self._ensure(int(windows.min()), int(windows.max()))
+        # 前方に広げた場合は開始時刻が変わるので窓番号を求め直す
+        windows = np.floor((times - self.origin) / self.step).astype(np.int64)
+        flat = windows * BIN_COUNT + latency_bins(values)
+        self.hist += np.bincount(flat, minlength=self.hist.size)[:self.hist.size].reshape(self.hist.shape)
+        self.errors += np.bincount(windows[failed], minlength=len(self.errors))[:len(self.errors)]
+
+    def trimmed(self):
+        """サンプルのある最初の窓〜最後の窓の (ヒストグラム, エラー数, 開始時刻)"""
+        counts = self.hist.sum(axis=1)
+        used = np.nonzero(counts)[0]
+        if len(used) == 0:
+            return self.hist[:0], self.errors[:0], self.origin or 0.0
+        first, last = used[0], used[-1] + 1
+        return self.hist[first:last], self.errors[first:last], self.origin + first * self.step
+
+
+def iter_k6_chunks(path, metric="http_req_duration"):
+    """k6 の結果ファイルから (時刻, レイテンシ, 失敗か) の配列を CHUNK_LINES 件ずつ返す
+
+    <アーカイブ>.k6a[#<試験項目ID>]（it2_archive で変換済み）を指定した場合はアーカイブから読む。
+    """
+    if path.partition("#")[0].endswith(".k6a"):
+        # it2_archive は本モジュールを import するため、ここで読み込む
+        from it2_archive import open_archive
+
+        archive, test_id = open_archive(path)
+        if archive.header["metric"] != metric:
+            raise ValueError(f"{path}: archive holds {archive.header['metric']}, not {metric}")
+        yield from archive.iter_chunks(test_id)
+        return
+
+    times, values, failed = [], [], []
+
+    def flush():
+        chunk = (np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64),
+                 np.asarray(failed, dtype=bool))
+        times.clear()
+        values.clear()
+        failed.clear()
+        return chunk
+
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("metric_name") != metric:
+                    continue
+                times.append(float(row["timestamp"]))
+                values.append(float(row["metric_value"]))
+                failed.append(_failed(row.get("expected_response"), row.get("status")))
+                if len(times) >= CHUNK_LINES:
+                    yield flush()
+        else:
+            marker = f'"metric":"{metric}"'
+            for line in f:
+                if marker not in line or '"type":"Point"' not in line:
+                    continue
+                data = json.loads(line)["data"]
+                tags = data.get("tags") or {}
+                times.append(parse_time(data["time"]))
+                values.append(float(data["value"]))
+                failed.append(_failed(tags.get("expected_response"), tags.get("status")))
+                if len(times) >= CHUNK_LINES:
+                    yield flush()
+    if times:
+        yield flush()
+
+
+def _failed(expected_response, status):
+    """k6 の expected_response タグ（なければステータス）から失敗かを判定する"""
+    if expected_response not in (None, ""):
+        return str(expected_response).lower() == "false"
+    try:
+        return not 200 <= int(status) < 400
+    except (TypeError, ValueError):
+        return False
+
+
+def rolling_percentiles(hist, window, percentiles=PERCENTILES):
+    """window 個の時間窓を合算した移動パーセンタイル（ms）を [パーセンタイル, 窓] の配列で返す"""
+    cumulative = np.cumsum(hist, axis=0)
+    rolled = cumulative.copy()
+    rolled[window:] -= cumulative[:-window]
+    totals = rolled.sum(axis=1)
+    by_bin = np.cumsum(rolled, axis=1)
+    centers = bin_values()
+    result = np.full((len(percentiles), len(hist)), np.nan)
+    for k, p in enumerate(percentiles):
+        target = np.ceil(totals * p / 100)
+        reached = by_bin >= target[:, None]
+        index = reached.argmax(axis=1)
+        result[k] = np.where(totals > 0, centers[index], np.nan)
+    return result
+
+
+def detect_change_points(series, max_points=5, min_size=3):
+    """平均の変化点を二分割法で求める（区間内の二乗誤差の減少が BIC 罰則を上回る点のみ採用）"""
+    values = np.asarray(series, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.sum() < 2 * min_size:
+        return []
+    values = np.where(valid, values, np.nanmedian(values))
+    variance = np.var(np.diff(values)) / 2 or 1e-12
+    penalty = 2 * variance * np.log(len(values))
+
+    def best_split(start, end):
+        segment = values[start:end]
+        n = len(segment)
+        if n < 2 * min_size:
+            return None, 0.0
+        cs = np.cumsum(segment)
+        cs2 = np.cumsum(segment ** 2)
+        k = np.arange(min_size, n - min_size + 1)
+        left = cs2[k - 1] - cs[k - 1] ** 2 / k
+        right = (cs2[-1] - cs2[k - 1]) - (cs[-1] - cs[k - 1]) ** 2 / (n - k)
+        total = cs2[-1] - cs[-1] ** 2 / n
+        gain = total - (left + right)
+        i = int(gain.argmax())
+        return start + int(k[i]), float(gain[i])
+
+    points = []
+    segments = [(0, len(values))]
+    while segments and len(points) < max_points:
+        candidates = [(best_split(s, e), (s, e)) for s, e in segments]
+        (split, gain), (s, e) = max(candidates, key=lambda c: c[0][1])
+        if split is None or gain <= penalty:
+            break
+        points.append(split)
+        segments.remove((s, e))
+        segments += [(s, split), (split, e)]
+    return sorted(points)
+
+
+def error_bursts(error_rate, counts, threshold):
+    """エラー率が threshold を超えた連続区間 [(開始窓, 終了窓, エラー数)]"""
+    above = np.concatenate([[False], error_rate > threshold, [False]])
+    edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+    return [(int(s), int(e), int(counts[s:e].sum())) for s, e in zip(edges[::2], edges[1::2])]
+
+
+def recovery_time(p95, rps, step, baseline_s, tolerance, spike_factor, hold):
+    """スパイク後の回復時間（秒）を求める
+
+    開始から baseline_s 秒の p95・スループットの中央値を基準とし、スループットが基準の
+    spike_factor 倍を超えた最後の時間窓の終わりから、p95 が基準 ×(1 + tolerance) 以下に
+    戻って hold 窓続いた時点までを回復時間とする（スループットの急増がなければ p95 の最大時点から）。
+    """
+    baseline_windows = max(1, int(baseline_s // step))
+    base_p95 = float(np.nanmedian(p95[:baseline_windows]))
+    base_rps = float(np.median(rps[:baseline_windows]))
+    limit = base_p95 * (1 + tolerance)
+
+    spiked = np.flatnonzero(rps > base_rps * spike_factor)
+    if len(spiked):
+        load_end = int(spiked[-1]) + 1
+    else:
+        load_end = int(np.nanargmax(p95)) + 1 if np.any(~np.isnan(p95)) else 0
+
+    ok = np.nan_to_num(p95, nan=np.inf) <= limit
+    for i in range(load_end, len(ok) - hold + 1):
+        if ok[i:i + hold].all():
+            return {"baseline_p95_ms": base_p95, "limit_ms": limit, "load_end_s": load_end * step,
+                    "recovered_s": i * step, "recovery_s": (i - load_end) * step}
+    return {"baseline_p95_ms": base_p95, "limit_ms": limit, "load_end_s": load_end * step,
+            "recovered_s": None, "recovery_s": None}
+
+
+def analyze(path, step=5.0, window_s=60.0, error_threshold=0.01, baseline_s=60.0,
+            tolerance=0.2, spike_factor=2.0, hold=3):
+    """k6 の結果ファイル1件を分析し、(要約, 時間窓ごとの系列) を返す"""
+    histogram = WindowedHistogram(step)
+    samples = 0
+    for times, values, failed in iter_k6_chunks(path):
+        histogram.add(times, values, failed)
+        samples += len(times)
+    hist, errors, start = histogram.trimmed()
+    if samples == 0:
+        raise ValueError(f"{path}: no http_req_duration samples")
+
+    window = max(1, int(round(window_s / step)))
+    counts = hist.sum(axis=1)
+    rps = counts / step
+    error_rate = np.divide(errors, counts, out=np.zeros(len(counts)), where=counts > 0)
+    rolling = rolling_percentiles(hist, window)
+    p95 = rolling[PERCENTILES.index(95)]
+    bucket_p95 = rolling_percentiles(hist, 1)[PERCENTILES.index(95)]
+    overall = rolling_percentiles(hist.sum(axis=0, keepdims=True), 1)[:, 0]
+
+    # レイテンシの増加傾向は時間窓ごとの p95 の回帰直線の傾き（ms/分）
+    minutes = np.arange(len(hist)) * step / 60
+    valid = ~np.isnan(bucket_p95)
+    creep = float(np.polyfit(minutes[valid], bucket_p95[valid], 1)[0]) if valid.sum() >= 2 else 0.0
+    tenth = max(1, len(hist) // 10)
+    change_points = detect_change_points(np.log(bucket_p95))
+
+    summary = {
+        "source": os.path.abspath(path),
+        "samples": samples,
+        "start": start,
+        "duration_s": len(hist) * step,
+        "step_s": step,
+        "window_s": window * step,
+        "overall_ms": dict(zip((f"p{p}" for p in PERCENTILES), map(float, overall))),
+        "rps_mean": float(rps.mean()),
+        "rps_min": float(rps.min()),
+        "error_rate": float(errors.sum() / counts.sum()),
+        "p95_first_ms": float(np.nanmedian(bucket_p95[:tenth])),
+        "p95_last_ms": float(np.nanmedian(bucket_p95[-tenth:])),
+        "p95_creep_ms_per_min": creep,
+        "p95_max_ms": float(np.nanmax(p95)),
+        "change_points_s": [cp * step for cp in change_points],
+        "error_bursts": [{"start_s": s * step, "end_s": e * step, "errors": n}
+                         for s, e, n in error_bursts(error_rate, errors, error_threshold)],
+        "recovery": recovery_time(bucket_p95, rps, step, baseline_s, tolerance, spike_factor, hold),
+    }
+    series = {
+        "t_s": np.arange(len(hist)) * step,
+        "requests": counts,
+        "rps": rps,
+        "errors": errors,
+        "error_rate": error_rate,
+        **{f"p{p}_ms": rolling[k] for k, p in enumerate(PERCENTILES)},
+    }
+    return summary, series
+
+
+def format_summary(summary):
+    """分析結果を備考に書き込む文字列にする"""
+    overall = summary["overall_ms"]
+    lines = [
+        f"計測: {summary['duration_s'] / 60:.1f}分 {summary['samples']}件 "
+        f"（p95 {overall['p95']:.0f}ms / p99 {overall['p99']:.0f}ms）",
+        f"スループット: 平均 {summary['rps_mean']:.1f} req/s（最小 {summary['rps_min']:.1f}）、"
+        f"エラー率 {summary['error_rate'] * 100:.2f}%",
+        f"p95推移: {summary['p95_first_ms']:.0f}ms → {summary['p95_last_ms']:.0f}ms"
+        f"（傾き {summary['p95_creep_ms_per_min']:+.1f}ms/分、移動p95最大 {summary['p95_max_ms']:.0f}ms）",
+    ]
+    if summary["change_points_s"]:
+        lines.append("変化点: " + ", ".join(f"{t / 60:.1f}分" for t in summary["change_points_s"]))
+    recovery = summary["recovery"]
+    if recovery["recovery_s"] is not None:
+        lines.append(f"回復時間: {recovery['recovery_s']:.0f}秒（基準p95 {recovery['baseline_p95_ms']:.0f}ms）")
+    else:
+        lines.append(f"回復時間: 未回復（基準p95 {recovery['baseline_p95_ms']:.0f}ms）")
+    if summary["error_bursts"]:
+        bursts = summary["error_bursts"]
+        lines.append(f"エラー集中: {len(bursts)}区間（最大 {max(b['errors'] for b in bursts)}件）")
+    return "\n".join(lines)
+
+
+def write_series(path, series):
+    """時間窓ごとの系列を CSV に書き出す"""
+    names = list(series)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in zip(*(series[name] for name in names)):
+            writer.writerow([f"{value:.3f}" if isinstance(value, float) else value for value in map(_scalar, row)])
+
+
+def _scalar(value):
+    value = value.item() if hasattr(value, "item") else value
+    return "" if isinstance(value, float) and np.isnan(value) else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="k6 の計測結果を時系列分析し、試験項目IDごとに結果を書き出す")
+    parser.add_argument("runs", nargs="+", help="<試験項目ID>=<k6 結果ファイル（.json / .csv / .k6a[#<試験項目ID>]）>")
+    parser.add_argument("--step", type=float, default=5.0, help="時間窓の幅（秒、既定: 5）")
+    parser.add_argument("--window", type=float, default=60.0, help="移動パーセンタイルの幅（秒、既定: 60）")
+    parser.add_argument("--error-threshold", type=float, default=0.01, help="エラー集中とみなすエラー率（既定: 0.01）")
+    parser.add_argument("--baseline", type=float, default=60.0, help="回復時間の基準とする開始からの秒数（既定: 60）")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="基準p95からの許容幅（既定: 0.2 = +20%%）")
+    parser.add_argument("--spike-factor", type=float, default=2.0, help="スパイクとみなすスループットの倍率（既定: 2）")
+    parser.add_argument("--hold", type=int, default=3, help="回復とみなす連続時間窓数（既定: 3）")
+    parser.add_argument("--json", help="試験項目IDごとの分析結果を書き出す JSON のパス")
+    parser.add_argument("--series-dir", help="時間窓ごとの系列を <試験項目ID>.csv として書き出すディレクトリ")
+    parser.add_argument("--workbook", help="備考を書き込む試験書(xlsx)のパス")
+    args = parser.parse_args()
+
+    results = {}
+    for run in args.runs:
+        test_id, _, path = run.partition("=")
+        if not path:
+            parser.error(f"invalid run (expected <test_id>=<path>): {run}")
+        started = time.perf_counter()
+        summary, series = analyze(path, args.step, args.window, args.error_threshold, args.baseline,
+                                  args.tolerance, args.spike_factor, args.hold)
+        results[test_id] = summary
+        print(f"{test_id}: {summary['samples']} samples, p95 {summary['overall_ms']['p95']:.0f}ms, "
+              f"{len(summary['change_points_s'])} change point(s) ({time.perf_counter() - started:.2f}s)")
+        if args.series_dir:
+            os.makedirs(args.series_dir, exist_ok=True)
+            write_series(os.path.join(args.series_dir, f"{test_id}.csv"), series)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.workbook:
+        notes = {test_id: format_summary(summary) for test_id, summary in results.items()}
+        missing = annotate_item_notes(args.workbook, notes, NOTE_HEADING)
+        for test_id in sorted(missing):
+            print(f"Not found in workbook: {test_id}")
+        print(f"Annotated: {args.workbook}")
+
+
+if __name__ == "__main__":
+    main()
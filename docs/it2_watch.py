@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験書 監視生成スクリプト
+スタイル・テンプレートを読み込んだプロセスを常駐させ、項目ソースの変更を検知して
+影響する文書だけを再生成する
+
+組み込みの項目ソース（ITEM_SOURCES）は generate_it2_test_docs.py 自体を監視し、
+変更時はモジュールを再読み込みする（TestItem 等を参照する it2_reader / it2_batch も読み込み直す）。
+"""
+
+import argparse
+import importlib
+import os
+import time
+
+import generate_it2_test_docs as generator
+import it2_batch
+import it2_reader
+
+
+def source_path(doc):
+    """文書の項目ソースとして監視するファイルパス"""
+    if doc["items"] in generator.ITEM_SOURCES:
+        return os.path.abspath(generator.__file__)
+    return doc["items"]
+
+
+def snapshot(paths):
+    """監視対象の更新時刻（存在しない場合は None）"""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+
+def rebuild(documents, output_dir):
+    """文書を再生成し、文書ごとの所要時間を表示する"""
+    started = time.perf_counter()
+    for doc in documents:
+        doc_started = time.perf_counter()
+        try:
+            if doc["items"] in generator.ITEM_SOURCES:
+                items = generator.ITEM_SOURCES[doc["items"]]()
+            else:
+                items = it2_batch.iter_items(doc["items"])
+            items = generator.apply_item_filter(items, doc.get("filter"))
+            generator.create_test_document(**it2_batch.document_args(doc, items, output_dir))
+        except Exception as e:
+            # 保存途中のファイル等で失敗しても監視は継続し、次の変更で再試行する
+            print(f"Failed: {doc['filename']}: {e}")
+            continue
+        print(f"  {doc['filename']}: {(time.perf_counter() - doc_started) * 1000:.0f} ms")
+    print(f"Rebuilt {len(documents)} document(s) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def reload_generator():
+    """generate_it2_test_docs と、その TestItem 等を import しているモジュールを依存順に読み込み直す"""
+    importlib.reload(generator)
+    importlib.reload(it2_reader)
+    importlib.reload(it2_batch)
+    generator.get_document_template()
+
+
+def watch(manifest_path, output_dir=None, interval=0.25):
+    """マニフェストと項目ソースを監視し、変更のたびに影響する文書を再生成する"""
+    manifest_path = os.path.abspath(manifest_path)
+    output_override = output_dir
+    manifest_output_dir, documents = it2_batch.load_manifest(manifest_path)
+    output_dir = output_override or manifest_output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # テンプレートを先に構築しておき、以降の再生成では項目行だけを書き込む
+    generator.get_document_template()
+    # 再生成中の変更を取りこぼさないよう、更新時刻は再生成の前に記録する
+    paths = {manifest_path} | {source_path(doc) for doc in documents}
+    mtimes = snapshot(paths)
+    rebuild(documents, output_dir)
+    print(f"Watching {len(paths)} file(s). Press Ctrl+C to stop.")
+
+    while True:
+        time.sleep(interval)
+        current = snapshot(paths)
+        changed = {path for path, mtime in current.items() if mtime != mtimes.get(path)}
+        mtimes = current
+        if not changed:
+            continue
+
+        if manifest_path in changed:
+            try:
+                manifest_output_dir, documents = it2_batch.load_manifest(manifest_path)
+            except ValueError as e:
+                print(f"Failed: {manifest_path}: {e}")
+                continue
+            output_dir = output_override or manifest_output_dir
+            os.makedirs(output_dir, exist_ok=True)
+            affected = documents
+        else:
+            if os.path.abspath(generator.__file__) in changed:
+                reload_generator()
+            affected = [doc for doc in documents if source_path(doc) in changed]
+
+        paths = {manifest_path} | {source_path(doc) for doc in documents}
+        mtimes = dict(current, **snapshot(paths - set(current)))
+
+        print(f"\nChanged: {', '.join(sorted(os.path.basename(p) for p in changed))}")
+        rebuild(affected, output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="項目ソースの変更を監視してIT2試験書を再生成する")
+    parser.add_argument("manifest", help="マニフェスト(JSON)のパス")
+    parser.add_argument("--output-dir", help="出力ディレクトリ（マニフェストの指定より優先）")
+    parser.add_argument("--interval", type=float, default=0.25, help="監視間隔（秒、既定: 0.25）")
+    args = parser.parse_args()
+
+    try:
+        watch(args.manifest, args.output_dir, args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
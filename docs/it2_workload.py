@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+ProofLink 総合テスト(IT2)試験 実測ワークロード生成・再生スクリプト
+アクセスログ（ALB）またはサーバーログ（pino JSON）から、エンドポイント構成比・
+リクエスト到着間隔・シンクタイムを求めたワークロードモデルを作成し、
+倍速で再生する、または k6 のシナリオデータとして出力する
+
+サブコマンド:
+    model  ログからワークロードモデル(JSON)を作成する
+    replay モデルに従って接続プール付きの非同期クライアントでリクエストを再生する
+    k6     tests/load/lt-8-mixed-60min.js の WORKLOAD に指定するシナリオデータを出力する
+
+エンドポイントは数値のパス要素を {id}、TID（数字-数字-数字-数字）を {tid} に置き換えて集計する。
+本番環境のサーバーログは遅いリクエストしか出力しないため、構成比には ALB のアクセスログを使うこと。
+再生・k6 出力は GET のみを対象とする（書き込み系はリクエスト本文を再現できないため除外し、構成比を按分し直す）。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import ssl
+import time
+from array import array
+from collections import Counter, defaultdict
+from http.cookiejar import MozillaCookieJar
+from urllib.parse import urlsplit
+
+from it2_sql_time import parse_ms, parse_time
+
+# 同じクライアントのリクエスト間隔がこれを超えたら別セッションとみなす（秒）
+SESSION_TIMEOUT = 1800.0
+
+# 分布を保存する分位点の数（0%〜100%）
+QUANTILE_POINTS = 101
+
+# 既定で集計対象とするパス・除外するパス（ログイン等は再生できないため除外）
+DEFAULT_INCLUDE = r"^/api/"
+DEFAULT_EXCLUDE = r"^/api/auth/"
+
+# ALB アクセスログ: type time elb client:port target:port 処理時間×3 ステータス×2 バイト数×2 "request" ...
+ALB_LINE = re.compile(
+    r'^\S+ (\S+) \S+ (\S+):\d+ \S+ \S+ (\S+) \S+ (\d+|-) \S+ \d+ \d+ "(\S+) (\S+) [^"]*"'
+)
+API_MESSAGE = re.compile(r"^(GET|POST|PUT|PATCH|DELETE) (/\S*)$")
+ID_SEGMENT = re.compile(r"^\d+$")
+TID_SEGMENT = re.compile(r"^\d+-\d+-\d+-\d+$")
+
+
+def normalize_path(path):
+    """パスの可変部分を {id} / {tid} に置き換える（クエリ文字列は除く）"""
+    segments = []
+    for segment in path.split("?", 1)[0].split("/"):
+        if TID_SEGMENT.match(segment):
+            segments.append("{tid}")
+        elif ID_SEGMENT.match(segment):
+            segments.append("{id}")
+        else:
+            segments.append(segment)
+    return "/".join(segments)
+
+
+def parse_log_line(line):
+    """ログ1行から (開始時刻, 所要秒, クライアント, メソッド, パス, ステータス) を取り出す（対象外は None）"""
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            match = API_MESSAGE.match(record.get("msg", ""))
+            if not match:
+                return None
+            data = (record.get("data") or [{}])[0]
+            seconds = parse_ms(data["executionTime"]) / 1000
+            # pino のログ時刻はレスポンス完了時
+            start = parse_time(record["time"]) - seconds
+            client = str(data.get("userId", "-"))
+            return start, seconds, client, match.group(1), match.group(2), data.get("statusCode")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    match = ALB_LINE.match(line)
+    if not match:
+        return None
+    timestamp, client, target_time, status, method, url = match.groups()
+    seconds = max(float(target_time), 0.0)
+    start = parse_time(timestamp) - seconds
+    return start, seconds, client, method, urlsplit(url).path, None if status == "-" else int(status)
+
+
+def quantiles(values, points=QUANTILE_POINTS):
+    """値の分布を等間隔の分位点で表す（逆関数法で標本を生成するため）"""
+    if not values:
+        return []
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return [round(ordered[round(last * k / (points - 1))], 4) for k in range(points)]
+
+
+def distribution(values):
+    """平均・代表的なパーセンタイル・分位点をまとめる"""
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "quantiles": []}
+    q = quantiles(values)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": q[50], "p90": q[90], "p99": q[99],
+        "quantiles": q,
+    }
+
+
+def build_model(log_paths, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+    """ログを1行ずつ読み込み、ワークロードモデルを作成する
+
+    リクエストは (開始時刻, 所要秒, クライアント番号, エンドポイント番号) を配列に保持し、
+    エンドポイント・クライアントは番号に置き換えて重複する文字列を持たない。
+    """
+    include, exclude = re.compile(include), re.compile(exclude) if exclude else None
+    endpoint_ids = {}
+    client_ids = {}
+    starts, durations = array("d"), array("d")
+    clients, endpoints = array("i"), array("i")
+
+    for path in log_paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parsed = parse_log_line(line)
+                if parsed is None:
+                    continue
+                start, seconds, client, method, url_path, _ = parsed
+                if not include.search(url_path) or (exclude and exclude.search(url_path)):
+                    continue
+                endpoint = f"{method} {normalize_path(url_path)}"
+                starts.append(start)
+                durations.append(seconds)
+                clients.append(client_ids.setdefault(client, len(client_ids)))
+                endpoints.append(endpoint_ids.setdefault(endpoint, len(endpoint_ids)))
+
+    if not starts:
+        raise ValueError("no requests found in logs")
+
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    inter_arrival = [starts[b] - starts[a] for a, b in zip(order, order[1:])]
+
+    # クライアントごとの前回レスポンス完了から次のリクエストまでをシンクタイムとする
+    think = []
+    last_end = {}
+    session_start = {}
+    session_seconds = 0.0
+    sessions = 0
+    for i in order:
+        client = clients[i]
+        end = starts[i] + durations[i]
+        previous = last_end.get(client)
+        if previous is None or starts[i] - previous > SESSION_TIMEOUT:
+            if previous is not None:
+                session_seconds += previous - session_start[client]
+            session_start[client] = starts[i]
+            sessions += 1
+        else:
+            think.append(max(starts[i] - previous, 0.0))
+        last_end[client] = max(end, previous or end)
+    session_seconds += sum(last_end[c] - session_start[c] for c in last_end)
+
+    span = max(starts[order[-1]] + durations[order[-1]] - starts[order[0]], 1e-9)
+    names = {index: name for name, index in endpoint_ids.items()}
+    counts = Counter(endpoints)
+    mix = []
+    for index, count in counts.most_common():
+        method, endpoint_path = names[index].split(" ", 1)
+        mix.append({
+            "endpoint": names[index], "method": method, "path": endpoint_path,
+            "count": count, "ratio": round(count / len(starts), 6),
+        })
+
+    return {
+        "sources": [str(path) for path in log_paths],
+        "requests": len(starts),
+        "clients": len(client_ids),
+        "sessions": sessions,
+        "duration_s": round(span, 3),
+        "rate_rps": round(len(starts) / span, 4),
+        "concurrency": round(session_seconds / span, 3),
+        "mix": mix,
+        "inter_arrival_s": distribution(inter_arrival),
+        "think_time_s": distribution(think),
+        "latency_s": distribution(list(durations)),
+    }
+
+
+def replayable_mix(model):
+    """再生対象（GET）のエンドポイントと構成比（按分し直したもの）を返す"""
+    entries = [entry for entry in model["mix"] if entry["method"] == "GET"]
+    total = sum(entry["ratio"] for entry in entries)
+    if not entries or total <= 0:
+        raise ValueError("no GET endpoints in workload model")
+    excluded = 1 - total
+    if excluded > 1e-9:
+        print(f"Note: {excluded * 100:.1f}% of requests are non-GET and excluded from replay")
+    return [dict(entry, ratio=entry["ratio"] / total) for entry in entries]
+
+
+def sample(quantile_points, rng):
+    """分位点の間を線形補間して分布から1つ標本を取る"""
+    if not quantile_points:
+        return 0.0
+    x = rng.random() * (len(quantile_points) - 1)
+    i = int(x)
+    if i >= len(quantile_points) - 1:
+        return quantile_points[-1]
+    return quantile_points[i] + (quantile_points[i + 1] - quantile_points[i]) * (x - i)
+
+
+class ConnectionPool:
+    """keep-alive の HTTP/1.1 接続を使い回す非同期クライアント（同時接続数は size まで）"""
+
+    def __init__(self, base_url, size, cookie=None, timeout=30.0, connect_timeout=10.0):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.host_header = url.netloc
+        self.ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.cookie = cookie
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def _connect(self, fresh=False):
+        """(接続, 待機中の接続を再利用したか) を返す（fresh なら必ず新しく接続する）"""
+        if self.idle and not fresh:
+            return self.idle.pop(), True
+        connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+                                            self.connect_timeout)
+        return connection, False
+
+    async def _exchange(self, connection, data):
+        """リクエストを送り、(ステータス, 再利用できるか) を返す（応答の前に接続が閉じられていれば None）"""
+        reader, writer = connection
+        try:
+            writer.write(data)
+            await writer.drain()
+            status_line = await reader.readline()
+        except OSError:
+            return None
+        if not status_line:
+            return None
+        return await self._read_response(reader, status_line)
+
+    async def _read_response(self, reader, status_line):
+        """status_line に続く応答を読み、ステータスを返して本文を読み捨てる（接続を再利用できるかも返す）"""
+        while True:
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            # 1xx は中間応答なので、続く最終応答を読む
+            if not 100 <= status < 200:
+                break
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed")
+
+        if status in (204, 304):
+            # 本文を持たない応答（Content-Length がなくても接続の終わりまで読まない）
+            pass
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        else:
+            await reader.read()
+            return status, False
+        return status, headers.get("connection", "").lower() != "close"
+
+    async def get(self, path):
+        """GET リクエストを送信し、(ステータス, 所要ミリ秒) を返す（接続エラーはステータス 0）"""
+        request = [f"GET {path} HTTP/1.1", f"Host: {self.host_header}", "Accept: application/json",
+                   "Connection: keep-alive"]
+        if self.cookie:
+            request.append(f"Cookie: {self.cookie}")
+        data = ("\r\n".join(request) + "\r\n\r\n").encode("latin-1")
+
+        async with self.slots:
+            started = time.perf_counter()
+            # 待機中にサーバがタイムアウトで閉じた keep-alive 接続（Node の既定は約5秒）は、
+            # 応答の前に失敗する。これはクライアント側の都合なので、新しい接続で1回だけ送り直す
+            for fresh in (False, True):
+                connection = None
+                try:
+                    connection, reused = await self._connect(fresh)
+                    result = await asyncio.wait_for(self._exchange(connection, data), self.timeout)
+                    if result is None:
+                        if reused:
+                            connection[1].close()
+                            continue
+                        raise ConnectionError("connection closed")
+                except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    if connection is not None:
+                        connection[1].close()
+                    return 0, (time.perf_counter() - started) * 1000
+                break
+            status, reusable = result
+            if reusable:
+                self.idle.append(connection)
+            else:
+                connection[1].close()
+            return status, (time.perf_counter() - started) * 1000
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+def load_cookie(cookie_file):
+    """scripts/login.sh が保存した Cookie ファイル（Netscape 形式）を Cookie ヘッダーにする"""
+    jar = MozillaCookieJar(cookie_file)
+    jar.load(ignore_discard=True, ignore_expires=True)
+    return "; ".join(f"{cookie.name}={cookie.value}" for cookie in jar)
+
+
+def fill_path(path, params):
+    """{id} / {tid} を実際の値に置き換える"""
+    return path.replace("{id}", params["id"]).replace("{tid}", params["tid"])
+
+
+async def replay(model, base_url, duration, speedup=1.0, users=None, open_model=False,
+                 pool_size=50, cookie=None, params=None, seed=None):
+    """ワークロードモデルに従ってリクエストを再生し、エンドポイントごとの結果を返す
+
+    既定はクローズドモデル（users 人が「リクエスト → シンクタイム」を繰り返す）。
+    open_model では到着間隔の分布に従ってリクエストを発生させる。
+    シンクタイム・到着間隔は speedup 倍に縮める。
+    """
+    rng = random.Random(seed)
+    mix = replayable_mix(model)
+    paths = [fill_path(entry["path"], params or {"id": "1", "tid": "1-1-1-1"}) for entry in mix]
+    weights = [entry["ratio"] for entry in mix]
+    think = model["think_time_s"]["quantiles"]
+    arrival = model["inter_arrival_s"]["quantiles"]
+    results = defaultdict(list)
+    pool = ConnectionPool(base_url, pool_size, cookie)
+    deadline = time.monotonic() + duration
+
+    async def one_request():
+        index = rng.choices(range(len(mix)), weights)[0]
+        status, ms = await pool.get(paths[index])
+        results[mix[index]["endpoint"]].append((status, ms))
+
+    async def user_loop():
+        while time.monotonic() < deadline:
+            await one_request()
+            await asyncio.sleep(sample(think, rng) / speedup)
+
+    try:
+        if open_model:
+            tasks = set()
+            while time.monotonic() < deadline:
+                task = asyncio.create_task(one_request())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await asyncio.sleep(sample(arrival, rng) / speedup)
+            if tasks:
+                await asyncio.gather(*tasks)
+        else:
+            users = users or max(1, round(model["concurrency"]))
+            await asyncio.gather(*(user_loop() for _ in range(users)))
+    finally:
+        pool.close()
+    return results
+
+
+def summarize_replay(results, elapsed):
+    """再生結果をエンドポイントごとに表示する"""
+    total = sum(len(samples) for samples in results.values())
+    print("\n=== Replay summary ===")
+    width = max((len(endpoint) for endpoint in results), default=10)
+    for endpoint, samples in sorted(results.items(), key=lambda pair: len(pair[1]), reverse=True):
+        q = quantiles([ms for _, ms in samples])
+        errors = sum(1 for status, _ in samples if status == 0 or status >= 400)
+        print(f"{endpoint:<{width}}  {len(samples):7d} req  {len(samples) / total * 100:5.1f}%  "
+              f"p50 {q[50]:8.1f}ms  p95 {q[95]:8.1f}ms  p99 {q[99]:8.1f}ms  errors {errors}")
+    print(f"{'Total':<{width}}  {total:7d} req  {total / elapsed:.2f} req/s")
+
+
+def k6_scenario(model):
+    """lt-8-mixed-60min.js が読み込むシナリオデータ（累積比率つきの構成とシンクタイム分布）"""
+    cumulative = 0.0
+    mix = []
+    for entry in replayable_mix(model):
+        cumulative += entry["ratio"]
+        mix.append({"name": entry["endpoint"], "path": entry["path"], "cumulative": round(cumulative, 6)})
+    mix[-1]["cumulative"] = 1.0
+    return {
+        "sources": model["sources"],
+        "concurrency": model["concurrency"],
+        "mix": mix,
+        "think_time_s": model["think_time_s"]["quantiles"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ログから実測ワークロードを求め、再生または k6 シナリオデータとして出力する")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    model_parser = commands.add_parser("model", help="ログからワークロードモデルを作成する")
+    model_parser.add_argument("logs", nargs="+", help="ALB アクセスログ / サーバーログ（pino JSON Lines）のパス")
+    model_parser.add_argument("-o", "--output", required=True, help="ワークロードモデル(JSON)の出力先")
+    model_parser.add_argument("--include", default=DEFAULT_INCLUDE, help=f"集計するパスの正規表現（既定: {DEFAULT_INCLUDE}）")
+    model_parser.add_argument("--exclude", default=DEFAULT_EXCLUDE, help=f"除外するパスの正規表現（既定: {DEFAULT_EXCLUDE}）")
+
+    replay_parser = commands.add_parser("replay", help="ワークロードモデルに従ってリクエストを再生する")
+    replay_parser.add_argument("model", help="ワークロードモデル(JSON)のパス")
+    replay_parser.add_argument("--base-url", required=True, help="再生先のベースURL")
+    replay_parser.add_argument("--duration", type=float, default=60.0, help="再生時間（秒、既定: 60）")
+    replay_parser.add_argument("--speedup", type=float, default=1.0, help="シンクタイム・到着間隔を縮める倍率（既定: 1）")
+    replay_parser.add_argument("--users", type=int, help="クローズドモデルのユーザ数（既定: モデルの平均同時セッション数）")
+    replay_parser.add_argument("--open", action="store_true", help="到着間隔に従うオープンモデルで再生する")
+    replay_parser.add_argument("--pool-size", type=int, default=50, help="同時接続数の上限（既定: 50）")
+    replay_parser.add_argument("--cookie-file", help="scripts/login.sh の Cookie ファイル")
+    replay_parser.add_argument("--group-id", default="1", help="{id} に使うテストグループID（既定: 1）")
+    replay_parser.add_argument("--tid", default="1-1-1-1", help="{tid} に使うTID（既定: 1-1-1-1）")
+    replay_parser.add_argument("--seed", type=int, help="乱数シード")
+    replay_parser.add_argument("--json", help="再生結果を JSON で書き出すパス")
+
+    k6_parser = commands.add_parser("k6", help="k6 のシナリオデータを出力する")
+    k6_parser.add_argument("model", help="ワークロードモデル(JSON)のパス")
+    k6_parser.add_argument("-o", "--output", required=True, help="シナリオデータ(JSON)の出力先")
+    args = parser.parse_args()
+
+    if args.command == "model":
+        started = time.perf_counter()
+        model = build_model(args.logs, args.include, args.exclude)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(model, f, ensure_ascii=False, indent=2)
+        print(f"Model: {model['requests']} requests, {len(model['mix'])} endpoints, "
+              f"{model['rate_rps']} req/s, concurrency {model['concurrency']} "
+              f"({time.perf_counter() - started:.2f}s)")
+        for entry in model["mix"][:10]:
+            print(f"  {entry['ratio'] * 100:5.1f}%  {entry['endpoint']}")
+        return
+
+    with open(args.model, encoding="utf-8") as f:
+        model = json.load(f)
+
+    if args.command == "k6":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(k6_scenario(model), f, ensure_ascii=False, indent=2)
+        print(f"Exported: {args.output}")
+        return
+
+    cookie = load_cookie(args.cookie_file) if args.cookie_file else None
+    started = time.perf_counter()
+    results = asyncio.run(replay(
+        model, args.base_url, args.duration, args.speedup, args.users, args.open, args.pool_size, cookie,
+        {"id": args.group_id, "tid": args.tid}, args.seed,
+    ))
+    summarize_replay(results, time.perf_counter() - started)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({endpoint: [{"status": s, "ms": round(ms, 2)} for s, ms in samples]
+                       for endpoint, samples in results.items()}, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
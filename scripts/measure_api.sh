@@ -8,6 +8,8 @@
 #   export LOGIN_EMAIL="admin@example.com"
 #   export LOGIN_PASSWORD="your-password"
 #   source scripts/login.sh
+#
+# 回数を固定せず信頼区間が収束するまで計測する場合は docs/it2_measure.py を使う
 # =============================================================================
 
 TEST_ID="$1"
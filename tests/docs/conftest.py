@@ -0,0 +1,6 @@
+"""docs/ の IT2 試験スクリプトを import できるようにする"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "docs"))
@@ -0,0 +1,134 @@
+"""generate_it2_test_docs: 試験項目行の書き込み、採番と絞り込み"""
+
+from copy import copy
+
+import openpyxl
+import pytest
+from openpyxl.cell.cell import MergedCell
+
+from generate_it2_test_docs import (
+    ITEM_SOURCES, LAST_ITEM_COL, MERGE_COL_RANGES, NORMAL_FONT, THIN_BORDER, WRAP_ALIGNMENT,
+    apply_item_filter, col_to_num, create_test_document, iter_test_items, number_items, to_test_item,
+    write_test_items,
+)
+from it2_parallel_sheet import create_test_document_parallel
+from it2_reader import read_items
+
+
+def catalog_ids(source="performance", screen_id="ST01", test_type="IT2-PT"):
+    """絞り込まない文書での {試験項目ID: TestItem}"""
+    return {test_id: to_test_item(item) for test_id, item in iter_test_items(ITEM_SOURCES[source](), screen_id, test_type)}
+
+
+def test_number_items_keeps_filtered_numbers():
+    items = ITEM_SOURCES["performance"]()
+    assert [n for n, _ in number_items(items)] == list(range(1, len(items) + 1))
+    filtered = list(apply_item_filter(items, {"id_range": [5, 8]}))
+    assert [n for n, _ in number_items(filtered)] == [5, 6, 7, 8]
+    assert list(number_items(filtered)) == filtered
+
+
+@pytest.mark.parametrize("item_filter", [
+    {"id_range": [5, 8]},
+    {"type": "異常系"},
+    {"id_range": [3, 12], "type": "正常系"},
+    {"major": ITEM_SOURCES["performance"]()[-1]["major"]},
+])
+def test_filtered_document_uses_catalog_ids(tmp_path, item_filter):
+    catalog = catalog_ids()
+    items = list(apply_item_filter(ITEM_SOURCES["performance"](), item_filter))
+    assert items
+
+    path = create_test_document("ST01", "doc", "target", items, "IT2-PT", "sub.xlsx", output_dir=str(tmp_path))
+    rows = [(test_id, item) for _, test_id, item in read_items(path)]
+    # IDは絞り込まない文書と同じ項目を指し、データ規模・上限も同じIDで読み戻せる
+    assert [test_id for test_id, _ in rows] == [f"ST01-IT2-PT-{n}" for n, _ in items]
+    assert all(catalog[test_id] == item for test_id, item in rows)
+
+    parallel = create_test_document_parallel("ST01", "doc", "target", items, "IT2-PT", "par.xlsx",
+                                             output_dir=str(tmp_path), jobs=1, chunk_items=2)
+    assert [(test_id, item) for _, test_id, item in read_items(parallel)] == rows
+
+
+def write_test_items_per_cell(ws, items, screen_id, test_type):
+    """比較用: セルごとに罫線・値を設定し ws.merge_cells で結合する書き込み（テンプレート導入前の方式）"""
+    def put(row, col, value):
+        cell = ws[f"{col}{row}"]
+        cell.value = value
+        cell.font = NORMAL_FONT
+        cell.alignment = WRAP_ALIGNMENT
+
+    row = 5
+    groups = []
+    for test_num, item in number_items(items):
+        item = to_test_item(item)
+        start_row = row
+        for r in range(start_row, start_row + item.num_rows):
+            for c in range(1, col_to_num(LAST_ITEM_COL) + 1):
+                ws.cell(row=r, column=c).border = THIN_BORDER
+        for i, step in enumerate(item.steps):
+            put(start_row + i, "CD", step)
+        for i, expected in enumerate(item.expected):
+            put(start_row + i, "CM", expected)
+
+        put(start_row, "A", f"{screen_id}-{test_type}-{test_num}")
+        if not groups or groups[-1][0] != item.major:
+            put(start_row, "E", item.major)
+            groups.append([item.major, start_row, start_row])
+        put(start_row, "O", item.medium)
+        for col, value in (("Y", item.minor), ("AS", item.spec), ("BQ", item.precondition), ("DO", item.note)):
+            if value:
+                put(start_row, col, value)
+        put(start_row, "AI", item.type)
+        put(start_row, "BE", item.viewpoint)
+
+        row += item.num_rows
+        groups[-1][2] = row - 1
+        for field, (col_s, col_e) in MERGE_COL_RANGES.items():
+            if field == "テスト大項目":
+                continue
+            if field in ("テスト手順", "期待結果"):
+                for r in range(start_row, row):
+                    ws.merge_cells(f"{col_s}{r}:{col_e}{r}")
+            else:
+                ws.merge_cells(f"{col_s}{start_row}:{col_e}{row - 1}")
+
+    for _, first, last in groups:
+        ws.merge_cells(f"E{first}:N{last}")
+    return row
+
+
+def border_sides(border):
+    """罫線の各辺のスタイル（空の辺は None と Side() のどちらで持っても None）"""
+    return tuple(side.style if side else None for side in (border.left, border.right, border.top, border.bottom))
+
+
+def sheet_layout(ws, last_row):
+    """項目行のセルごとの (種類, 値, フォント, 罫線, 配置) と結合範囲"""
+    cells = {}
+    for r in range(5, last_row):
+        for c in range(1, col_to_num(LAST_ITEM_COL) + 1):
+            cell = ws.cell(row=r, column=c)
+            # スタイルはブックごとの登録IDではなく内容で比べる（copy で StyleProxy を外す）
+            cells[cell.coordinate] = (isinstance(cell, MergedCell), cell.value,
+                                      copy(cell.font), border_sides(cell.border), copy(cell.alignment))
+    return cells, sorted(r.coord for r in ws.merged_cells.ranges)
+
+@pytest.mark.parametrize("items", [
+    # 1行・3行（手順が多い）・2行（期待結果が多い）、任意項目の有無、テスト大項目の切り替わり
+    [
+        {"major": "A", "medium": "m1", "viewpoint": "v", "steps": ["s1"], "expected": ["e1"]},
+        {"major": "A", "medium": "m2", "minor": "小", "type": "異常系", "spec": "仕様", "viewpoint": "v",
+         "precondition": "前提", "steps": ["s1", "s2", "s3"], "expected": ["e1"], "note": "備考"},
+        {"major": "B", "medium": "m3", "viewpoint": "v", "steps": ["s1"], "expected": ["e1", "e2"]},
+        {"major": "A", "medium": "m4", "viewpoint": "v", "steps": [], "expected": []},
+    ],
+    ITEM_SOURCES["performance"](),
+    ITEM_SOURCES["scenario"](),
+], ids=["small", "performance", "scenario"])
+def test_row_layout_stamp_matches_per_cell_writer(items):
+    stamped = openpyxl.Workbook().active
+    reference = openpyxl.Workbook().active
+    last_row = write_test_items(stamped, items, "ST01", "IT2-PT")
+    assert write_test_items_per_cell(reference, items, "ST01", "IT2-PT") == last_row
+    assert sheet_layout(stamped, last_row) == sheet_layout(reference, last_row)
@@ -0,0 +1,102 @@
+"""it2_api_items: ひな形の生成と手書きの項目による上書き"""
+
+import pytest
+
+from generate_it2_test_docs import ITEM_SOURCES, to_test_item
+from it2_api_items import GENERATED_NOTE, build_api_items
+from it2_coverage import load_openapi_operations
+
+# 段階なし（/health）、テストグループ数で3段階（/test-groups）、テストケース数で3段階（report-data）
+OPERATIONS = [
+    {"method": "GET", "path": "/health", "summary": "ヘルスチェック", "tag": "Health"},
+    {"method": "GET", "path": "/test-groups", "summary": "テストグループ一覧取得", "tag": "TestGroups"},
+    {"method": "GET", "path": "/test-groups/{groupId}/report-data", "summary": "集計データ取得", "tag": "Report"},
+]
+
+
+def override(name, spec, dataset=None):
+    """手書きの項目（テスト中項目 name で見分ける）"""
+    return {"major": "手書き", "medium": name, "viewpoint": "v", "spec": spec, "dataset": dataset or {},
+            "steps": ["s"], "expected": ["e"]}
+
+
+def layout(items):
+    """(テスト大項目, 手書きの項目なら名前 / ひな形ならテスト小項目) の一覧"""
+    items = map(to_test_item, items)
+    return [(item.major, item.minor if item.note == GENERATED_NOTE else item.medium) for item in items]
+
+
+SKELETONS = [
+    ("ヘルスチェック", ""),
+    ("テストグループ一覧取得", "小規模（テストグループ10件）"),
+    ("テストグループ一覧取得", "中規模（テストグループ50件）"),
+    ("テストグループ一覧取得", "大規模（テストグループ100件）"),
+    ("集計データ取得", "小規模（テストケース50件）"),
+    ("集計データ取得", "中規模（テストケース200件）"),
+    ("集計データ取得", "大規模（テストケース500件）"),
+]
+
+
+def test_skeletons_for_every_operation_and_tier():
+    items = build_api_items(OPERATIONS)
+    assert layout(items) == SKELETONS
+    assert [item["threshold_ms"] for item in items] == [2000, 1000, 3000, 5000, 1000, 3000, 5000]
+    assert items[2]["dataset"] == {"groups": 50, "test_cases": 10, "contents": 1}
+    assert all(to_test_item(item).note == GENERATED_NOTE for item in items)
+
+
+def test_override_replaces_matching_tier_and_aligns_major():
+    items = build_api_items(OPERATIONS, [override("中", "・GET /api/test-groups", {"groups": 50})])
+    # 同じエンドポイントの他の段階はテスト大項目を手書きの項目にそろえ、他のエンドポイントはそのまま
+    assert layout(items) == [
+        SKELETONS[0],
+        ("手書き", "小規模（テストグループ10件）"),
+        ("手書き", "中"),
+        ("手書き", "大規模（テストグループ100件）"),
+        *SKELETONS[4:],
+    ]
+
+
+def test_overrides_of_same_tier_keep_their_order():
+    items = build_api_items(OPERATIONS, [
+        override("集計2", "・GET /api/test-groups/[groupId]/report-data", {"test_cases": 500}),
+        override("一覧", "・GET /api/test-groups", {"groups": 10}),
+        override("集計1", "・GET /api/test-groups/[groupId]/report-data", {"test_cases": 500, "contents": 3}),
+        override("死活", "・GET /api/health"),
+    ])
+    assert [name for _, name in layout(items)] == [
+        "死活", "一覧", "中規模（テストグループ50件）", "大規模（テストグループ100件）",
+        "小規模（テストケース50件）", "中規模（テストケース200件）", "集計2", "集計1",
+    ]
+
+
+def test_unmatched_overrides_go_last():
+    unmatched = [
+        override("規模違い", "・GET /api/test-groups", {"groups": 30}),
+        override("規模なし", "・GET /api/test-groups"),
+        override("未定義", "・GET /api/unknown"),
+    ]
+    items = build_api_items(OPERATIONS, unmatched)
+    # 一致しない項目はテスト大項目をそろえない
+    assert layout(items) == SKELETONS + [("手書き", "規模違い"), ("手書き", "規模なし"), ("手書き", "未定義")]
+
+
+@pytest.mark.parametrize("spec, index", [
+    # API 名だけなら SPEC_API_ALIASES で対応付ける（GET /test-groups の小規模）
+    ("・テストグループCRUD API", 1),
+    # 明示したエンドポイントがあれば API 名は使わない（report-data の小規模）
+    ("・テストグループCRUD API\n・GET /api/test-groups/[groupId]/report-data", 4),
+])
+def test_explicit_endpoint_takes_precedence_over_alias(spec, index):
+    items = build_api_items(OPERATIONS, [override("上書き", spec, {"groups": 10, "test_cases": 50})])
+    expected = list(SKELETONS)
+    expected[index] = ("手書き", "上書き")
+    assert layout(items) == [("手書き" if major == SKELETONS[index][0] else major, name)
+                             for major, name in expected]
+
+
+def test_default_overrides_are_all_placed():
+    overrides = ITEM_SOURCES["performance"]()
+    items = build_api_items(load_openapi_operations(), overrides)
+    hand_written = [item for item in items if to_test_item(item).note != GENERATED_NOTE]
+    assert sorted(map(id, hand_written)) == sorted(map(id, overrides))
@@ -0,0 +1,127 @@
+"""it2_archive: k6 の結果ファイルとアーカイブの往復"""
+
+import json
+
+import numpy as np
+import pytest
+
+from it2_archive import SampleArchive, breakdown, convert, open_archive
+from it2_timeseries import iter_k6_chunks
+
+START = 1_790_848_800
+ENDPOINTS = ("GET /api/test-groups", "POST /api/test-groups", "GET /api/reports")
+
+
+def write_json_run(path, n=3_000, seed=0):
+    """VU ごとの書き出しで時刻が前後する k6 の JSON 出力を書き、サンプルを返す"""
+    rng = np.random.default_rng(seed)
+    times = START + np.arange(n) * 0.05 + rng.uniform(0, 0.5, n)
+    rows = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i, t in enumerate(times):
+            method, name = ENDPOINTS[i % len(ENDPOINTS)].split(" ")
+            status = 500 if i % 97 == 0 else 200
+            value = float(rng.lognormal(np.log(80), 0.5))
+            tags = {"method": method, "name": name, "status": str(status), "vu": str(i % 10 + 1)}
+            for metric, point in (("http_req_duration", value), ("http_reqs", 1)):
+                f.write(json.dumps({"type": "Point", "metric": metric,
+                                    "data": {"time": float(t), "value": point, "tags": tags}},
+                                   separators=(",", ":")) + "\n")
+            rows.append((float(t), value, status, f"{method} {name}", i % 10 + 1))
+    return rows
+
+
+@pytest.fixture
+def runs(tmp_path):
+    """LT-7・LT-9 の結果ファイルを1つのアーカイブに変換し、(アーカイブ, 元のサンプル, ディレクトリ) を返す"""
+    raw = {"LT-7": write_json_run(tmp_path / "lt7.json"), "LT-9": write_json_run(tmp_path / "lt9.json", seed=1)}
+    path = tmp_path / "runs.k6a"
+    count = convert([("LT-7", str(tmp_path / "lt7.json")), ("LT-9", str(tmp_path / "lt9.json"))], str(path))
+    assert count == sum(len(rows) for rows in raw.values())
+    return SampleArchive(str(path)), raw, tmp_path
+
+
+def test_round_trip_columns(runs):
+    archive, raw, _ = runs
+    rows = sorted((row for rows in raw.values() for row in rows), key=lambda row: row[0])
+    times = archive["time_us"]
+
+    assert len(archive) == len(rows)
+    assert np.all(np.diff(times) >= 0)
+    np.testing.assert_array_equal(times, [round(row[0] * 1_000_000) for row in rows])
+    np.testing.assert_allclose(np.sort(archive["latency_ms"]), np.sort([row[1] for row in rows]).astype(np.float32))
+    assert sorted(archive["status"].tolist()) == sorted(row[2] for row in rows)
+    assert sorted(archive["vu"].tolist()) == sorted(row[4] for row in rows)
+    assert sorted(archive.decode("endpoint", archive["endpoint"])) == sorted(row[3] for row in rows)
+    assert archive["failed"].sum() == sum(row[2] == 500 for row in rows)
+
+
+def test_tests_and_select(runs):
+    archive, raw, _ = runs
+    assert set(archive.tests) == {"LT-7", "LT-9"}
+    for test_id, rows in raw.items():
+        assert archive.tests[test_id]["count"] == len(rows)
+        selected = archive.select(test_id=test_id)
+        assert len(selected["time_us"]) == len(rows)
+        assert set(archive.decode("test_id", selected["test_id"])) == {test_id}
+
+    selected = archive.select(test_id="LT-7", endpoint=ENDPOINTS[1])
+    assert len(selected["time_us"]) == sum(row[3] == ENDPOINTS[1] for row in raw["LT-7"])
+    assert len(archive.select(test_id="LT-0")["time_us"]) == 0
+    assert len(archive.select(endpoint="GET /unknown")["time_us"]) == 0
+
+
+def test_time_slice_matches_mask(runs):
+    archive, _, _ = runs
+    seconds = archive["time_us"] / 1_000_000
+    for start, end in [(START + 10.5, START + 60.25), (START - 100, START + 1), (START + 120, START + 1000),
+                       (START + 30, START + 30)]:
+        rows = archive.time_slice(start, end)
+        assert rows.stop - rows.start == int(((seconds >= start) & (seconds < end)).sum())
+
+
+def test_iter_chunks_equal_raw_file(runs):
+    archive, _, tmp_path = runs
+    for test_id, name in (("LT-7", "lt7.json"), ("LT-9", "lt9.json")):
+        raw = [np.concatenate(column) for column in zip(*iter_k6_chunks(str(tmp_path / name)))]
+        order = np.argsort(raw[0], kind="stable")
+        from_archive = [np.concatenate(column) for column in
+                        zip(*iter_k6_chunks(f"{archive.path}#{test_id}"))]
+        np.testing.assert_allclose(from_archive[0], raw[0][order], atol=1e-6)
+        np.testing.assert_allclose(from_archive[1], raw[1][order], rtol=1e-6)
+        np.testing.assert_array_equal(from_archive[2], raw[2][order])
+
+
+def test_breakdown_by_endpoint(runs):
+    archive, raw, _ = runs
+    result = {label: count for label, count, _, _ in breakdown(archive, archive.select(), "endpoint", [95])}
+    rows = [row for rows in raw.values() for row in rows]
+    assert result == {endpoint: sum(row[3] == endpoint for row in rows) for endpoint in ENDPOINTS}
+
+
+def test_many_distinct_urls(tmp_path):
+    # name タグのない URL が試験項目IDの列（uint16）の上限を超えて増えても変換できる
+    n = 70_000
+    path = tmp_path / "urls.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("metric_name,timestamp,metric_value,method,status,url\n")
+        for i in range(n):
+            f.write(f"http_req_duration,{START + i * 0.01:.2f},{50 + i % 7},GET,200,http://x/api/test-groups/{i}\n")
+    output = tmp_path / "urls.k6a"
+    assert convert([("LT-8", str(path))], str(output)) == n
+
+    archive, test_id = open_archive(f"{output}#LT-8")
+    assert test_id == "LT-8"
+    assert len(archive.strings["endpoint"]) == n
+    assert archive.strings["test_id"] == ["LT-8"]
+    selected = archive.select(test_id="LT-8", endpoint=f"GET http://x/api/test-groups/{n - 1}")
+    assert selected["latency_ms"].tolist() == [50 + (n - 1) % 7]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "run.json"
+    path.write_text("{}", encoding="utf-8")
+    with pytest.raises(ValueError):
+        SampleArchive(str(path))
+    with pytest.raises(ValueError):
+        convert([("LT-7", str(path))], str(tmp_path / "empty.k6a"))
@@ -0,0 +1,83 @@
+"""it2_batch: 一括生成の再開と失敗時の継続"""
+
+import json
+
+import pytest
+
+from it2_batch import load_progress, run_batch
+
+
+def write_manifest(tmp_path, bad=False):
+    """シナリオ・性能テストの2文書と、JSON の項目ソースの1文書（bad なら不正な項目）のマニフェスト"""
+    items = [{"major": "大項目", "medium": "中項目", "viewpoint": "観点", "steps": ["手順"], "expected": ["結果"]}]
+    if bad:
+        items[0]["unknown"] = 1
+    (tmp_path / "items.json").write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    documents = [
+        {"screen_id": "ST01", "doc_name": "性能", "target_name": "性能", "items": "performance",
+         "test_type": "IT2-PT", "filename": "pt.xlsx"},
+        {"screen_id": "ST09", "doc_name": "追加", "target_name": "追加", "items": "items.json",
+         "test_type": "IT2", "filename": "extra.xlsx"},
+        {"screen_id": "ST03", "doc_name": "シナリオ", "target_name": "シナリオ", "items": "scenario",
+         "test_type": "IT2-SC", "filename": "sc.xlsx", "filter": {"type": "正常系"}},
+    ]
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"output_dir": "out", "documents": documents}, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def generated(timings):
+    return sorted(filename for filename, _ in timings)
+
+
+def test_resume_skips_only_completed_documents(tmp_path):
+    manifest = write_manifest(tmp_path)
+    timings, failures = run_batch(manifest)
+    assert generated(timings) == ["extra.xlsx", "pt.xlsx", "sc.xlsx"] and failures == []
+    assert len(load_progress(manifest + ".progress.jsonl")) == 3
+
+    assert run_batch(manifest) == ([], [])
+
+    # 出力が消えた文書と、項目ソースが変わった文書だけを生成し直す
+    (tmp_path / "out" / "pt.xlsx").unlink()
+    items = json.loads((tmp_path / "items.json").read_text(encoding="utf-8"))
+    items[0]["note"] = "変更"
+    (tmp_path / "items.json").write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    timings, _ = run_batch(manifest)
+    assert generated(timings) == ["extra.xlsx", "pt.xlsx"]
+
+    # 出力先が変われば全文書を生成する
+    timings, _ = run_batch(manifest, output_dir=str(tmp_path / "other"))
+    assert generated(timings) == ["extra.xlsx", "pt.xlsx", "sc.xlsx"]
+
+    timings, _ = run_batch(manifest, restart=True)
+    assert generated(timings) == ["extra.xlsx", "pt.xlsx", "sc.xlsx"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failure_does_not_stop_the_batch(tmp_path, jobs):
+    manifest = write_manifest(tmp_path, bad=True)
+    timings, failures = run_batch(manifest, jobs=jobs)
+
+    assert generated(timings) == ["pt.xlsx", "sc.xlsx"]
+    assert [filename for filename, _ in failures] == ["extra.xlsx"]
+    assert "unknown item keys" in failures[0][1]
+    assert (tmp_path / "out" / "sc.xlsx").exists()
+    assert len(load_progress(manifest + ".progress.jsonl")) == 2
+
+    # 失敗した文書は進捗に残らないため、修正後の実行で生成される
+    write_manifest(tmp_path)
+    timings, failures = run_batch(manifest, jobs=jobs)
+    assert generated(timings) == ["extra.xlsx"] and failures == []
+
+
+def test_main_exits_nonzero_on_failure(tmp_path, monkeypatch, capsys):
+    import it2_batch
+
+    manifest = write_manifest(tmp_path, bad=True)
+    monkeypatch.setattr("sys.argv", ["it2_batch.py", manifest])
+    with pytest.raises(SystemExit) as exc:
+        it2_batch.main()
+    assert exc.value.code == 1
+    out = capsys.readouterr().out
+    assert "=== Failed (1 documents) ===" in out and "extra.xlsx: " in out
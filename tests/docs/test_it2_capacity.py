@@ -0,0 +1,72 @@
+"""it2_capacity: 既知の USL 曲線への当てはめとキャパシティの推定"""
+
+import numpy as np
+import pytest
+
+from it2_capacity import capacity, fit_usl, format_max_users, usl_throughput
+
+USERS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def tiers_for(lam, sigma, kappa, users=USERS, p95_ratio=2.0):
+    """USL どおりに振る舞う段階の計測値（思考時間なし: 平均レスポンスタイム = n / X(n)）"""
+    throughput = usl_throughput(users, lam, sigma, kappa)
+    return [{"users": n, "mean_ms": n / x * 1000, "p95_ms": n / x * 1000 * p95_ratio}
+            for n, x in zip(users, throughput)]
+
+
+@pytest.mark.parametrize("lam, sigma, kappa", [
+    (100.0, 0.05, 0.001),
+    (40.0, 0.2, 0.0005),
+    (250.0, 0.01, 0.0),
+    (80.0, 0.0, 0.0),
+])
+def test_fit_recovers_known_parameters(lam, sigma, kappa):
+    fitted = fit_usl(USERS, usl_throughput(USERS, lam, sigma, kappa))
+    assert fitted == pytest.approx((lam, sigma, kappa), rel=1e-6, abs=1e-9)
+
+
+def test_fit_clamps_negative_coefficients():
+    # 超線形のスループット（σ < 0 相当）は σ = 0 に固定して当てはめる
+    users = np.array(USERS, dtype=np.float64)
+    lam, sigma, kappa = fit_usl(users, 10 * users ** 1.05)
+    assert lam > 0 and sigma == 0 and kappa >= 0
+
+
+def test_two_tiers_fit_amdahl():
+    lam, sigma, kappa = fit_usl([1, 10], usl_throughput([1, 10], 50.0, 0.1, 0.0))
+    assert (lam, sigma, kappa) == pytest.approx((50.0, 0.1, 0.0))
+
+
+def test_capacity_with_peak():
+    lam, sigma, kappa = 100.0, 0.05, 0.001
+    result = capacity(tiers_for(lam, sigma, kappa), threshold_ms=1000)
+
+    peak = np.sqrt((1 - sigma) / kappa)
+    assert result["peak_users"] == pytest.approx(peak)
+    assert result["max_throughput_rps"] == pytest.approx(float(usl_throughput(peak, lam, sigma, kappa)))
+    assert result["r2"] == pytest.approx(1.0)
+    assert 1 < result["knee_users"] < peak
+    # 予測 p95 = 2 × n / X(n) が 1000ms 以内の最大のユーザ数
+    grid = np.arange(1, int(peak) + 1)
+    expected = grid[2 * grid / usl_throughput(grid, lam, sigma, kappa) * 1000 <= 1000].max()
+    assert result["max_users"] == expected
+
+
+def test_capacity_without_contention_does_not_report_curve_edge():
+    # κ = 0 ではスループットは頭打ちになるだけで最大点がなく、膝点・上限は曲線の範囲で決まってしまう
+    result = capacity(tiers_for(100.0, 0.05, 0.0), threshold_ms=10_000_000)
+    assert result["peak_users"] is None
+    assert result["max_throughput_rps"] == pytest.approx(100.0 / 0.05)
+    assert result["knee_users"] is None
+    assert result["max_users"] is None
+    assert format_max_users(result) == f"{result['curve']['users'][-1]}超"
+
+
+def test_capacity_bounds_curve_for_tiny_kappa():
+    # 最大点が計測範囲から遠い場合も、曲線は計測範囲の数倍までしか求めない
+    result = capacity(tiers_for(100.0, 0.05, 1e-12), threshold_ms=10_000_000)
+    assert result["peak_users"] > 1e5
+    assert len(result["curve"]["users"]) <= max(USERS) * 4
+    assert result["knee_users"] is None
+    assert result["max_users"] is None
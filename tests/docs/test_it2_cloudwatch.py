@@ -0,0 +1,60 @@
+"""it2_cloudwatch: 計測の時間窓とメトリクスの突合"""
+
+import json
+
+import numpy as np
+import pytest
+
+from it2_cloudwatch import correlate, load_metric_file, make_metric
+from it2_timeseries import WindowedHistogram
+
+START = 1_790_848_800
+
+
+def make_run(step=5.0, minutes=10, seed=0):
+    """レイテンシが時間とともに増える計測（load_run と同じ形式）"""
+    rng = np.random.default_rng(seed)
+    times = START + np.sort(rng.uniform(0, minutes * 60, minutes * 600))
+    values = 50 + (times - START) / 6 + rng.normal(0, 2, len(times))
+    histogram = WindowedHistogram(step)
+    histogram.add(times, values, np.zeros(len(times), dtype=bool))
+    hist, errors, start = histogram.trimmed()
+    return {"hist": hist, "errors": errors, "start": start, "step": step, "end": start + len(hist) * step}
+
+
+def test_metric_tracking_latency_correlates():
+    run = make_run()
+    times = START + np.arange(10) * 60.0
+    metric = make_metric("CPUUtilization", times, 20 + np.arange(10) * 5)
+
+    result, aligned = correlate(run, metric, limit=80)
+    assert result["points"] == 10
+    assert result["unit"] == "Percent"
+    assert result["peak"] == 65 and result["over_limit"] == 0
+    assert result["r_p95"] > 0.9
+    assert len(aligned) == len(run["hist"])
+    assert aligned[0] == 20 and aligned[-1] == 65
+
+
+def test_metric_outside_run_has_no_points():
+    run = make_run()
+    metric = make_metric("CPUUtilization", START - 3600 + np.arange(5) * 60.0, [10, 20, 30, 40, 50])
+
+    result, aligned = correlate(run, metric)
+    assert result["points"] == 0
+    assert "average" not in result
+    assert np.isnan(aligned).all()
+
+
+def test_empty_metric_data_results(tmp_path):
+    # ディメンションの誤り等で CloudWatch が空の MetricDataResults を返しても落ちない
+    path = tmp_path / "cw.json"
+    path.write_text(json.dumps({"MetricDataResults": [
+        {"Id": "m1", "Label": "CPUUtilization", "Timestamps": [], "Values": [], "StatusCode": "Complete"},
+    ]}), encoding="utf-8")
+    (metric,) = load_metric_file(str(path))
+
+    run = make_run()
+    result, aligned = correlate(run, metric)
+    assert result == {"metric": "CPUUtilization", "unit": "Percent", "period_s": pytest.approx(60.0), "points": 0}
+    assert len(aligned) == len(run["hist"]) and np.isnan(aligned).all()
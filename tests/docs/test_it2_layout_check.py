@@ -0,0 +1,93 @@
+"""check_layout / it2_layout_check: 結合範囲・罫線の検査"""
+
+import pytest
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Border
+from openpyxl.worksheet.merge import MergedCellRange
+
+import it2_layout_check
+from generate_it2_test_docs import DEFAULT_DOCUMENTS, ITEM_SOURCES, build_test_document, check_layout
+
+# 1行・3行の項目からなるテスト大項目 A（5〜8行目）と、2行の項目だけのテスト大項目 B（9〜10行目）
+ITEMS = [
+    {"major": "A", "medium": "m1", "viewpoint": "v", "steps": ["s1"], "expected": ["e1"]},
+    {"major": "A", "medium": "m2", "viewpoint": "v", "steps": ["s1", "s2", "s3"], "expected": ["e1"]},
+    {"major": "B", "medium": "m3", "viewpoint": "v", "steps": ["s1", "s2"], "expected": ["e1", "e2"]},
+]
+
+
+@pytest.fixture
+def ws():
+    return build_test_document("ST09", "doc", "target", ITEMS, "IT2", "doc.xlsx")["画面試験項目"]
+
+
+def test_generated_sheet_is_clean(ws):
+    assert check_layout(ws) == []
+
+
+@pytest.mark.parametrize("doc", DEFAULT_DOCUMENTS, ids=lambda doc: doc["items"])
+def test_major_groups_do_not_overlap(doc):
+    # 旧来の生成では項目ごとの E:N 結合がテスト大項目の結合と重なっていた（性能 E8:N10 / シナリオ E16:N21 等）
+    wb = build_test_document(**dict(doc, items=ITEM_SOURCES[doc["items"]]()))
+    ws = wb["画面試験項目"]
+    assert check_layout(ws) == []
+
+    groups = sorted((r.min_row, r.max_row) for r in ws.merged_cells.ranges if r.min_row >= 5 and r.min_col == 5)
+    majors = [item["major"] for item in ITEM_SOURCES[doc["items"]]()]
+    assert len(groups) == sum(1 for i, major in enumerate(majors) if i == 0 or major != majors[i - 1])
+    assert all(prev[1] + 1 == cur[0] for prev, cur in zip(groups, groups[1:]))
+
+
+@pytest.mark.parametrize("extra, other", [
+    ("E6:N8", "E5:N8"),     # テスト大項目の中に項目の結合
+    ("E5:N10", "E5:N8"),    # 同じ開始セルから次のグループまで
+    ("CD6:CY6", "CD6:CL6"),  # 横に隣の列の結合まで
+])
+def test_overlap(ws, extra, other):
+    # merged_cells.add は既存の範囲に含まれる範囲を追加しないため、範囲の集合に直接加える
+    ws.merged_cells.ranges.add(MergedCellRange(ws, extra))
+    assert check_layout(ws) == [("overlap", extra, f"overlaps {other}")]
+
+
+def test_gap(ws):
+    ws.unmerge_cells("O9:X10")
+    issues = check_layout(ws)
+    assert ("gap", "O9:X9", "not merged") in issues
+    assert ("gap", "O10:X10", "not merged") in issues
+    assert {kind for kind, _, _ in issues} == {"gap"}
+
+
+def test_orphan_merged_cell(ws):
+    # 結合範囲だけを消すと MergedCell が残る
+    ws.merged_cells.remove("O9:X10")
+    issues = check_layout(ws)
+    assert ("orphan", "P9", "MergedCell outside merged ranges") in issues
+    assert ("orphan", "O10", "MergedCell outside merged ranges") in issues
+
+
+def test_orphan_hidden_value(ws):
+    ws._cells[(6, 20)] = Cell(ws, row=6, column=20, value="隠れた値")
+    assert ("orphan", "T6", "value hidden by merge O6:X8") in check_layout(ws)
+
+
+def test_missing_border(ws):
+    ws["O9"].border = Border()
+    issues = check_layout(ws)
+    assert issues == [("border", "O9", "missing border in O9:X10")]
+
+
+def test_cli_reports_missing_sheet(tmp_path, monkeypatch, capsys, ws):
+    path = tmp_path / "doc.xlsx"
+    ws.parent.save(path)
+
+    monkeypatch.setattr("sys.argv", ["it2_layout_check.py", str(path)])
+    with pytest.raises(SystemExit) as exc:
+        it2_layout_check.main()
+    assert exc.value.code == 0
+
+    monkeypatch.setattr("sys.argv", ["it2_layout_check.py", str(path), "--sheet", "存在しない"])
+    with pytest.raises(SystemExit) as exc:
+        it2_layout_check.main()
+    assert exc.value.code == 1
+    out = capsys.readouterr().out
+    assert "sheet '存在しない' not found; available: 表紙, 改版履歴, 画面試験項目, 集計" in out
@@ -0,0 +1,40 @@
+"""it2_reader: 生成した試験書から試験項目を読み戻す"""
+
+import os
+
+import pytest
+
+from generate_it2_test_docs import DEFAULT_DOCUMENTS, ITEM_SOURCES, create_test_document, to_test_item
+from it2_reader import read_items
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "docs")
+
+
+def source_dicts(name):
+    return [to_test_item(item).to_dict() for item in ITEM_SOURCES[name]()]
+
+
+@pytest.mark.parametrize("doc", DEFAULT_DOCUMENTS, ids=lambda doc: doc["items"])
+def test_generated_document_round_trip(doc, tmp_path):
+    create_test_document(**dict(doc, items=ITEM_SOURCES[doc["items"]]()), output_dir=str(tmp_path))
+    rows = list(read_items(str(tmp_path / doc["filename"]), sheets=["画面試験項目"]))
+
+    assert [test_id for _, test_id, _ in rows] == [
+        f"{doc['screen_id']}-{doc['test_type']}-{n}" for n in range(1, len(rows) + 1)
+    ]
+    assert [item.to_dict() for _, _, item in rows] == source_dicts(doc["items"])
+
+
+@pytest.mark.parametrize("doc", DEFAULT_DOCUMENTS, ids=lambda doc: doc["items"])
+def test_committed_document_is_current(doc):
+    # リポジトリの試験書が項目ソースの変更後に再生成されていること（データ規模・上限も含む）
+    rows = read_items(os.path.join(DOCS_DIR, doc["filename"]), sheets=["画面試験項目"])
+    assert [item.to_dict() for _, _, item in rows] == source_dicts(doc["items"])
+
+
+def test_plain_xlsx_items_have_no_parameters(tmp_path):
+    # ユーザー設定プロパティのない試験書の項目は、データ規模・上限なしとして読む
+    items = [dict(to_test_item(item).to_dict(), dataset={}, threshold_ms=0) for item in ITEM_SOURCES["performance"]()]
+    create_test_document("ST01", "doc", "target", items, "IT2-PT", "plain.xlsx", output_dir=str(tmp_path))
+    rows = read_items(str(tmp_path / "plain.xlsx"))
+    assert [item.to_dict() for _, _, item in rows] == items
@@ -0,0 +1,151 @@
+"""it2_serve: 生成結果のキャッシュと HTTP の応答"""
+
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import it2_serve
+from it2_serve import DocumentCache, DocumentServer
+
+ITEMS = [{"major": "大項目", "medium": "中項目", "viewpoint": "観点", "steps": ["手順"], "expected": ["結果"]}]
+DOC = {"screen_id": "ST09", "doc_name": "doc", "target_name": "target", "items": ITEMS,
+       "test_type": "IT2", "filename": "doc.xlsx"}
+
+
+def test_cache_renders_once_for_concurrent_requests():
+    cache = DocumentCache(1024)
+    calls = []
+    release = threading.Event()
+
+    def render():
+        calls.append(1)
+        release.wait(5)
+        return b"xlsx"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render("k", render)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["shared"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["miss", "shared", "shared", "shared", "shared"]
+    assert {data for data, _ in results} == {b"xlsx"}
+    assert cache.get_or_render("k", render) == (b"xlsx", "hit")
+    assert cache.stats()["pending"] == 0
+
+
+def test_cache_does_not_keep_failures():
+    cache = DocumentCache(1024)
+
+    def fail():
+        raise KeyError("bad item")
+
+    with pytest.raises(KeyError):
+        cache.get_or_render("k", fail)
+    assert cache.stats()["pending"] == 0
+    assert cache.get_or_render("k", lambda: b"ok") == (b"ok", "miss")
+
+
+def test_cache_evicts_least_recently_used():
+    cache = DocumentCache(10)
+    for key in "abc":
+        cache.get_or_render(key, lambda: b"1234")
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evicted"]) == (2, 8, 1)
+
+    # 参照した b は残り、最も古い c が追い出される
+    assert cache.get_or_render("b", lambda: b"")[1] == "hit"
+    cache.get_or_render("d", lambda: b"1234")
+    assert cache.get_or_render("b", lambda: b"")[1] == "hit"
+    assert cache.get_or_render("c", lambda: b"1234")[1] == "miss"
+
+    # 上限を超える1件は保持しない
+    cache.get_or_render("big", lambda: b"x" * 11)
+    assert cache.get_or_render("big", lambda: b"x" * 11)[1] == "miss"
+    assert cache.stats()["bytes"] <= 10
+
+
+@pytest.fixture
+def server():
+    server = DocumentServer(("127.0.0.1", 0), [dict(DOC, items="scenario", filename="sc.xlsx")],
+                            DocumentCache(16 * 1024 * 1024))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def connect(server):
+    return http.client.HTTPConnection(*server.server_address, timeout=10)
+
+
+def post(conn, body, headers=None):
+    conn.request("POST", "/documents", body=json.dumps(body), headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.getheader("Content-Type"), response.read()
+
+
+def raw_request(server, request):
+    """生の要求を送り、応答の最初の行を返す（接続が閉じられるまで読む）"""
+    with socket.create_connection(server.server_address, timeout=10) as sock:
+        sock.sendall(request)
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    return data.split(b"\r\n", 1)[0]
+
+
+def test_get_and_post_documents(server):
+    conn = connect(server)
+    conn.request("GET", "/documents/sc.xlsx")
+    response = conn.getresponse()
+    assert response.status == 200 and response.read()[:2] == b"PK"
+    etag = response.getheader("ETag")
+
+    conn.request("GET", "/documents/sc.xlsx", headers={"If-None-Match": etag})
+    response = conn.getresponse()
+    assert response.status == 304 and response.read() == b""
+
+    status, content_type, body = post(conn, DOC)
+    assert status == 200 and content_type == it2_serve.XLSX_CONTENT_TYPE and body[:2] == b"PK"
+
+
+@pytest.mark.parametrize("change", [{"filename": 5}, {"items": ""}, {"doc_name": None}, {"filter": [1]},
+                                    {"items": "/etc/passwd"}])
+def test_invalid_document_is_bad_request(server, change):
+    status, _, body = post(connect(server), dict(DOC, **change))
+    assert status == 400 and "error" in json.loads(body)
+
+
+@pytest.mark.parametrize("length, expected", [(b"abc", b"400"), (b"-1", b"400"), (None, b"411")])
+def test_invalid_content_length(server, length, expected):
+    header = b"" if length is None else b"Content-Length: " + length + b"\r\n"
+    status_line = raw_request(server, b"POST /documents HTTP/1.1\r\nHost: x\r\n" + header + b"\r\n{}")
+    assert status_line.split()[1] == expected
+
+
+def test_unexpected_render_error_is_500(server, monkeypatch):
+    def broken(**kwargs):
+        raise KeyError("テスト大項目")
+
+    monkeypatch.setattr(it2_serve, "render_test_document", broken)
+    conn = connect(server)
+    status, content_type, body = post(conn, DOC)
+    assert status == 500 and content_type.startswith("application/json")
+    assert "KeyError" in json.loads(body)["error"]
+
+    # 応答を返しているので keep-alive の接続はそのまま使える
+    conn.request("GET", "/stats")
+    response = conn.getresponse()
+    assert response.status == 200 and json.loads(response.read())["pending"] == 0
@@ -0,0 +1,89 @@
+"""it2_timeseries: 対数ビンのヒストグラムによるパーセンタイルの精度"""
+
+import json
+
+import numpy as np
+import pytest
+
+from it2_timeseries import (
+    BIN_GROWTH, WindowedHistogram, bin_values, iter_k6_chunks, latency_bins, rolling_percentiles,
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def samples(n, seed=0):
+    """1時間分の (時刻, レイテンシ[ms], 失敗か)（対数正規分布のレイテンシ）"""
+    rng = np.random.default_rng(seed)
+    times = 1_790_848_800 + np.sort(rng.uniform(0, 3600, n))
+    values = rng.lognormal(np.log(120), 0.6, n)
+    return times, values, rng.random(n) < 0.01
+
+
+def test_bin_value_within_half_bin():
+    values = np.geomspace(0.1, 3_600_000, 10_000)
+    centers = bin_values()[latency_bins(values)]
+    assert np.all(np.abs(centers / values - 1) <= BIN_GROWTH / 2 + 1e-9)
+
+
+def test_percentiles_match_exact_within_bin_error():
+    times, values, failed = samples(200_000)
+    hist = WindowedHistogram(step=3600.0)
+    hist.add(times, values, failed)
+    counts, errors, _ = hist.trimmed()
+
+    estimated = rolling_percentiles(counts, 1, PERCENTILES)[:, 0]
+    exact = np.percentile(values, PERCENTILES, method="inverted_cdf")
+    assert np.all(np.abs(estimated / exact - 1) <= BIN_GROWTH / 2 + 1e-9)
+    assert errors.sum() == failed.sum()
+
+
+def test_rolling_window_equals_merged_windows():
+    times, values, failed = samples(50_000, seed=1)
+    step, window = 60.0, 5
+    hist = WindowedHistogram(step)
+    hist.add(times, values, failed)
+    counts, _, start = hist.trimmed()
+
+    rolled = rolling_percentiles(counts, window, (95,))[0]
+    last = len(counts) - 1
+    # 最後の窓の移動 p95 は、直前 window 個の窓のサンプルをまとめた p95 と同じビンになる
+    in_range = times >= start + (last - window + 1) * step
+    exact = np.percentile(values[in_range], 95, method="inverted_cdf")
+    assert rolled[last] == pytest.approx(bin_values()[latency_bins(np.array([exact]))[0]])
+
+
+def test_out_of_order_chunks_extend_backwards():
+    times, values, failed = samples(20_000, seed=2)
+    half = len(times) // 2
+    hist = WindowedHistogram(step=10.0)
+    # 後半を先に加算し、前方への拡張で窓番号がずれないことを確かめる
+    hist.add(times[half:], values[half:], failed[half:])
+    hist.add(times[:half], values[:half], failed[:half])
+    counts, errors, start = hist.trimmed()
+
+    expected = np.bincount(np.floor((times - start) / 10.0).astype(int))
+    assert counts.sum(axis=1).tolist() == expected.tolist()
+    assert errors.sum() == failed.sum()
+
+
+def test_json_and_csv_results_read_the_same(tmp_path):
+    times, values, _ = samples(1_000, seed=3)
+    statuses = np.where(np.arange(len(times)) % 50 == 0, 500, 200)
+    json_path, csv_path = tmp_path / "run.json", tmp_path / "run.csv"
+    with open(json_path, "w", encoding="utf-8") as f:
+        for t, v, s in zip(times, values, statuses):
+            f.write(json.dumps({"type": "Point", "metric": "http_req_duration",
+                                "data": {"time": float(t), "value": float(v), "tags": {"status": str(s)}}},
+                               separators=(",", ":")) + "\n")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("metric_name,timestamp,metric_value,expected_response,status\n")
+        for t, v, s in zip(times, values, statuses):
+            f.write(f"http_req_duration,{float(t)!r},{float(v)!r},,{s}\n")
+            f.write(f"http_reqs,{float(t)!r},1,,\n")
+
+    from_json = [np.concatenate(column) for column in zip(*iter_k6_chunks(str(json_path)))]
+    from_csv = [np.concatenate(column) for column in zip(*iter_k6_chunks(str(csv_path)))]
+    for a, b in zip(from_json, from_csv):
+        np.testing.assert_allclose(a, b)
+    assert from_json[2].sum() == (statuses == 500).sum()
@@ -0,0 +1,106 @@
+"""it2_workload: keep-alive 接続の再利用と応答の読み取り"""
+
+import asyncio
+
+from it2_workload import ConnectionPool
+
+
+async def serve(handler, requests):
+    """handler(リクエスト番号, reader, writer) で応答する HTTP サーバを起動し、(サーバ, ベースURL) を返す"""
+
+    async def on_connect(reader, writer):
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                requests.append(writer)
+                if not await handler(len(requests), reader, writer):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def ok(body=b"{}", extra=b""):
+    return b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n%s\r\n%s" % (len(body), extra, body)
+
+
+def run(handler, paths, idle_s=0.0, timeout=2.0):
+    """paths を順に GET し、([ステータス], 接続数) を返す（各リクエストの間に idle_s 秒待つ）"""
+
+    async def main():
+        requests = []
+        server, base_url = await serve(handler, requests)
+        pool = ConnectionPool(base_url, 1, timeout=timeout)
+        statuses = []
+        try:
+            for path in paths:
+                statuses.append((await pool.get(path))[0])
+                await asyncio.sleep(idle_s)
+        finally:
+            pool.close()
+            server.close()
+        return statuses, len({id(writer) for writer in requests})
+
+    return asyncio.run(main())
+
+
+def test_reuses_keep_alive_connection():
+    async def handler(n, reader, writer):
+        writer.write(ok())
+        await writer.drain()
+        return True
+
+    statuses, connections = run(handler, ["/a", "/b", "/c"])
+    assert statuses == [200, 200, 200]
+    assert connections == 1
+
+
+def test_retries_connection_closed_by_server_while_idle():
+    # 応答後にサーバが接続を閉じる（キープアライブ・タイムアウト切れ）。待機中の接続の再利用はエラーにしない
+    async def handler(n, reader, writer):
+        writer.write(ok())
+        await writer.drain()
+        return False
+
+    statuses, connections = run(handler, ["/a", "/b", "/c"], idle_s=0.2)
+    assert statuses == [200, 200, 200]
+    assert connections == 3
+
+
+def test_fresh_connection_closed_before_response_is_an_error():
+    async def handler(n, reader, writer):
+        return False
+
+    statuses, _ = run(handler, ["/a"])
+    assert statuses == [0]
+
+
+def test_bodyless_and_informational_responses():
+    responses = {
+        1: b"HTTP/1.1 204 No Content\r\n\r\n",
+        2: b"HTTP/1.1 304 Not Modified\r\nETag: \"x\"\r\n\r\n",
+        3: b"HTTP/1.1 100 Continue\r\n\r\n" + ok(b"[1]"),
+        4: b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\n[1]\r\n0\r\n\r\n",
+        5: ok(),
+    }
+
+    async def handler(n, reader, writer):
+        writer.write(responses[n])
+        await writer.drain()
+        return True
+
+    statuses, connections = run(handler, ["/1", "/2", "/3", "/4", "/5"])
+    assert statuses == [204, 304, 200, 200, 200]
+    assert connections == 1
+
+
+def test_timeout_is_not_retried():
+    async def handler(n, reader, writer):
+        await asyncio.sleep(1)
+        return False
+
+    statuses, connections = run(handler, ["/slow"], timeout=0.1)
+    assert statuses == [0]
+    assert connections == 1
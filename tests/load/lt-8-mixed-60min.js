@@ -6,6 +6,35 @@ const BASE_URL = __ENV.BASE_URL || "http://localhost:3000";
 const EMAIL = __ENV.LOGIN_EMAIL || "admin@example.com";
 const PASSWORD = __ENV.LOGIN_PASSWORD || "password";
 const GROUP_ID = __ENV.GROUP_ID || "1";
+const TID = __ENV.TID || "1-1-1-1";
+
+// 実測ワークロード（docs/it2_workload.py k6 で出力したJSON）
+// 指定時はエンドポイント構成比とシンクタイムをこれに従う
+const WORKLOAD = __ENV.WORKLOAD ? JSON.parse(open(__ENV.WORKLOAD)) : null;
+
+/**
+ * 実測ワークロードの構成比に従ってエンドポイントを1つ選ぶ
+ */
+function pickEndpoint() {
+  const rand = Math.random();
+  return WORKLOAD.mix.find((entry) => rand < entry.cumulative) || WORKLOAD.mix[WORKLOAD.mix.length - 1];
+}
+
+/**
+ * 実測シンクタイムの分位点から1つ標本を取る（秒）
+ */
+function sampleThinkTime() {
+  const points = WORKLOAD.think_time_s;
+  if (points.length === 0) {
+    return 0;
+  }
+  const x = Math.random() * (points.length - 1);
+  const i = Math.floor(x);
+  if (i >= points.length - 1) {
+    return points[points.length - 1];
+  }
+  return points[i] + (points[i + 1] - points[i]) * (x - i);
+}
 
 export const options = {
   stages: [
@@ -23,6 +52,18 @@ export default function () {
     login(BASE_URL, EMAIL, PASSWORD);
   }
 
+  if (WORKLOAD) {
+    const endpoint = pickEndpoint();
+    const path = endpoint.path.replaceAll("{id}", GROUP_ID).replaceAll("{tid}", TID);
+    const res = http.get(`${BASE_URL}${path}`, {
+      headers: { Accept: "application/json" },
+      tags: { name: endpoint.name },
+    });
+    check(res, { "status 200": (r) => r.status === 200 });
+    sleep(sampleThinkTime());
+    return;
+  }
+
   const rand = Math.random() * 100;
 
   if (rand < 40) {